@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Per-@type rule plans must not change the output of transform_item.
+
+Each item below carries a shortcut property whose rdfs:domain does not admit
+the item's @type. The plan for that type leaves the rule out, so the item has
+to be transformed with the full rule set, exactly as without plans.
+
+Run with: python -m pytest testing/test_type_plans.py
+"""
+
+import copy
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'transformations'))
+
+import gmn_to_cidoc_transform as transform  # noqa: E402
+
+SUBJECT = 'https://example.org/item/1'
+PERSON = {'@id': 'https://example.org/person/1'}
+OBJECT = {'@id': 'https://example.org/object/1'}
+
+MISMATCHED_ITEMS = {
+    'contract with seller': {
+        '@type': 'gmn:E31_1_Contract',
+        'gmn:P70_1_documents_seller': [PERSON],
+        'gmn:P70_2_documents_buyer': [{'@id': 'https://example.org/person/2'}],
+    },
+    'person with title': {
+        '@type': 'cidoc:E21_Person',
+        'gmn:P1_1_has_name': [{'@value': 'Giovanni Doria'}],
+        'gmn:P102_1_has_title': [{'@value': 'Messer'}],
+    },
+    'cession with seller': {
+        '@type': 'gmn:E31_4_Cession_of_Rights_Contract',
+        'gmn:P70_21_indicates_conceding_party': [PERSON],
+        'gmn:P70_1_documents_seller': [PERSON],
+        'gmn:P70_16_documents_sale_price_amount': [{'@value': '100'}],
+    },
+    'declaration with witness': {
+        '@type': 'gmn:E31_5_Declaration',
+        'gmn:P70_24_indicates_declarant': [PERSON],
+        'gmn:P70_15_documents_witness': [PERSON],
+        'gmn:P70_3_documents_transfer_of': [OBJECT],
+    },
+    'donation with buyer': {
+        '@type': 'gmn:E31_7_Donation_Contract',
+        'gmn:P70_32_indicates_donor': [PERSON],
+        'gmn:P70_2_documents_buyer': [PERSON],
+    },
+    'dowry with seller': {
+        '@type': 'gmn:E31_8_Dowry_Contract',
+        'gmn:P70_34_indicates_object_of_dowry': [OBJECT],
+        'gmn:P70_1_documents_seller': [PERSON],
+        'gmn:P70_17_documents_sale_price_currency': [{'@id': 'https://example.org/currency/lira'}],
+    },
+}
+
+
+def transform_with_all_rules(item):
+    """Transform an item with RULE_TABLE, as transform_item did before type plans."""
+    ctx = transform.TransformContext(item)
+    for _, rule in sorted(transform.RULE_TABLE[key] for key in item if key in transform.RULE_TABLE):
+        rule(ctx)
+    return item
+
+
+@pytest.mark.parametrize('name', sorted(MISMATCHED_ITEMS))
+def test_plan_matches_full_rule_set(name):
+    item = {'@id': SUBJECT, **MISMATCHED_ITEMS[name]}
+    planned = transform.transform_item(copy.deepcopy(item))
+    expected = transform_with_all_rules(copy.deepcopy(item))
+    assert planned == expected
+    assert not [key for key in planned if key.startswith('gmn:P')]
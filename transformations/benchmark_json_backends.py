@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Benchmark the JSON backends and output profiles on a synthetic GMN corpus.
+
+Generates a reproducible Omeka-S style export of persons and contracts,
+transforms it once, then times how long each installed JSON backend takes to
+write the transformed items in the indented and compact profiles. Every
+output is parsed back and compared with the transformed data, and any
+backend whose output differs is flagged.
+
+Usage:
+    python benchmark_json_backends.py [--items N] [--seed S] [--repeat R]
+"""
+
+import argparse
+import io
+import json
+import random
+import time
+from types import SimpleNamespace
+
+from gmn_jsonld_io import KIND_GRAPH, JsonLdWriter, get_backend
+from gmn_to_cidoc_transform import transform_item
+
+CONTEXT = {
+    'cidoc': 'http://www.cidoc-crm.org/cidoc-crm/',
+    'gmn': 'http://www.genoesemerchantnetworks.com/ontology#',
+    'o': 'http://omeka.org/s/vocabs/o#',
+}
+
+PERSON_PROPERTIES = [
+    'gmn:P1_1_has_name', 'gmn:P1_2_has_name_from_source', 'gmn:P1_3_has_patrilineal_name',
+    'gmn:P1_4_has_loconym', 'gmn:P11i_1_earliest_attestation_date', 'gmn:P11i_2_latest_attestation_date',
+    'gmn:P11i_3_has_spouse', 'gmn:P96_1_has_mother', 'gmn:P97_1_has_father',
+    'gmn:P107i_1_has_regional_provenance', 'gmn:P107i_2_has_social_category',
+    'gmn:P107i_3_has_occupation', 'gmn:P3_1_has_editorial_note',
+]
+
+DOCUMENT_PROPERTIES = [
+    'gmn:P1_1_has_name', 'gmn:P102_1_has_title', 'gmn:P94i_1_was_created_by',
+    'gmn:P94i_2_has_enactment_date', 'gmn:P94i_3_has_place_of_enactment',
+    'gmn:P138i_1_has_representation', 'gmn:P3_1_has_editorial_note',
+]
+
+CONTRACT_PROPERTIES = {
+    'gmn:E31_2_Sales_Contract': [
+        'gmn:P70_1_documents_seller', 'gmn:P70_2_documents_buyer', 'gmn:P70_3_documents_transfer_of',
+        'gmn:P70_4_documents_sellers_procurator', 'gmn:P70_5_documents_buyers_procurator',
+        'gmn:P70_6_documents_sellers_guarantor', 'gmn:P70_7_documents_buyers_guarantor',
+        'gmn:P70_8_documents_broker', 'gmn:P70_15_documents_witness',
+        'gmn:P70_16_documents_sale_price_amount', 'gmn:P70_17_documents_sale_price_currency',
+    ],
+    'gmn:E31_3_Arbitration_Agreement': [
+        'gmn:P70_18_documents_disputing_party', 'gmn:P70_19_documents_arbitrator',
+        'gmn:P70_20_documents_dispute_subject',
+    ],
+    'gmn:E31_4_Cession_of_Rights_Contract': [
+        'gmn:P70_21_indicates_conceding_party', 'gmn:P70_22_indicates_receiving_party',
+        'gmn:P70_23_indicates_object_of_cession',
+    ],
+    'gmn:E31_6_Correspondence': [
+        'gmn:P70_26_indicates_sender', 'gmn:P70_27_has_address_of_origin',
+        'gmn:P70_28_indicates_addressee', 'gmn:P70_31_has_address_of_destination',
+    ],
+    'gmn:E31_7_Donation_Contract': [
+        'gmn:P70_32_indicates_donor', 'gmn:P70_33_indicates_object_of_donation',
+        'gmn:P70_22_indicates_receiving_party',
+    ],
+}
+
+LITERAL_VALUES = {
+    'name': ["Giacomo Spinola q. Antonio", "Bartolomeo de' Lomellini", 'Nicolò Grimaldi'],
+    'date': ['1410-03-12', '1437-05-15', '1452-11-02'],
+    'amount': ['100', '245', '1200'],
+}
+
+
+def synthetic_value(rng, property_name, people):
+    """Return one value for a shortcut property, shaped like Omeka-S output."""
+    if 'date' in property_name:
+        return {'@value': rng.choice(LITERAL_VALUES['date']), 'type': 'literal'}
+    if 'amount' in property_name:
+        return {'@value': rng.choice(LITERAL_VALUES['amount']), 'type': 'literal'}
+    if 'name' in property_name or 'title' in property_name or 'note' in property_name:
+        return {'@value': rng.choice(LITERAL_VALUES['name']), 'type': 'literal'}
+    person = rng.randrange(people)
+    return {'@id': f'https://example.org/person/{person}', 'o:title': f'Person {person}',
+            'value_resource_id': person, 'type': 'resource'}
+
+
+def synthetic_export(items, seed=1):
+    """
+    Build a synthetic Omeka-S export with a mix of persons and contracts.
+
+    Args:
+        items: Number of items in the @graph
+        seed: Random seed, so runs are comparable
+
+    Returns:
+        Export dictionary with @context and @graph
+    """
+    rng = random.Random(seed)
+    people = max(items // 4, 1)
+    graph = []
+    for index in range(items):
+        if rng.random() < 0.5:
+            item_type, properties = 'cidoc:E21_Person', PERSON_PROPERTIES
+        else:
+            item_type = rng.choice(list(CONTRACT_PROPERTIES))
+            properties = DOCUMENT_PROPERTIES + CONTRACT_PROPERTIES[item_type]
+        item = {'@id': f'https://example.org/item/{index}', '@type': [item_type, 'o:Item'], 'o:id': index}
+        for property_name in rng.sample(properties, rng.randint(1, len(properties))):
+            item[property_name] = [synthetic_value(rng, property_name, people) for _ in range(rng.randint(1, 3))]
+        graph.append(item)
+    return {'@context': CONTEXT, '@graph': graph}
+
+
+def time_write(items, header, backend, indent, repeat):
+    """Write the items with one backend and profile; return (best seconds, output text)."""
+    layout = SimpleNamespace(kind=KIND_GRAPH, header=header)
+    best = None
+    for _ in range(repeat):
+        output = io.StringIO()
+        start = time.perf_counter()
+        with JsonLdWriter(output, layout, indent, backend) as writer:
+            for item in items:
+                writer.write(item)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, output.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--items', type=int, default=20000, help='Items in the synthetic corpus (default: 20000)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed for the corpus (default: 1)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per measurement; the best is reported')
+    args = parser.parse_args()
+
+    export = synthetic_export(args.items, args.seed)
+    items = [transform_item(item) for item in export['@graph']]
+    header = {'@context': export['@context']}
+    expected = {'@context': export['@context'], '@graph': items}
+
+    backends = []
+    for name in ('json', 'orjson', 'ujson'):
+        try:
+            backends.append(get_backend(name))
+        except ImportError:
+            print(f'{name:<8} not installed, skipped')
+
+    print(f'{args.items} items, best of {args.repeat} runs')
+    print(f"{'backend':<8} {'profile':<8} {'seconds':>8} {'MB':>8} {'items/s':>10}")
+    for backend in backends:
+        for profile, indent in (('indent', 2), ('compact', None)):
+            seconds, text = time_write(items, header, backend, indent, args.repeat)
+            status = '' if json.loads(text) == expected else '  OUTPUT DIFFERS'
+            size = len(text.encode('utf-8')) / 1e6
+            print(f'{backend.name:<8} {profile:<8} {seconds:8.3f} {size:8.2f} {args.items / seconds:10.0f}{status}')
+
+
+if __name__ == '__main__':
+    main()
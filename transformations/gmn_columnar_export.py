@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Columnar, integer-encoded triple tables for analysis without an RDF library.
+
+The transformed graph is written as three integer columns (subject,
+predicate, object) that index a term dictionary, sorted and deduplicated as
+in gmn_triple_store. Two typed side columns, aligned with the rows, make
+the values most often filtered on usable directly:
+
+    number  float64: the value of numeric literals, such as
+            cidoc:P180_has_currency_amount, and NaN elsewhere
+    date    datetime64[D]: the day of date literals, such as the
+            cidoc:P82a_begin_of_the_begin and cidoc:P82b_end_of_the_end of
+            time-spans, and NaT elsewhere. Partial dates ('1437' or
+            '1437-05') are widened to the earliest day for P82a and the
+            latest day for P82b.
+
+Two layouts are available:
+
+    npy    a directory of .npy files (subject, predicate, object, number,
+           date) plus terms.txt, with one N-Triples term per line: line n is
+           term n. The .npy files are written without NumPy and load with
+           numpy.load(path, mmap_mode='r').
+    arrow  an Arrow IPC file with the five columns, plus <name>.terms.arrow
+           holding the term dictionary (needs pyarrow)
+
+Example (pandas):
+    columns = {name: numpy.load(f'out/{name}.npy') for name in ('subject', 'predicate', 'object', 'date')}
+    terms = open('out/terms.txt', encoding='utf-8').read().splitlines()
+"""
+
+import ast
+import calendar
+import datetime
+import os
+import re
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+from gmn_jsonld_io import FORMAT_ARROW, FORMAT_NPY
+from gmn_rdf_writers import XSD
+from gmn_rule_compiler import CURIE_PREFIXES
+from gmn_triple_store import TripleStoreWriter
+
+CIDOC = CURIE_PREFIXES['cidoc']
+
+# Predicates whose literal objects are numbers
+NUMERIC_PREDICATES = {
+    f'<{CIDOC}P180_has_currency_amount>',
+    f'<{CIDOC}P90_has_value>',
+}
+
+# Predicates whose literal objects are dates: 'begin' takes the earliest day
+# of a partial date, 'end' the latest
+DATE_PREDICATES = {
+    f'<{CIDOC}P82a_begin_of_the_begin>': 'begin',
+    f'<{CIDOC}P81a_end_of_the_begin>': 'begin',
+    f'<{CIDOC}P81b_begin_of_the_end>': 'end',
+    f'<{CIDOC}P82b_end_of_the_end>': 'end',
+}
+
+NUMERIC_DATATYPES = {f'<{XSD}{name}>' for name in ('integer', 'decimal', 'double', 'float', 'int', 'long')}
+DATE_DATATYPES = {f'<{XSD}date>', f'<{XSD}dateTime>', f'<{XSD}gYear>', f'<{XSD}gYearMonth>'}
+
+NAT = -(1 << 63)
+_EPOCH = datetime.date(1970, 1, 1).toordinal()
+_LITERAL = re.compile(r'"([^"\\]*)"(?:\^\^(<[^>]*>))?$')
+_DATE = re.compile(r'\s*(\d{4})(?:-(\d{2})(?:-(\d{2}))?)?(?:[T\s].*)?$')
+
+
+def literal_number(term):
+    """Return the float value of a numeric literal term, or None."""
+    match = _LITERAL.match(term)
+    if match is None:
+        return None
+    try:
+        return float(match.group(1))
+    except ValueError:
+        return None
+
+
+def literal_day(term, bound='begin'):
+    """
+    Return the days since 1970-01-01 of a date literal term, or None.
+
+    Args:
+        term: Literal in N-Triples syntax, e.g. '"1437-05"'
+        bound: 'begin' for the first day of a partial date, 'end' for the last
+    """
+    match = _LITERAL.match(term)
+    date = _DATE.match(match.group(1)) if match else None
+    if date is None:
+        return None
+    year, month, day = date.groups()
+    year = int(year)
+    if month is None:
+        month = 1 if bound == 'begin' else 12
+    if day is None:
+        day = 1 if bound == 'begin' else calendar.monthrange(year, int(month))[1]
+    try:
+        return datetime.date(year, int(month), int(day)).toordinal() - _EPOCH
+    except ValueError:
+        return None
+
+
+def write_npy(path, values, descr):
+    """
+    Write a one-dimensional array in NumPy's .npy format (version 1.0).
+
+    Args:
+        path: Output file
+        values: array.array whose items match descr
+        descr: NumPy type string, e.g. '<i4', '<f8' or '<M8[D]'
+    """
+    header = repr({'descr': descr, 'fortran_order': False, 'shape': (len(values),)})
+    # The magic, version, length and header are padded to a multiple of 64 bytes
+    padding = -(10 + len(header) + 1) % 64
+    header = (header + ' ' * padding + '\n').encode('latin1')
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    with open(path, 'wb') as f:
+        f.write(b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header)
+        f.write(values.tobytes())
+
+
+def read_npy(path):
+    """Read a .npy file written by write_npy into an array.array (for use without NumPy)."""
+    typecodes = {'<i4': 'i', '<i8': 'q', '<f8': 'd', '<M8[D]': 'q'}
+    with open(path, 'rb') as f:
+        if f.read(8) != b'\x93NUMPY\x01\x00':
+            raise ValueError(f"'{path}' is not a version 1.0 .npy file")
+        header_size, = struct.unpack('<H', f.read(2))
+        header = ast.literal_eval(f.read(header_size).decode('latin1'))
+        values = array(typecodes[header['descr']])
+        values.frombytes(f.read())
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+class ColumnarWriter(TripleStoreWriter):
+    """
+    Collects the triples of transformed items and writes columnar tables on close.
+
+    Offers the same interface as JsonLdWriter.
+
+    Example:
+        with ColumnarWriter('columns/', reader, FORMAT_NPY) as writer:
+            for item in reader:
+                writer.write(transform_item(item))
+    """
+
+    def __init__(self, target, layout=None, format=FORMAT_NPY):
+        """
+        Args:
+            target: Output directory for 'npy', or the .arrow file for 'arrow'
+            layout: Object with a `header` attribute holding the export's
+                    @context, typically the reader the items come from
+            format: 'npy' or 'arrow'
+        """
+        if format not in (FORMAT_NPY, FORMAT_ARROW):
+            raise ValueError(f"Unknown columnar format '{format}', expected npy or arrow")
+        super().__init__(target, layout)
+        self.format = format
+
+    def _side_columns(self, terms, predicates, objects):
+        """Return the number (float64) and date (days, NaT when missing) columns."""
+        numbers = array('d', [float('nan')]) * len(objects)
+        days = array('q', [NAT]) * len(objects)
+        numeric_predicates = {term_id for term_id, term in enumerate(terms) if term in NUMERIC_PREDICATES}
+        date_bounds = {term_id: DATE_PREDICATES[term] for term_id, term in enumerate(terms) if term in DATE_PREDICATES}
+        number_cache = {}
+        day_cache = {}
+        for row, (predicate, obj) in enumerate(zip(predicates, objects)):
+            term = terms[obj]
+            if term[0] != '"':
+                continue
+            datatype = term[term.rfind('^^') + 2:] if term.endswith('>') else None
+            if predicate in numeric_predicates or datatype in NUMERIC_DATATYPES:
+                if obj not in number_cache:
+                    number_cache[obj] = literal_number(term)
+                if number_cache[obj] is not None:
+                    numbers[row] = number_cache[obj]
+            bound = date_bounds.get(predicate)
+            if bound is None and datatype in DATE_DATATYPES:
+                bound = 'begin'
+            if bound is not None:
+                key = (obj, bound)
+                if key not in day_cache:
+                    day_cache[key] = literal_day(term, bound)
+                if day_cache[key] is not None:
+                    days[row] = day_cache[key]
+        return numbers, days
+
+    def _save(self, terms, subjects, predicates, objects):
+        """Write the ID columns, side columns and term dictionary."""
+        numbers, days = self._side_columns(terms, predicates, objects)
+        wide = len(terms) >= 1 << 31
+        if self.format == FORMAT_ARROW:
+            self._save_arrow(terms, subjects, predicates, objects, numbers, days, wide)
+            return
+        directory = Path(self.target)
+        directory.mkdir(parents=True, exist_ok=True)
+        typecode, descr = ('q', '<i8') if wide else ('i', '<i4')
+        for name, column in (('subject', subjects), ('predicate', predicates), ('object', objects)):
+            write_npy(directory / f'{name}.npy', array(typecode, column), descr)
+        write_npy(directory / 'number.npy', numbers, '<f8')
+        write_npy(directory / 'date.npy', days, '<M8[D]')
+        with open(directory / 'terms.txt', 'w', encoding='utf-8', newline='\n') as f:
+            # N-Triples terms never contain a raw line break
+            f.writelines(term + '\n' for term in terms)
+
+    def _save_arrow(self, terms, subjects, predicates, objects, numbers, days, wide):
+        try:
+            import pyarrow
+            import pyarrow.ipc
+        except ImportError:
+            raise ImportError("Arrow output needs the pyarrow package (pip install pyarrow)") from None
+        id_type = pyarrow.int64() if wide else pyarrow.int32()
+        table = pyarrow.table({
+            'subject': pyarrow.array(subjects, type=id_type),
+            'predicate': pyarrow.array(predicates, type=id_type),
+            'object': pyarrow.array(objects, type=id_type),
+            'number': pyarrow.array([None if value != value else value for value in numbers], type=pyarrow.float64()),
+            'date': pyarrow.array([None if value == NAT else value for value in days], type=pyarrow.date32()),
+        })
+        term_table = pyarrow.table({'term': pyarrow.array(terms, type=pyarrow.large_string())})
+        base, extension = os.path.splitext(str(self.target))
+        for path, data in ((self.target, table), (f'{base}.terms{extension}', term_table)):
+            with pyarrow.OSFile(str(path), 'wb') as sink, pyarrow.ipc.new_file(sink, data.schema) as writer:
+                writer.write_table(data)
@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Random access to the items of a large JSON-LD export.
+
+A one-time indexing pass records the byte range and @id of every @graph element
+(or top-level array element) in a sidecar index file next to the export. The
+ExportIndex API then memory-maps the export and parses only the items that are
+asked for, so a single contract can be re-transformed without reading a
+multi-gigabyte file, and work can be split across processes by byte range.
+
+Index file format (UTF-8 text, one record per line):
+    line 1   JSON object: format, version, size and mtime_ns of the export,
+             its kind ('graph', 'array' or 'item'), the byte ranges of the
+             top-level header values (such as @context) and graph_position
+    then     "<start> <end> <@id as a JSON string, or null>" for each item
+
+Usage:
+    python gmn_export_index.py build <export.json> [<index file>]
+    python gmn_export_index.py show <export.json> <@id> [<@id> ...]
+"""
+
+import json
+import mmap
+import os
+import re
+import sys
+from array import array
+from pathlib import Path
+
+from gmn_jsonld_io import KIND_ARRAY, KIND_GRAPH, KIND_ITEM, detect_compression
+
+INDEX_FORMAT = 'gmn-export-index'
+INDEX_VERSION = 1
+INDEX_SUFFIX = '.idx'
+
+# Strings (with escapes) and brackets: everything else inside a value can be
+# skipped by the regex engine without being looked at from Python
+_TOKEN = re.compile(rb'"(?:[^"\\]|\\.)*"|[{}\[\]]', re.DOTALL)
+_STRING = re.compile(rb'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_SCALAR = re.compile(rb'[^\s,\]}]*')
+_WHITESPACE = re.compile(rb'[ \t\n\r]*')
+_ID_KEY = b'"@id"'
+
+
+def default_index_path(export_file):
+    """Return the sidecar index path for an export, e.g. export.json.idx."""
+    return Path(str(export_file) + INDEX_SUFFIX)
+
+
+class _Scanner:
+    """Finds item boundaries in a memory-mapped export without decoding it."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def skip_whitespace(self, pos):
+        return _WHITESPACE.match(self.data, pos).end()
+
+    def error(self, message, pos):
+        raise ValueError(f"{message} at byte {pos}")
+
+    def expect(self, char, pos):
+        pos = self.skip_whitespace(pos)
+        if self.data[pos:pos + 1] != char:
+            self.error(f"Expecting {char.decode()!r}", pos)
+        return self.skip_whitespace(pos + 1)
+
+    def string(self, pos):
+        match = _STRING.match(self.data, pos)
+        if match is None:
+            self.error('Expecting string', pos)
+        return match.end()
+
+    def value(self, pos):
+        """
+        Skip the JSON value starting at pos.
+
+        Returns:
+            (end, item_id): end offset of the value and, for objects, the
+            decoded value of their top-level "@id" key (or None)
+        """
+        data = self.data
+        first = data[pos:pos + 1]
+        if first == b'"':
+            return self.string(pos), None
+        if first not in (b'{', b'['):
+            end = _SCALAR.match(data, pos).end()
+            if end == pos:
+                self.error('Expecting value', pos)
+            return end, None
+
+        depth = 0
+        item_id = None
+        want_id = False
+        for match in _TOKEN.finditer(data, pos):
+            token = match.group()
+            char = token[:1]
+            if char == b'"':
+                if want_id:
+                    item_id = json.loads(token)
+                    want_id = False
+                elif depth == 1 and first == b'{' and token == _ID_KEY and item_id is None:
+                    # A key is followed by ':'; the same string as a value is not
+                    after = self.skip_whitespace(match.end())
+                    if data[after:after + 1] == b':':
+                        value_start = self.skip_whitespace(after + 1)
+                        want_id = data[value_start:value_start + 1] == b'"'
+            elif char in b'{[':
+                depth += 1
+                want_id = False
+            else:
+                depth -= 1
+                if depth == 0:
+                    return match.end(), item_id
+        self.error('Unterminated value', pos)
+
+    def array_items(self, pos):
+        """Return ([(start, end, item_id), ...], end) for the elements of the array at pos."""
+        pos = self.skip_whitespace(pos + 1)
+        items = []
+        if self.data[pos:pos + 1] == b']':
+            return items, pos + 1
+        while True:
+            end, item_id = self.value(pos)
+            items.append((pos, end, item_id))
+            pos = self.skip_whitespace(end)
+            char = self.data[pos:pos + 1]
+            if char == b',':
+                pos = self.skip_whitespace(pos + 1)
+            elif char == b']':
+                return items, pos + 1
+            else:
+                self.error("Expecting ',' or ']'", pos)
+
+    def scan(self):
+        """
+        Scan the whole export.
+
+        Returns:
+            Dictionary with kind, header (key -> [start, end]), graph_position
+            and items (list of (start, end, item_id))
+        """
+        data = self.data
+        pos = self.skip_whitespace(0)
+        first = data[pos:pos + 1]
+        if first == b'[':
+            items, _ = self.array_items(pos)
+            return {'kind': KIND_ARRAY, 'header': {}, 'graph_position': None, 'items': items}
+        if first != b'{':
+            self.error('Expecting JSON array or object', pos)
+
+        start = pos
+        header = {}
+        items = None
+        graph_position = None
+        pos = self.skip_whitespace(pos + 1)
+        if data[pos:pos + 1] != b'}':
+            while True:
+                key_end = self.string(pos)
+                key = json.loads(data[pos:key_end])
+                pos = self.expect(b':', key_end)
+                if key == '@graph' and items is None:
+                    graph_position = len(header)
+                    if data[pos:pos + 1] == b'[':
+                        items, pos = self.array_items(pos)
+                    else:
+                        # A single node rather than a list, as JsonLdReader yields it
+                        end, item_id = self.value(pos)
+                        items, pos = [(pos, end, item_id)], end
+                else:
+                    end, _ = self.value(pos)
+                    header[key] = [pos, end]
+                    pos = end
+                pos = self.skip_whitespace(pos)
+                if data[pos:pos + 1] == b',':
+                    pos = self.skip_whitespace(pos + 1)
+                    continue
+                pos = self.expect(b'}', pos)
+                break
+        else:
+            pos += 1
+        if items is None:
+            # No @graph: the whole object is a single item
+            end, item_id = self.value(start)
+            return {'kind': KIND_ITEM, 'header': {}, 'graph_position': None, 'items': [(start, end, item_id)]}
+        return {'kind': KIND_GRAPH, 'header': header, 'graph_position': graph_position, 'items': items}
+
+
+def build_index(export_file, index_file=None):
+    """
+    Scan an export and write its sidecar index.
+
+    Args:
+        export_file: Path to an uncompressed JSON-LD export
+        index_file: Where to write the index (default: <export_file>.idx)
+
+    Returns:
+        Path of the index file written
+    """
+    export_file = Path(export_file)
+    index_file = Path(index_file) if index_file else default_index_path(export_file)
+    stat = export_file.stat()
+    if detect_compression(export_file, sniff=True):
+        raise ValueError(f"Cannot index compressed export '{export_file}'; byte offsets need the "
+                         "uncompressed file")
+    with open(export_file, 'rb') as f:
+        if stat.st_size == 0:
+            raise ValueError(f"Cannot index empty file '{export_file}'")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            scan = _Scanner(data).scan()
+
+    metadata = {
+        'format': INDEX_FORMAT,
+        'version': INDEX_VERSION,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'kind': scan['kind'],
+        'header': scan['header'],
+        'graph_position': scan['graph_position'],
+    }
+    temporary = index_file.with_name(index_file.name + '.tmp')
+    with open(temporary, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(metadata) + '\n')
+        for start, end, item_id in scan['items']:
+            f.write(f"{start} {end} {json.dumps(item_id, ensure_ascii=False)}\n")
+    os.replace(temporary, index_file)
+    return index_file
+
+
+class ExportIndex:
+    """
+    Memory-mapped export with a sidecar index of its items.
+
+    The index is built on first use, and rebuilt whenever the export's size or
+    modification time no longer match the ones it was built from.
+
+    Example:
+        with ExportIndex('omeka_export.json') as index:
+            contract = index.get('https://example.org/item/1234')
+    """
+
+    def __init__(self, export_file, index_file=None, rebuild=False):
+        """
+        Args:
+            export_file: Path to an uncompressed JSON-LD export
+            index_file: Sidecar index path (default: <export_file>.idx)
+            rebuild: If True, rebuild the index even if it is up to date
+        """
+        self.export_file = Path(export_file)
+        self.index_file = Path(index_file) if index_file else default_index_path(self.export_file)
+        if rebuild or not self._load():
+            build_index(self.export_file, self.index_file)
+            if not self._load():
+                raise ValueError(f"Index '{self.index_file}' does not match '{self.export_file}'")
+        self._file = open(self.export_file, 'rb')
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._header = None
+
+    def _load(self):
+        """Load the index file; return False if it is missing or stale."""
+        try:
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                metadata = json.loads(f.readline())
+                stat = self.export_file.stat()
+                if (metadata.get('format') != INDEX_FORMAT or metadata.get('version') != INDEX_VERSION
+                        or metadata.get('size') != stat.st_size or metadata.get('mtime_ns') != stat.st_mtime_ns):
+                    return False
+                starts, ends, ids = array('q'), array('q'), []
+                for line in f:
+                    start, end, item_id = line.rstrip('\n').split(' ', 2)
+                    starts.append(int(start))
+                    ends.append(int(end))
+                    ids.append(json.loads(item_id))
+        except (OSError, ValueError):
+            return False
+        self.kind = metadata['kind']
+        self.graph_position = metadata.get('graph_position')
+        self._header_ranges = metadata['header']
+        self._starts, self._ends, self._ids = starts, ends, ids
+        self._positions = {}
+        for position, item_id in enumerate(ids):
+            if item_id is not None:
+                self._positions.setdefault(item_id, position)
+        return True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Release the memory map."""
+        self._data.close()
+        self._file.close()
+
+    def __len__(self):
+        return len(self._starts)
+
+    def __contains__(self, item_id):
+        return item_id in self._positions
+
+    def ids(self):
+        """Return the @id of every item in export order (None for items without one)."""
+        return list(self._ids)
+
+    @property
+    def header(self):
+        """Top-level keys of the export other than @graph, such as @context."""
+        if self._header is None:
+            self._header = {key: json.loads(self._data[start:end])
+                            for key, (start, end) in self._header_ranges.items()}
+        return self._header
+
+    def position(self, item_id):
+        """Return the position of the item with the given @id in the export."""
+        try:
+            return self._positions[item_id]
+        except KeyError:
+            raise KeyError(f"Item '{item_id}' not found in {self.export_file}") from None
+
+    def byte_range(self, position):
+        """Return the (start, end) byte offsets of the item at a position."""
+        return self._starts[position], self._ends[position]
+
+    def item(self, position):
+        """Parse and return the item at a position."""
+        return json.loads(self._data[self._starts[position]:self._ends[position]])
+
+    def get(self, item_id):
+        """Parse and return the item with the given @id."""
+        return self.item(self.position(item_id))
+
+    def items(self, start=0, stop=None):
+        """Yield the items at positions start to stop (exclusive), in order."""
+        for position in range(start, len(self) if stop is None else min(stop, len(self))):
+            yield self.item(position)
+
+    def partitions(self, count):
+        """
+        Split the items into up to count contiguous parts of similar byte size.
+
+        Returns:
+            List of (start, stop) position ranges for items(), e.g. one per
+            worker process
+        """
+        total = len(self)
+        if not total:
+            return []
+        first, last = self._starts[0], self._ends[total - 1]
+        target = max((last - first) / max(count, 1), 1)
+        parts = []
+        start = 0
+        for position in range(total):
+            if self._ends[position] - first >= target * (len(parts) + 1) and position + 1 < total:
+                parts.append((start, position + 1))
+                start = position + 1
+        parts.append((start, total))
+        return parts
+
+    def reader(self, item_ids=None):
+        """
+        Return a reader over selected items with the interface of JsonLdReader.
+
+        Args:
+            item_ids: @ids to read, in the order given (default: all items)
+        """
+        return IndexedReader(self, item_ids)
+
+
+class IndexedReader:
+    """Iterates items of an ExportIndex with the attributes of a JsonLdReader."""
+
+    def __init__(self, index, item_ids=None):
+        self.index = index
+        self.item_ids = item_ids
+        self.kind = index.kind if index.kind != KIND_ITEM or item_ids is None else KIND_GRAPH
+        self.header = index.header if index.kind == KIND_GRAPH else {}
+        self.graph_position = index.graph_position
+
+    def __iter__(self):
+        if self.item_ids is None:
+            yield from self.index.items()
+        else:
+            for item_id in self.item_ids:
+                yield self.index.get(item_id)
+
+
+def main():
+    """Build an index, or print selected items using it."""
+    if len(sys.argv) < 3 or sys.argv[1] not in ('build', 'show'):
+        print(__doc__.split('Usage:')[1].rstrip())
+        sys.exit(1)
+    command, export_file = sys.argv[1], sys.argv[2]
+    if command == 'build':
+        index_file = build_index(export_file, sys.argv[3] if len(sys.argv) > 3 else None)
+        with ExportIndex(export_file, index_file) as index:
+            print(f"✓ Indexed {len(index)} items: {index_file}")
+    else:
+        with ExportIndex(export_file) as index:
+            for item_id in sys.argv[3:]:
+                print(json.dumps(index.get(item_id), indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
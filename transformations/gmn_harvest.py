@@ -0,0 +1,629 @@
+#!/usr/bin/env python3
+"""
+Harvest items from the Omeka-S REST API for transformation.
+
+Instead of exporting JSON-LD from Omeka-S by hand, items can be read from
+the site's API (/api/items?page=N) while they are transformed:
+
+    python gmn_to_cidoc_transform.py https://omeka.example.org/ output.jsonld.gz
+
+OmekaHarvester fetches pages concurrently with asyncio, up to a limit of
+open connections that are kept alive and reused between requests, and
+yields the pages in order as they arrive. HarvestReader runs a harvester in
+a background thread and offers the same interface as JsonLdReader
+(iteration, `kind`, `header`), so harvested items flow into transform_item
+and any writer while the next pages are being fetched.
+
+An output can be kept up to date incrementally: the latest o:modified time
+seen and the first page's ETag are saved next to it (see save_state), and
+the next harvest only asks for the items modified since, newest first, so it
+can stop at the first unchanged item; an unchanged first page (HTTP 304)
+ends it at once. The changed items are then merged into the output with
+gmn_shards.merge_shards. Deleted items are not detected this way.
+
+Only the standard library is used: HttpClient is a minimal HTTP/1.1 client
+(keep-alive, chunked transfer encoding, gzip, redirects and retries of
+failed or throttled requests). Private items are included when API keys are
+set in OMEKA_KEY_IDENTITY and OMEKA_KEY_CREDENTIAL.
+"""
+
+import asyncio
+import gzip
+import json
+import math
+import os
+import queue
+import re
+import ssl
+import threading
+import time
+import zlib
+from collections import deque
+from datetime import datetime, timezone
+from pathlib import Path
+from urllib.parse import urlencode, urljoin, urlsplit
+
+from gmn_jsonld_io import KIND_GRAPH, get_backend
+from gmn_shards import sidecar_path
+
+DEFAULT_CONCURRENCY = 8
+DEFAULT_PER_PAGE = 100
+DEFAULT_TIMEOUT = 60
+DEFAULT_RETRIES = 3
+USER_AGENT = 'gmn-harvester/1'
+
+# Statuses worth retrying: throttling and temporary server failures
+_RETRY_STATUSES = {429, 502, 503, 504}
+_REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+_MAX_REDIRECTS = 5
+_MAX_LINE = 65536
+_CREDENTIAL = re.compile(r'(key_credential=)[^&]*')
+
+
+def is_url(source):
+    """Return whether an input names a site to harvest rather than a file."""
+    return isinstance(source, str) and source.startswith(('http://', 'https://'))
+
+
+def redact(url):
+    """Hide the API key credential in a URL, for messages."""
+    return _CREDENTIAL.sub(r'\1***', url)
+
+
+def items_endpoint(url):
+    """
+    Return the API items endpoint of an Omeka-S site.
+
+    'https://omeka.example.org', '.../api' and '.../api/items' all give
+    'https://omeka.example.org/api/items'.
+    """
+    url = url.split('?', 1)[0].rstrip('/')
+    if url.endswith('/api/items'):
+        return url
+    if url.endswith('/api'):
+        return url + '/items'
+    return url + '/api/items'
+
+
+class HttpError(Exception):
+    """Raised for a response with an unexpected status."""
+
+    def __init__(self, status, url, reason=''):
+        super().__init__(f'HTTP {status} {reason} for {redact(url)}'.replace('  ', ' '))
+        self.status = status
+        self.url = url
+
+
+# Errors a harvest can end with, besides invalid JSON
+HARVEST_ERRORS = (HttpError, OSError, asyncio.TimeoutError, asyncio.IncompleteReadError)
+
+
+class HttpResponse:
+    """Status, headers (lower-case names) and decoded body of a response."""
+
+    def __init__(self, url, status, reason, headers, body):
+        self.url = url
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+
+class _Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self):
+        self.writer.close()
+
+
+class HttpClient:
+    """
+    Minimal asyncio HTTP/1.1 client with a pool of keep-alive connections.
+
+    At most max_connections requests are in flight at a time; connections
+    are returned to the pool after each response and reused for the next
+    request to the same host.
+    """
+
+    def __init__(self, max_connections=DEFAULT_CONCURRENCY, timeout=DEFAULT_TIMEOUT, retries=DEFAULT_RETRIES,
+                 headers=None):
+        """
+        Args:
+            max_connections: Requests (and open connections) at a time
+            timeout: Seconds allowed per request
+            retries: Attempts after a failed connection, a 429 or a 5xx
+                     gateway status, waiting 1, 2, 4... seconds (or the
+                     server's Retry-After) in between
+            headers: Extra request headers
+        """
+        self.timeout = timeout
+        self.retries = retries
+        self.headers = {'User-Agent': USER_AGENT, 'Accept': 'application/json', 'Accept-Encoding': 'gzip',
+                        **(headers or {})}
+        self.requests = 0
+        self.connections = 0
+        self.bytes = 0
+        self._limit = asyncio.Semaphore(max_connections)
+        self._idle = {}
+        self._ssl = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback):
+        await self.close()
+
+    async def close(self):
+        """Close the idle connections."""
+        for connections in self._idle.values():
+            for connection in connections:
+                connection.close()
+        self._idle.clear()
+
+    async def _connect(self, origin):
+        scheme, host, port = origin
+        if scheme == 'https' and self._ssl is None:
+            self._ssl = ssl.create_default_context()
+        reader, writer = await asyncio.open_connection(host, port, ssl=self._ssl if scheme == 'https' else None,
+                                                       limit=_MAX_LINE)
+        self.connections += 1
+        return _Connection(reader, writer)
+
+    async def get(self, url, headers=None):
+        """
+        Fetch a URL, following redirects and retrying temporary failures.
+
+        Args:
+            url: Address to fetch
+            headers: Extra headers for this request, e.g. If-None-Match
+
+        Returns:
+            HttpResponse with a 2xx or 304 (not modified) status
+
+        Raises:
+            HttpError: For any other final status
+            OSError, asyncio.TimeoutError: If the site cannot be reached
+        """
+        for _ in range(_MAX_REDIRECTS + 1):
+            response = await self._get_with_retries(url, headers)
+            if response.status not in _REDIRECT_STATUSES or 'location' not in response.headers:
+                break
+            url = urljoin(url, response.headers['location'])
+        if not 200 <= response.status < 300 and response.status != 304:
+            raise HttpError(response.status, response.url, response.reason)
+        return response
+
+    async def _get_with_retries(self, url, headers=None):
+        for attempt in range(self.retries + 1):
+            last = attempt == self.retries
+            try:
+                async with self._limit:
+                    response = await asyncio.wait_for(self._request(url, headers), self.timeout)
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+                if last:
+                    if isinstance(e, asyncio.IncompleteReadError):
+                        raise ConnectionError(f'Connection closed before a complete response from '
+                                              f'{redact(url)}') from None
+                    raise
+                delay = 2 ** attempt
+            else:
+                if response.status not in _RETRY_STATUSES or last:
+                    return response
+                retry_after = response.headers.get('retry-after', '')
+                delay = int(retry_after) if retry_after.isdigit() else 2 ** attempt
+            await asyncio.sleep(delay)
+
+    async def _request(self, url, headers=None):
+        parts = urlsplit(url)
+        origin = (parts.scheme, parts.hostname, parts.port or (443 if parts.scheme == 'https' else 80))
+        target = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        host = parts.netloc.rsplit('@', 1)[-1]
+        request = f'GET {target} HTTP/1.1\r\nHost: {host}\r\n'
+        headers = {**self.headers, **(headers or {})}
+        request += ''.join(f'{name}: {value}\r\n' for name, value in headers.items()) + '\r\n'
+
+        idle = self._idle.setdefault(origin, [])
+        while idle:
+            # A kept-alive connection may have been closed by the server in
+            # the meantime; a fresh one is opened if it fails
+            connection = idle.pop()
+            try:
+                response, reusable = await self._exchange(connection, url, request)
+                break
+            except (OSError, asyncio.IncompleteReadError):
+                connection.close()
+            except BaseException:
+                connection.close()
+                raise
+        else:
+            connection = await self._connect(origin)
+            try:
+                response, reusable = await self._exchange(connection, url, request)
+            except BaseException:
+                connection.close()
+                raise
+        if reusable:
+            idle.append(connection)
+        else:
+            connection.close()
+        self.requests += 1
+        return response
+
+    async def _exchange(self, connection, url, request):
+        connection.writer.write(request.encode('latin1'))
+        await connection.writer.drain()
+        reader = connection.reader
+        status_line = (await reader.readuntil(b'\r\n')).decode('latin1').rstrip('\r\n')
+        version, status, *reason = status_line.split(' ', 2)
+        if not version.startswith('HTTP/1.'):
+            raise OSError(f'Unexpected response from {redact(url)}: {status_line!r}')
+        headers = {}
+        while True:
+            line = (await reader.readuntil(b'\r\n')).decode('latin1').rstrip('\r\n')
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            name = name.strip().lower()
+            value = value.strip()
+            headers[name] = f'{headers[name]}, {value}' if name in headers else value
+
+        status = int(status)
+        reusable = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+        if status in (204, 304) or 100 <= status < 200:
+            body = b''
+        elif 'chunked' in headers.get('transfer-encoding', '').lower():
+            body = await self._read_chunked(reader)
+        elif 'content-length' in headers:
+            body = await reader.readexactly(int(headers['content-length']))
+        else:
+            body = await reader.read()
+            reusable = False
+        self.bytes += len(body)
+
+        encoding = headers.get('content-encoding', '').lower()
+        if encoding == 'gzip':
+            body = gzip.decompress(body)
+        elif encoding == 'deflate':
+            body = zlib.decompress(body)
+        return HttpResponse(url, status, reason[0] if reason else '', headers, body), reusable
+
+    async def _read_chunked(self, reader):
+        chunks = []
+        while True:
+            size_line = await reader.readuntil(b'\r\n')
+            size = int(size_line.split(b';', 1)[0].strip(), 16)
+            if size == 0:
+                # Skip any trailer fields up to the final empty line
+                while (await reader.readuntil(b'\r\n')) != b'\r\n':
+                    pass
+                return b''.join(chunks)
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+
+
+def modified_time(item):
+    """Return the o:modified (or else o:created) time of an Omeka-S item as an aware datetime, or None."""
+    for key in ('o:modified', 'o:created'):
+        value = item.get(key)
+        if isinstance(value, dict):
+            value = value.get('@value')
+        if isinstance(value, str):
+            try:
+                time_value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            except ValueError:
+                continue
+            return time_value if time_value.tzinfo else time_value.replace(tzinfo=timezone.utc)
+    return None
+
+
+class OmekaHarvester:
+    """
+    Fetches the items of an Omeka-S site page by page, several pages at a time.
+
+    Example:
+        async for page in OmekaHarvester('https://omeka.example.org').pages():
+            for item in page:
+                ...
+    """
+
+    def __init__(self, url, concurrency=DEFAULT_CONCURRENCY, per_page=DEFAULT_PER_PAGE, query=None,
+                 backend=None, timeout=DEFAULT_TIMEOUT, key_identity=None, key_credential=None,
+                 modified_since=None, etags=None, seen_ids=None):
+        """
+        Args:
+            url: Address of the site, its /api or its /api/items endpoint
+            concurrency: Pages fetched at a time
+            per_page: Items per page
+            query: Further API query parameters, as a dictionary or a list of
+                   (name, value) pairs, e.g. {'item_set_id': 12}
+            backend: JsonBackend used to decode pages (default: get_backend())
+            timeout: Seconds allowed per request
+            key_identity, key_credential: API keys giving access to private
+                                          items (default: OMEKA_KEY_IDENTITY
+                                          and OMEKA_KEY_CREDENTIAL)
+            modified_since: ISO 8601 time: only harvest the items modified
+                            at or after it (see pages)
+            etags: ETags of earlier responses by URL, sent as If-None-Match
+                   with the first page's request (see pages)
+            seen_ids: @ids of the items modified exactly at modified_since
+                      that were already harvested, which are skipped
+        """
+        self.endpoint = items_endpoint(url)
+        self.concurrency = concurrency
+        self.per_page = per_page
+        self.query = list(query.items()) if isinstance(query, dict) else list(query or [])
+        self.backend = backend or get_backend()
+        self.timeout = timeout
+        self.key_identity = key_identity or os.environ.get('OMEKA_KEY_IDENTITY')
+        self.key_credential = key_credential or os.environ.get('OMEKA_KEY_CREDENTIAL')
+        self.modified_since = modified_since
+        self.etags = dict(etags or {})
+        self.total = None
+        self.not_modified = False
+        self.high_water = modified_since
+        self.high_water_ids = set(seen_ids or ())
+        self._seen = frozenset(self.high_water_ids)
+        self._since = modified_time({'o:modified': modified_since}) if modified_since else None
+        self._high_water_time = self._since
+        self.pages_fetched = 0
+        self.items_fetched = 0
+        self.bytes_fetched = 0
+        self.requests = 0
+        self.connections = 0
+
+    def page_url(self, page):
+        """
+        Return the URL of a page (from 1).
+
+        Items are sorted by id so pages are stable, or by modification time,
+        newest first, when harvesting changes.
+        """
+        if self.modified_since:
+            # The datetime filter needs Omeka S 4; earlier versions ignore it
+            # and pages() stops at the first unchanged item instead
+            params = [('sort_by', 'modified'), ('sort_order', 'desc'), ('datetime[0][joiner]', 'and'),
+                      ('datetime[0][field]', 'modified'), ('datetime[0][type]', 'gte'),
+                      ('datetime[0][value]', self.modified_since)]
+        else:
+            params = [('sort_by', 'id'), ('sort_order', 'asc')]
+        params += [*self.query, ('page', page), ('per_page', self.per_page)]
+        if self.key_identity and self.key_credential:
+            params += [('key_identity', self.key_identity), ('key_credential', self.key_credential)]
+        return f'{self.endpoint}?{urlencode(params)}'
+
+    async def _fetch(self, client, page):
+        url = self.page_url(page)
+        # ETags are stored without the API key
+        key = redact(url)
+        headers = {'If-None-Match': self.etags[key]} if page == 1 and key in self.etags else None
+        response = await client.get(url, headers)
+        if response.status == 304:
+            return response, None
+        if page == 1 and 'etag' in response.headers:
+            self.etags = {key: response.headers['etag']}
+        items = self.backend.loads(response.body)
+        if not isinstance(items, list):
+            raise ValueError(f'Expected a list of items from {redact(response.url)}')
+        return response, items
+
+    def _accept(self, items):
+        """
+        Count a page and raise the high-water mark with its items.
+
+        Returns:
+            (items, last): the items to harvest, and whether no later page
+            can hold any (when harvesting changes, pages end at the first
+            item modified before modified_since)
+        """
+        self.pages_fetched += 1
+        last = not items
+        accepted = []
+        for item in items:
+            modified = modified_time(item) if isinstance(item, dict) else None
+            item_id = item.get('@id') if isinstance(item, dict) else None
+            if self._since is not None and modified is not None:
+                if modified < self._since:
+                    last = True
+                    break
+                # Items at the mark itself are requested again in case others
+                # were modified in the same second, but only those are new
+                if modified == self._since and item_id in self._seen:
+                    continue
+            if modified is not None:
+                if self._high_water_time is None or modified > self._high_water_time:
+                    self._high_water_time = modified
+                    self.high_water = modified.isoformat()
+                    self.high_water_ids = set()
+                if modified == self._high_water_time:
+                    self.high_water_ids.add(item_id)
+            accepted.append(item)
+        self.items_fetched += len(accepted)
+        return accepted, last
+
+    async def pages(self):
+        """
+        Yield the items of each page, in page order.
+
+        The first page gives the number of items (Omeka-S-Total-Results
+        header); the other pages are then requested concurrently, keeping up
+        to twice `concurrency` pages ahead of the one being yielded. Without
+        the header, pages are requested until one comes back empty.
+
+        With modified_since, only the items modified since are yielded. If
+        the first page is unchanged since its ETag was recorded (a 304
+        response), nothing is yielded and `not_modified` is set. After the
+        harvest, `high_water` holds the latest o:modified seen,
+        `high_water_ids` the items modified at that time and `etags` the
+        first page's ETag, to pass to the next incremental harvest.
+        """
+        async with HttpClient(self.concurrency, self.timeout) as client:
+            try:
+                response, items = await self._fetch(client, 1)
+                if items is None:
+                    self.not_modified = True
+                    return
+                total = response.headers.get('omeka-s-total-results', '')
+                self.total = int(total) if total.isdigit() else None
+                last_page = math.ceil(self.total / self.per_page) if self.total is not None else None
+                items, last = self._accept(items)
+                if items:
+                    yield items
+                if last:
+                    return
+
+                pending = deque()
+                next_page = 2
+                try:
+                    while True:
+                        while len(pending) < 2 * self.concurrency and (last_page is None or next_page <= last_page):
+                            pending.append(asyncio.ensure_future(self._fetch(client, next_page)))
+                            next_page += 1
+                        if not pending:
+                            break
+                        _, items = await pending.popleft()
+                        items, last = self._accept(items or [])
+                        if items:
+                            yield items
+                        if last:
+                            break
+                finally:
+                    for task in pending:
+                        task.cancel()
+                    await asyncio.gather(*pending, return_exceptions=True)
+            finally:
+                self.bytes_fetched = client.bytes
+                self.requests = client.requests
+                self.connections = client.connections
+
+
+# Marks the end of the harvest in HarvestReader's queue
+_END = object()
+
+
+class HarvestReader:
+    """
+    Reader for the items of an Omeka-S site, harvested in a background thread.
+
+    Offers the same interface as JsonLdReader (iteration, `kind`, `header`).
+    The items are written as an @graph export; the @context Omeka-S repeats
+    on every item is moved to the header. Up to `buffer_pages` pages are
+    held while the items before them are being transformed.
+    """
+
+    def __init__(self, url, concurrency=DEFAULT_CONCURRENCY, per_page=DEFAULT_PER_PAGE, query=None, backend=None,
+                 timeout=DEFAULT_TIMEOUT, buffer_pages=None, modified_since=None, etags=None, seen_ids=None):
+        """
+        Args:
+            buffer_pages: Harvested pages waiting to be read (default:
+                          twice the concurrency)
+            (other arguments as for OmekaHarvester)
+        """
+        self.harvester = OmekaHarvester(url, concurrency, per_page, query, backend, timeout,
+                                        modified_since=modified_since, etags=etags, seen_ids=seen_ids)
+        self.source = self.harvester.endpoint
+        self.buffer_pages = buffer_pages or 2 * concurrency
+        self.kind = KIND_GRAPH
+        self.header = {}
+        self.graph_position = None
+        self.seconds = None
+
+    def _harvest(self, pages, stop):
+        async def run():
+            async for page in self.harvester.pages():
+                while True:
+                    if stop.is_set():
+                        return
+                    try:
+                        pages.put_nowait(page)
+                        break
+                    except queue.Full:
+                        await asyncio.sleep(0.01)
+
+        try:
+            asyncio.run(run())
+            pages.put(_END)
+        except BaseException as e:
+            pages.put(e)
+
+    def __iter__(self):
+        pages = queue.Queue(self.buffer_pages)
+        stop = threading.Event()
+        start = time.perf_counter()
+        thread = threading.Thread(target=self._harvest, args=(pages, stop), name='omeka-harvest', daemon=True)
+        thread.start()
+        try:
+            while True:
+                page = pages.get()
+                if page is _END:
+                    break
+                if isinstance(page, BaseException):
+                    raise page
+                for item in page:
+                    context = item.pop('@context', None)
+                    if context is not None and '@context' not in self.header:
+                        self.header['@context'] = context
+                    yield item
+        finally:
+            stop.set()
+            # Unblock the harvest thread if it is waiting for room in the queue
+            while thread.is_alive():
+                try:
+                    pages.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            self.seconds = time.perf_counter() - start
+
+    def summary(self):
+        """Describe the harvest once the items have been read."""
+        harvester = self.harvester
+        if harvester.not_modified:
+            return f'No changes since {harvester.modified_since} at {self.source}'
+        rate = f', {harvester.items_fetched / self.seconds:.0f} items/s' if self.seconds else ''
+        changed = f' changed since {harvester.modified_since}' if harvester.modified_since else ''
+        return (f'Harvested {harvester.items_fetched} items{changed} in {harvester.pages_fetched} pages '
+                f'({harvester.bytes_fetched / 1e6:.1f} MB over {harvester.connections} connections, '
+                f'{harvester.requests} requests{rate}) from {self.source}')
+
+
+STATE_SUFFIX = '-harvest.json'
+STATE_VERSION = 1
+
+
+def state_path(target):
+    """Return the path of the harvest state kept next to an output, e.g. out.jsonld.gz-harvest.json."""
+    return sidecar_path(target, STATE_SUFFIX)
+
+
+def load_state(path):
+    """Load the state saved by save_state, or return None if there is none."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_state(path, harvester, **extra):
+    """
+    Record what the next incremental harvest starts from.
+
+    Args:
+        path: State file (see state_path)
+        harvester: OmekaHarvester after its harvest
+        extra: Further entries, e.g. the output format
+    """
+    state = {
+        'version': STATE_VERSION,
+        'endpoint': harvester.endpoint,
+        'modified': harvester.high_water,
+        'modified_ids': sorted(item_id for item_id in harvester.high_water_ids if isinstance(item_id, str)),
+        'etags': harvester.etags,
+        **extra,
+    }
+    temporary = Path(path).with_name(Path(path).name + '.tmp')
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
+        f.write('\n')
+    os.replace(temporary, path)
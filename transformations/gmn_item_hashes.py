@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Per-item content hashes for incremental re-transformation.
+
+Most items of an export are unchanged from one run to the next. When an
+output is written with its hashes, out.json-hashes.json records a hash of the
+canonical JSON of every input item (keys sorted, compact) by @id, together
+with the versions of everything else the output depends on:
+
+    {
+      "version": 1,
+      "settings": {"transformer": "...", "ontology": "...", "format": "json", "indent": 2, ...},
+      "output": {"bytes": 18234112, "mtime_ns": 1760000000000000000},
+      "items": {"https://.../item/1": "9f86d081884c7d659a2feaa0c55ad015", ...}
+    }
+
+The next run can then take the previous output of every item whose hash is
+unchanged instead of transforming it again. The hashes only hold while the
+settings are the same and the output is the one written with them (same
+size and modification time); otherwise stale_reason says why and every item
+has to be transformed.
+
+PreviousOutput looks the unchanged items up in the previous output as it is
+read once, in order: when the export keeps its order, as Omeka-S exports do,
+only the items that changed or were removed are held in memory. The hashes
+are saved in output order, so the output is never read past the place an
+item was written at; an item missing from there means the output does not
+match its hashes.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from gmn_shards import sidecar_path
+
+HASHES_SUFFIX = '-hashes.json'
+HASHES_VERSION = 1
+
+# Hex digits kept of each item's SHA-256
+ITEM_HASH_LENGTH = 32
+
+
+def hashes_path(target):
+    """Return the path of the item hashes kept next to an output, e.g. out.jsonld.gz-hashes.json."""
+    return sidecar_path(target, HASHES_SUFFIX)
+
+
+def files_digest(paths, *values):
+    """
+    Return a hex digest of the contents of files and further values.
+
+    Args:
+        paths: Files whose contents are hashed (a missing file counts as empty)
+        values: Further values (options) whose repr is hashed
+
+    Returns:
+        First 16 hex digits of the SHA-256
+    """
+    digest = hashlib.sha256()
+    for path in paths:
+        digest.update(b'\0')
+        path = Path(path)
+        if path.is_file():
+            digest.update(path.read_bytes())
+    for value in values:
+        digest.update(b'\0' + repr(value).encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def item_hash(item, backend):
+    """Return the hash of an item's canonical JSON (see JsonBackend.canonical)."""
+    return hashlib.sha256(backend.canonical(item)).hexdigest()[:ITEM_HASH_LENGTH]
+
+
+def output_stamp(path):
+    """Return the size and modification time that identify an output file."""
+    stat = os.stat(path)
+    return {'bytes': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def load_hashes(path):
+    """Load the hashes saved by save_hashes, or return None if there are none."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def save_hashes(path, output_file, settings, items):
+    """
+    Record the item hashes an output was written from.
+
+    Args:
+        path: Hashes file (see hashes_path)
+        output_file: The output, once complete
+        settings: Dictionary of the versions and options the output depends on
+        items: Dictionary mapping item @id to item_hash
+    """
+    hashes = {
+        'version': HASHES_VERSION,
+        'settings': settings,
+        'output': output_stamp(output_file),
+        'items': items,
+    }
+    temporary = Path(path).with_name(Path(path).name + '.tmp')
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(hashes, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+    os.replace(temporary, path)
+
+
+def stale_reason(hashes, output_file, settings):
+    """
+    Return why saved hashes cannot be used for an output, or None if they can.
+
+    Args:
+        hashes: What load_hashes returned
+        output_file: The previous output
+        settings: The settings of this run
+    """
+    if hashes is None:
+        return 'no item hashes from an earlier run'
+    if hashes.get('version') != HASHES_VERSION:
+        return f"item hashes have version {hashes.get('version')}, expected {HASHES_VERSION}"
+    saved = hashes.get('settings', {})
+    changed = sorted(key for key in settings.keys() | saved.keys() if settings.get(key) != saved.get(key))
+    if changed:
+        return f"{', '.join(changed)} changed since the last run"
+    try:
+        stamp = output_stamp(output_file)
+    except FileNotFoundError:
+        return f"'{output_file}' does not exist"
+    if stamp != hashes.get('output'):
+        return f"'{output_file}' was modified after the item hashes were saved"
+    return None
+
+
+class PreviousOutput:
+    """
+    Items of an earlier output, looked up by @id while it is read once.
+
+    Items read past on the way to the one looked up are kept until they are
+    asked for or discarded.
+    """
+
+    def __init__(self, entries, order):
+        """
+        Args:
+            entries: Iterable of (@id, item) pairs of the output, in order;
+                     the item may be its encoded text
+            order: The @ids of the output's items in the order they were
+                   written (the keys of the saved item hashes)
+        """
+        self._items = iter(entries)
+        self._positions = {item_id: position for position, item_id in enumerate(order)}
+        # Items with an @id read so far
+        self._read = 0
+        self._ahead = {}
+        self._discarded = set()
+
+    def pop(self, item_id):
+        """
+        Return the item with this @id, or None if it is not where it was
+        written (the output does not match the order given).
+        """
+        item = self._ahead.pop(item_id, None)
+        if item is not None:
+            return item
+        position = self._positions.get(item_id, -1)
+        while self._read <= position:
+            entry = next(self._items, None)
+            if entry is None:
+                break
+            other, item = entry
+            if other is None:
+                continue
+            self._read += 1
+            if other == item_id:
+                return item
+            if other in self._discarded:
+                self._discarded.discard(other)
+            else:
+                self._ahead[other] = item
+        return None
+
+    def discard(self, item_id):
+        """Note that the item with this @id will not be asked for."""
+        if self._ahead.pop(item_id, None) is None:
+            self._discarded.add(item_id)
+
+    def close(self):
+        """Stop reading the output, closing its file."""
+        close = getattr(self._items, 'close', None)
+        if close is not None:
+            close()
+        self._ahead.clear()
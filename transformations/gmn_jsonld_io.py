@@ -0,0 +1,803 @@
+#!/usr/bin/env python3
+"""
+Streaming input and output for GMN JSON-LD exports.
+
+Omeka-S exports can be far larger than the memory available to hold them
+alongside their transformed copy. The reader here parses an export
+incrementally and yields one item at a time, and the writer emits each
+transformed item as soon as it is produced, so memory use is bounded by the
+largest single item rather than by the size of the file.
+
+Both are also available for JSON Lines (one item per line), which can be split,
+processed in parallel and concatenated without re-parsing.
+
+Items are encoded through a JsonBackend, which uses the fastest JSON library
+installed (orjson, then ujson) and falls back to the standard library. Set
+GMN_JSON_BACKEND to 'orjson', 'ujson' or 'json' to choose one explicitly.
+
+Paths ending in .gz, .bz2, .xz or .zst are read and written through the
+matching compressor, and compressed input is also recognised by its magic
+bytes whatever its name. Zstandard needs the optional `zstandard` package.
+"""
+
+import bz2
+import gzip
+import importlib
+import io
+import json
+import lzma
+import os
+import re
+from types import SimpleNamespace
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+_NUMBER_TAIL = re.compile(r'[0-9.eE+-]*')
+
+
+class JsonBackend:
+    """
+    A JSON library wrapped behind the calls the readers and writers need.
+
+    dumps(value, indent) returns text: indented like json.dumps(indent=...)
+    when indent is a number, or compact with minimal separators when indent
+    is None. Non-ASCII characters are written as-is. Every backend encodes the
+    same values; only insignificant formatting (such as float exponents) may
+    differ. Values a fast library cannot encode (e.g. integers wider than 64
+    bits) fall back to the standard library.
+
+    canonical(value) returns compact UTF-8 JSON with the keys of every object
+    sorted, so equal values give equal bytes with a given backend (e.g. for
+    content hashes).
+    """
+
+    def __init__(self, name, dumps=None, loads=None, canonical=None):
+        self.name = name
+        self.loads = loads or json.loads
+        self._fast_dumps = dumps
+        self._fast_canonical = canonical
+        self._encoders = {}
+
+    def __repr__(self):
+        return f'<JsonBackend {self.name}>'
+
+    def _stdlib_dumps(self, value, indent):
+        encoder = self._encoders.get(indent)
+        if encoder is None:
+            if indent is None:
+                encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+            else:
+                encoder = json.JSONEncoder(ensure_ascii=False, indent=indent)
+            self._encoders[indent] = encoder
+        return encoder.encode(value)
+
+    def dumps(self, value, indent=None):
+        if self._fast_dumps is not None:
+            try:
+                text = self._fast_dumps(value, indent)
+            except (TypeError, ValueError, OverflowError):
+                text = None
+            if text is not None:
+                return text
+        return self._stdlib_dumps(value, indent)
+
+    def canonical(self, value):
+        if self._fast_canonical is not None:
+            try:
+                return self._fast_canonical(value)
+            except (TypeError, ValueError, OverflowError):
+                pass
+        return json.dumps(value, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+
+
+def _orjson_backend(orjson):
+    options = {None: 0, 2: orjson.OPT_INDENT_2}
+
+    def dumps(value, indent):
+        # orjson only indents by two spaces; other widths use the stdlib
+        if indent not in options:
+            return None
+        return orjson.dumps(value, option=options[indent]).decode('utf-8')
+
+    def canonical(value):
+        return orjson.dumps(value, option=orjson.OPT_SORT_KEYS)
+
+    return JsonBackend('orjson', dumps, orjson.loads, canonical)
+
+
+def _ujson_backend(ujson):
+    def dumps(value, indent):
+        if indent is not None:
+            # ujson's indented layout differs from the stdlib's
+            return None
+        return ujson.dumps(value, ensure_ascii=False, escape_forward_slashes=False)
+
+    def canonical(value):
+        return ujson.dumps(value, ensure_ascii=False, escape_forward_slashes=False, sort_keys=True).encode('utf-8')
+
+    return JsonBackend('ujson', dumps, ujson.loads, canonical)
+
+
+# Fast JSON libraries in order of preference
+_BACKEND_FACTORIES = {
+    'orjson': _orjson_backend,
+    'ujson': _ujson_backend,
+}
+
+_backends = {}
+
+
+def get_backend(name=None):
+    """
+    Return a JsonBackend.
+
+    Args:
+        name: 'orjson', 'ujson' or 'json' (the standard library). If omitted,
+              GMN_JSON_BACKEND is used, or else the fastest library installed.
+
+    Raises:
+        ValueError: If the named backend is unknown
+        ImportError: If the named library is not installed
+    """
+    name = name or os.environ.get('GMN_JSON_BACKEND') or None
+    if name in _backends:
+        return _backends[name]
+    if name is None:
+        for candidate in _BACKEND_FACTORIES:
+            try:
+                backend = get_backend(candidate)
+            except ImportError:
+                continue
+            _backends[None] = backend
+            return backend
+        backend = get_backend('json')
+    elif name == 'json':
+        backend = JsonBackend('json')
+    elif name in _BACKEND_FACTORIES:
+        backend = _BACKEND_FACTORIES[name](importlib.import_module(name))
+    else:
+        raise ValueError(f"Unknown JSON backend '{name}', expected one of json, {', '.join(_BACKEND_FACTORIES)}")
+    _backends[name] = backend
+    return backend
+
+
+COMPRESSION_GZIP = 'gzip'
+COMPRESSION_BZ2 = 'bz2'
+COMPRESSION_XZ = 'xz'
+COMPRESSION_ZSTD = 'zstd'
+COMPRESSION_NONE = 'none'
+
+# Compression: (file extension, magic bytes at the start of the stream)
+COMPRESSIONS = {
+    COMPRESSION_GZIP: ('.gz', b'\x1f\x8b'),
+    COMPRESSION_BZ2: ('.bz2', b'BZh'),
+    COMPRESSION_XZ: ('.xz', b'\xfd7zXZ\x00'),
+    COMPRESSION_ZSTD: ('.zst', b'\x28\xb5\x2f\xfd'),
+}
+
+DEFAULT_BUFFER_SIZE = 1 << 20
+
+
+def detect_compression(path, compression=None, sniff=False):
+    """
+    Return the compression of a file, or None if it is not compressed.
+
+    Args:
+        path: File path (or an object with a `name`)
+        compression: Explicit compression ('gzip', 'bz2', 'xz', 'zstd' or
+                     'none'), returned as is after validation
+        sniff: If True and the extension is not a known one, read the first
+               bytes of an existing file and match them against the magic
+               numbers of the supported formats
+    """
+    if compression:
+        if compression == COMPRESSION_NONE:
+            return None
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression '{compression}', expected one of "
+                             f"{', '.join(COMPRESSIONS)}, {COMPRESSION_NONE}")
+        return compression
+    name = str(getattr(path, 'name', path)).lower()
+    for candidate, (extension, _) in COMPRESSIONS.items():
+        if name.endswith(extension):
+            return candidate
+    if sniff and not hasattr(path, 'read'):
+        try:
+            with open(path, 'rb') as f:
+                head = f.read(8)
+        except (IsADirectoryError, PermissionError):
+            return None
+        for candidate, (_, magic) in COMPRESSIONS.items():
+            if head.startswith(magic):
+                return candidate
+    return None
+
+
+def _open_zstd(path, mode, level):
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(f"Reading or writing '{path}' needs the zstandard package "
+                          "(pip install zstandard)") from None
+    if mode == 'rb':
+        return zstandard.open(path, 'rb')
+    return zstandard.open(path, 'wb', cctx=zstandard.ZstdCompressor(level=3 if level is None else level))
+
+
+def open_text(path, mode='r', compression=None, level=None, buffer_size=None):
+    """
+    Open a UTF-8 text stream, compressed or not.
+
+    Args:
+        path: File path
+        mode: 'r' or 'w'
+        compression: 'gzip', 'bz2', 'xz', 'zstd' or 'none' (default: detected
+                     from the extension, and when reading from the magic bytes)
+        level: Compression level for writing (gzip and bz2 1-9, xz preset
+               0-9, zstd 1-22; default: the library's default, 3 for zstd)
+        buffer_size: Bytes read or written per call to the (de)compressor
+                     and the file (default: 1 MiB)
+
+    Returns:
+        Text file object; closing it closes the underlying file
+    """
+    if mode not in ('r', 'w'):
+        raise ValueError(f"Unsupported mode '{mode}', expected 'r' or 'w'")
+    buffer_size = buffer_size or DEFAULT_BUFFER_SIZE
+    compression = detect_compression(path, compression, sniff=mode == 'r')
+    if compression is None:
+        return open(path, mode, encoding='utf-8', buffering=buffer_size)
+    binary = mode + 'b'
+    if compression == COMPRESSION_GZIP:
+        # mtime=0 keeps the output byte-identical between runs
+        stream = gzip.GzipFile(path, binary, compresslevel=9 if level is None else level, mtime=0)
+    elif compression == COMPRESSION_BZ2:
+        stream = bz2.BZ2File(path, binary, compresslevel=9 if level is None else level)
+    elif compression == COMPRESSION_XZ:
+        stream = lzma.LZMAFile(path, binary, preset=level if mode == 'w' else None)
+    else:
+        stream = _open_zstd(path, binary, level)
+    if mode == 'r':
+        stream = io.BufferedReader(stream, buffer_size)
+    else:
+        stream = io.BufferedWriter(stream, buffer_size)
+    return io.TextIOWrapper(stream, encoding='utf-8')
+
+
+# Input formats recognised by JsonLdReader.kind
+KIND_ARRAY = 'array'   # top-level JSON array of items
+KIND_GRAPH = 'graph'   # top-level object with an @graph array
+KIND_ITEM = 'item'     # a single item object
+
+
+class JsonLdReader:
+    """
+    Incremental reader yielding the items of a JSON-LD export.
+
+    Accepts the same shapes as transform_export: a top-level array of items,
+    an object with an @graph array, or a single item object. Iterating the
+    reader yields the items one at a time. Top-level keys other than @graph
+    (such as @context) are collected in `header` as they are read, so keys
+    placed before @graph are available as soon as the first item is yielded.
+
+    Example:
+        reader = JsonLdReader('omeka_export.json')
+        for item in reader:
+            ...
+        context = reader.header.get('@context')
+    """
+
+    def __init__(self, source, chunk_size=1 << 16, compression=None, buffer_size=None):
+        """
+        Args:
+            source: Path to a JSON-LD file, or an open text file object
+            chunk_size: Number of characters read from the file at a time
+            compression: Compression of the file (default: detected, see open_text)
+            buffer_size: Bytes read from the file and decompressor at a time
+        """
+        self.source = source
+        self.chunk_size = chunk_size
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.header = {}
+        self.kind = None
+        # Number of header keys that precede @graph in the file
+        self.graph_position = None
+        self._file = None
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def __iter__(self):
+        if hasattr(self.source, 'read'):
+            yield from self._read(self.source)
+        else:
+            with open_text(self.source, 'r', self.compression, buffer_size=self.buffer_size) as f:
+                yield from self._read(f)
+
+    def _read(self, f):
+        self._file = f
+        self._skip_whitespace()
+        first = self._peek()
+        if first == '[':
+            self.kind = KIND_ARRAY
+            yield from self._read_array()
+        elif first == '{':
+            yield from self._read_object()
+        else:
+            self._error('Expecting JSON array or object')
+        self._skip_whitespace()
+        if self._peek():
+            self._error('Extra data')
+
+    def _read_object(self):
+        self._pos += 1
+        self._skip_whitespace()
+        if self._peek() == '}':
+            self._pos += 1
+        else:
+            while True:
+                key = self._decode_value()
+                if not isinstance(key, str):
+                    self._error('Expecting property name enclosed in double quotes')
+                self._skip_whitespace()
+                self._expect(':')
+                self._skip_whitespace()
+                if key == '@graph' and self.kind is None:
+                    self.kind = KIND_GRAPH
+                    self.graph_position = len(self.header)
+                    if self._peek() == '[':
+                        yield from self._read_array()
+                    else:
+                        graph = self._decode_value()
+                        yield from graph if isinstance(graph, list) else [graph]
+                else:
+                    self.header[key] = self._decode_value()
+                self._skip_whitespace()
+                if self._peek() == ',':
+                    self._pos += 1
+                    self._skip_whitespace()
+                    continue
+                self._expect('}')
+                break
+        if self.kind is None:
+            # No @graph: the whole object is a single item
+            self.kind = KIND_ITEM
+            item, self.header = self.header, {}
+            yield item
+
+    def _read_array(self):
+        self._pos += 1
+        self._skip_whitespace()
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self._decode_value()
+            self._skip_whitespace()
+            if self._peek() == ',':
+                self._pos += 1
+                self._skip_whitespace()
+                continue
+            self._expect(']')
+            return
+
+    # -- buffer handling -------------------------------------------------
+
+    def _fill(self, size=None):
+        """Read more input, dropping the consumed part of the buffer. Returns False at EOF."""
+        if self._eof:
+            return False
+        chunk = self._file.read(size or self.chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _skip_whitespace(self):
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer) or not self._fill():
+                return
+
+    def _peek(self):
+        if self._pos >= len(self._buffer):
+            self._fill()
+        return self._buffer[self._pos:self._pos + 1]
+
+    def _expect(self, char):
+        if self._peek() != char:
+            self._error(f"Expecting '{char}' delimiter")
+        self._pos += 1
+
+    def _decode_value(self):
+        """Decode the JSON value at the current position, reading more input as needed."""
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill(size):
+                    raise
+            else:
+                # A number running to the end of the buffer may be cut short
+                if (not isinstance(value, (int, float))
+                        or _NUMBER_TAIL.match(self._buffer, end).end() < len(self._buffer)
+                        or not self._fill(size)):
+                    self._pos = end
+                    return value
+            # Grow the reads so a large value is not re-parsed once per chunk
+            size *= 2
+
+    def _error(self, message):
+        raise json.JSONDecodeError(message, self._buffer, self._pos)
+
+
+class JsonLdWriter:
+    """
+    Incremental writer producing the same JSON as json.dump(export, indent=2),
+    or the compact equivalent with indent=None.
+
+    The export's opening (the header keys, e.g. @context, and '"@graph": [')
+    is written with the first item, every item is written as soon as it is
+    passed to write(), and close() writes the closing brackets. The layout is
+    read lazily, so a JsonLdReader can be passed while it is still being read:
+    header keys that only appear after @graph are written after it on close.
+
+    Example:
+        reader = JsonLdReader('omeka_export.json')
+        with JsonLdWriter('output.json', reader) as writer:
+            for item in reader:
+                writer.write(transform_item(item))
+    """
+
+    def __init__(self, target, layout=None, indent=2, backend=None, compression=None,
+                 compression_level=None, buffer_size=None):
+        """
+        Args:
+            target: Output path, or an open text file object
+            layout: Object with `kind` and `header` attributes describing the
+                    export's shape, typically the JsonLdReader the items come
+                    from (default: an @graph export without header keys)
+            indent: Indentation as for json.dump, or None for compact output
+                    on a single line with minimal separators
+            backend: JsonBackend used to encode items (default: get_backend())
+            compression: Compression of the output (default: from the
+                         extension, see open_text)
+            compression_level: Compression level (default: the library's)
+            buffer_size: Bytes passed to the compressor and file at a time
+        """
+        self.target = target
+        self.layout = layout or SimpleNamespace(kind=KIND_GRAPH, header={})
+        self.indent = indent
+        self.backend = backend or get_backend()
+        self.compression = compression
+        self.compression_level = compression_level
+        self.buffer_size = buffer_size
+        self.count = 0
+        self._file = None
+        self._owns_file = False
+        self._kind = None
+        self._written_keys = set()
+        self._closed = False
+        self._separator = ','
+        self._key_separator = ': ' if indent is not None else ':'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        elif self._owns_file and self._file is not None:
+            self._file.close()
+
+    def _pad(self, level):
+        return '\n' + ' ' * (self.indent * level) if self.indent is not None else ''
+
+    def _dumps(self, value, level):
+        text = self.backend.dumps(value, self.indent)
+        return text.replace('\n', self._pad(level)) if self.indent is not None and level else text
+
+    def _header_entries(self, level, limit=None):
+        parts = []
+        for key, value in list(self.layout.header.items())[:limit]:
+            if key not in self._written_keys and key != '@graph':
+                self._written_keys.add(key)
+                key = json.dumps(key, ensure_ascii=False)
+                parts.append(f"{self._pad(level)}{key}{self._key_separator}{self._dumps(value, level)}")
+        return parts
+
+    def _open(self):
+        if self._kind is not None:
+            return
+        if hasattr(self.target, 'write'):
+            self._file = self.target
+        else:
+            self._file = open_text(self.target, 'w', self.compression, self.compression_level, self.buffer_size)
+            self._owns_file = True
+        self._kind = self.layout.kind or KIND_GRAPH
+        if self._kind == KIND_ARRAY:
+            self._file.write('[')
+        elif self._kind == KIND_GRAPH:
+            entries = self._header_entries(1, getattr(self.layout, 'graph_position', None))
+            entries.append(f'{self._pad(1)}"@graph"{self._key_separator}[')
+            self._file.write('{' + self._separator.join(entries))
+
+    def _level(self):
+        kind = self._kind or self.layout.kind or KIND_GRAPH
+        return 0 if kind == KIND_ITEM else 1 if kind == KIND_ARRAY else 2
+
+    def encode(self, item):
+        """
+        Return the text write() writes for an item, for write_encoded().
+        
+        The text only depends on the indent, backend and the layout's kind,
+        so it can be produced by another JsonLdWriter with the same settings,
+        e.g. in a worker process.
+        """
+        return self._dumps(item, self._level())
+
+    def write(self, item):
+        """Write one item."""
+        self.write_encoded(self.encode(item))
+
+    def write_encoded(self, text, item_id=None):
+        """Write an item already encoded by encode() (item_id is accepted for ShardedWriter's sake)."""
+        if self._closed:
+            raise ValueError('Cannot write to a closed JsonLdWriter')
+        self._open()
+        if self._kind == KIND_ITEM:
+            if self.count:
+                raise ValueError('A single-item export can only hold one item')
+            self._file.write(text)
+        else:
+            prefix = self._separator if self.count else ''
+            self._file.write(prefix + self._pad(self._level()) + text)
+        self.count += 1
+
+    def close(self):
+        """Write the closing brackets (and any trailing header keys) and close the output."""
+        if self._closed:
+            return
+        self._open()
+        if self._kind == KIND_ARRAY:
+            self._file.write((self._pad(0) if self.count else '') + ']')
+        elif self._kind == KIND_GRAPH:
+            self._file.write((self._pad(1) if self.count else '') + ']')
+            trailer = self._header_entries(1)
+            self._file.write(''.join(self._separator + entry for entry in trailer) + self._pad(0) + '}')
+        elif not self.count:
+            self._file.write('null')
+        if self._owns_file:
+            self._file.close()
+        else:
+            self._file.flush()
+        self._closed = True
+
+
+class JsonLinesReader:
+    """
+    Reader for JSON Lines (NDJSON) input: one item per line.
+
+    Offers the same interface as JsonLdReader (iteration, `kind`, `header`),
+    so the two can be used interchangeably. Blank lines are skipped. An open
+    file object may be passed to start reading from its current position,
+    e.g. to resume a run at a known byte offset.
+    """
+
+    def __init__(self, source, backend=None, compression=None, buffer_size=None):
+        """
+        Args:
+            source: Path to a .jsonl file, or an open text file object
+            backend: JsonBackend used to decode lines (default: get_backend())
+            compression: Compression of the file (default: detected, see open_text)
+            buffer_size: Bytes read from the file and decompressor at a time
+        """
+        self.source = source
+        self.backend = backend or get_backend()
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.kind = KIND_ARRAY
+        self.header = {}
+        self.graph_position = None
+
+    def __iter__(self):
+        if hasattr(self.source, 'read'):
+            yield from self._read(self.source)
+        else:
+            with open_text(self.source, 'r', self.compression, buffer_size=self.buffer_size) as f:
+                yield from self._read(f)
+
+    def lines(self):
+        """Yield the text of each item, i.e. every non-blank line, without decoding it."""
+        if hasattr(self.source, 'read'):
+            yield from self._lines(self.source)
+        else:
+            with open_text(self.source, 'r', self.compression, buffer_size=self.buffer_size) as f:
+                yield from self._lines(f)
+
+    def _lines(self, f):
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
+    def _read(self, f):
+        loads = self.backend.loads
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                yield loads(line)
+            except ValueError as e:
+                # Fast backends raise their own ValueError subclasses; report
+                # every failure as a JSONDecodeError with the line number
+                try:
+                    json.loads(line)
+                except json.JSONDecodeError as error:
+                    raise json.JSONDecodeError(f"{error.msg} (line {line_number})", error.doc, error.pos) from None
+                raise
+
+
+class JsonLinesWriter:
+    """
+    Writer for JSON Lines (NDJSON) output: one compact item per line.
+
+    Offers the same interface as JsonLdWriter. JSON Lines has no header, so
+    top-level keys of the input such as @context are not written.
+    """
+
+    def __init__(self, target, layout=None, backend=None, compression=None,
+                 compression_level=None, buffer_size=None):
+        """
+        Args:
+            target: Output path, or an open text file object
+            layout: Accepted for interchangeability with JsonLdWriter; unused
+            backend: JsonBackend used to encode items (default: get_backend())
+            compression: Compression of the output (default: from the
+                         extension, see open_text)
+            compression_level: Compression level (default: the library's)
+            buffer_size: Bytes passed to the compressor and file at a time
+        """
+        self.target = target
+        self.layout = layout
+        self.backend = backend or get_backend()
+        self.compression = compression
+        self.compression_level = compression_level
+        self.buffer_size = buffer_size
+        self.count = 0
+        self._file = None
+        self._owns_file = False
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        elif self._owns_file and self._file is not None:
+            self._file.close()
+
+    def _open(self):
+        if self._file is None:
+            if hasattr(self.target, 'write'):
+                self._file = self.target
+            else:
+                self._file = open_text(self.target, 'w', self.compression, self.compression_level,
+                                       self.buffer_size)
+                self._owns_file = True
+
+    def encode(self, item):
+        """Return the text write() writes for an item, for write_encoded() (see JsonLdWriter.encode)."""
+        return self.backend.dumps(item)
+
+    def write(self, item):
+        """Write one item as a line."""
+        self.write_encoded(self.backend.dumps(item))
+
+    def write_encoded(self, text, item_id=None):
+        """Write an item already encoded by encode()."""
+        if self._closed:
+            raise ValueError('Cannot write to a closed JsonLinesWriter')
+        self._open()
+        self._file.write(text + '\n')
+        self.count += 1
+
+    def close(self):
+        """Close the output (an empty file is created if nothing was written)."""
+        if self._closed:
+            return
+        self._open()
+        if self._owns_file:
+            self._file.close()
+        else:
+            self._file.flush()
+        self._closed = True
+
+
+FORMAT_JSON = 'json'
+FORMAT_JSONL = 'jsonl'
+FORMAT_NTRIPLES = 'nt'
+FORMAT_NQUADS = 'nq'
+FORMAT_TURTLE = 'ttl'
+FORMAT_TRIPLES = 'triples'
+FORMAT_NPY = 'npy'
+FORMAT_ARROW = 'arrow'
+# Formats items can be read from; RDF formats are output only (see gmn_rdf_writers)
+INPUT_FORMATS = (FORMAT_JSON, FORMAT_JSONL)
+FORMATS = INPUT_FORMATS + (FORMAT_NTRIPLES, FORMAT_NQUADS, FORMAT_TURTLE, FORMAT_TRIPLES, FORMAT_NPY,
+                           FORMAT_ARROW)
+
+# File extensions recognised when no format is given; anything else is JSON
+FORMAT_EXTENSIONS = {
+    '.jsonl': FORMAT_JSONL,
+    '.ndjson': FORMAT_JSONL,
+    '.nt': FORMAT_NTRIPLES,
+    '.nq': FORMAT_NQUADS,
+    '.ttl': FORMAT_TURTLE,
+    '.triples': FORMAT_TRIPLES,
+    '.arrow': FORMAT_ARROW,
+}
+
+
+def detect_format(path, format=None):
+    """
+    Return the format to use for a file: the explicit format if given,
+    otherwise 'jsonl' for .jsonl/.ndjson files, 'nt' for .nt, 'nq' for .nq,
+    'ttl' for .ttl, 'triples' for .triples, 'arrow' for .arrow and 'json' for
+    anything else. The 'npy' format (a directory) is only used when given. A
+    compression extension is ignored, so items.jsonl.gz is JSON Lines.
+    """
+    if format:
+        if format not in FORMATS:
+            raise ValueError(f"Unknown format '{format}', expected one of {', '.join(FORMATS)}")
+        return format
+    name = str(getattr(path, 'name', path)).lower()
+    for extension, _ in COMPRESSIONS.values():
+        if name.endswith(extension):
+            name = name[:-len(extension)]
+            break
+    return FORMAT_EXTENSIONS.get(os.path.splitext(name)[1], FORMAT_JSON)
+
+
+def open_reader(source, format=None, backend=None, compression=None, buffer_size=None):
+    """Create the item reader for a JSON-LD or JSON Lines input, compressed or not."""
+    format = detect_format(source, format)
+    if format not in INPUT_FORMATS:
+        raise ValueError(f"Cannot read items from '{format}' files, expected one of {', '.join(INPUT_FORMATS)}")
+    if format == FORMAT_JSONL:
+        return JsonLinesReader(source, backend, compression, buffer_size)
+    return JsonLdReader(source, compression=compression, buffer_size=buffer_size)
+
+
+def open_writer(target, format=None, layout=None, indent=2, backend=None, compression=None,
+                compression_level=None, buffer_size=None, graph=None):
+    """
+    Create the item writer for a JSON-LD, JSON Lines, N-Triples, N-Quads,
+    Turtle, binary triple file or columnar output, compressed or not (except
+    the binary and columnar formats). graph names the single N-Quads graph
+    (default: one graph per item).
+    """
+    format = detect_format(target, format)
+    if format in (FORMAT_NTRIPLES, FORMAT_NQUADS, FORMAT_TURTLE):
+        # Imported here: the RDF writers build on this module
+        from gmn_rdf_writers import NQuadsWriter, NTriplesWriter, TurtleWriter
+        if format == FORMAT_NQUADS:
+            return NQuadsWriter(target, layout, compression, compression_level, buffer_size, graph)
+        if format == FORMAT_TURTLE:
+            return TurtleWriter(target, layout, compression, compression_level, buffer_size)
+        if format == FORMAT_NTRIPLES:
+            return NTriplesWriter(target, layout, compression, compression_level, buffer_size)
+    if format == FORMAT_TRIPLES:
+        from gmn_triple_store import TripleStoreWriter
+        return TripleStoreWriter(target, layout)
+    if format in (FORMAT_NPY, FORMAT_ARROW):
+        from gmn_columnar_export import ColumnarWriter
+        return ColumnarWriter(target, layout, format)
+    if format == FORMAT_JSONL:
+        return JsonLinesWriter(target, layout, backend, compression, compression_level, buffer_size)
+    return JsonLdWriter(target, layout, indent, backend, compression, compression_level, buffer_size)
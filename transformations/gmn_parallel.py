@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Process-pool helpers for transforming items on several cores.
+
+Items are independent, so a transformation is split into chunks that worker
+processes handle one at a time. The chunks travel as JSON text (one array
+per chunk), which is cheaper to send to a process and rebuild there than
+pickled dictionaries, and results are handed back in input order however
+the workers finish.
+
+The number of items per chunk adapts to the size of the items seen so far:
+each chunk aims at target_bytes of JSON, so a collection of small records
+is sent in large chunks (amortising the cost of a round trip) while large
+items do not make a chunk, or the memory held by the pool, balloon.
+
+Example:
+    chunks = json_chunks(backend.dumps(item) for item in reader)
+    for results in ordered_map(transform_chunk, chunks, workers=8):
+        ...
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# JSON text aimed at per chunk
+DEFAULT_CHUNK_BYTES = 1 << 20
+# Items in the first chunk, before any size is known
+FIRST_CHUNK_ITEMS = 64
+MAX_CHUNK_ITEMS = 10000
+
+
+def default_workers():
+    """Return the number of CPUs this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def json_chunks(texts, target_bytes=DEFAULT_CHUNK_BYTES, first_items=FIRST_CHUNK_ITEMS, max_items=MAX_CHUNK_ITEMS):
+    """
+    Group JSON texts into chunks of about target_bytes.
+
+    Args:
+        texts: Iterable of the JSON text of each item
+        target_bytes: Characters of JSON aimed at per chunk
+        first_items: Items in the first chunk
+        max_items: Upper bound on the items in a chunk
+
+    Yields:
+        Each chunk as the text of a JSON array
+    """
+    size = first_items
+    total_items = total_chars = 0
+    chunk = []
+    chars = 0
+    for text in texts:
+        chunk.append(text)
+        chars += len(text)
+        if len(chunk) >= size:
+            yield '[' + ','.join(chunk) + ']'
+            total_items += len(chunk)
+            total_chars += chars
+            # Size the next chunk from the average item size so far
+            size = max(1, min(max_items, int(target_bytes * total_items / max(total_chars, 1))))
+            chunk = []
+            chars = 0
+    if chunk:
+        yield '[' + ','.join(chunk) + ']'
+
+
+def ordered_map(function, chunks, workers=None, max_pending=None):
+    """
+    Apply function to each chunk in worker processes, yielding the results in input order.
+
+    At most max_pending chunks are submitted ahead of the one being waited
+    for, so a large input is read at the pace the workers process it. An
+    exception raised by function is raised here, for its chunk.
+
+    Args:
+        function: Picklable callable (a module-level function or a
+                  functools.partial of one) taking a chunk
+        chunks: Iterable of chunks
+        workers: Number of processes (default: default_workers())
+        max_pending: Chunks in flight (default: twice the workers)
+
+    Yields:
+        function(chunk) for each chunk
+    """
+    workers = workers or default_workers()
+    max_pending = max_pending or 2 * workers
+    pending = deque()
+    with ProcessPoolExecutor(workers) as pool:
+        try:
+            for chunk in chunks:
+                pending.append(pool.submit(function, chunk))
+                if len(pending) >= max_pending:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Threaded read -> transform -> write pipeline with bounded queues.
+
+Reading (parsing and decompression), transforming and writing (encoding,
+compression and disk writes) otherwise run strictly one after the other.
+Pipeline runs them as stages connected by bounded queues: a reader thread,
+one or more transform threads and the write stage in the calling thread.
+Work that releases the GIL, such as zlib, bz2 and lzma (de)compression and
+file I/O, then overlaps with the transformation. Items travel in batches to
+keep the cost of the queues low, and a full queue blocks the stage feeding
+it, so memory stays bounded however unbalanced the stages are. Items are
+written in input order whatever the number of transform threads.
+
+Each stage measures the time it spends working and waiting on its queues;
+the stage with the lowest throughput is the bottleneck. Working time is
+wall-clock time, so it includes time spent waiting for the GIL held by
+another stage: with fewer free cores than stages the figures overlap.
+
+Example:
+    pipeline = Pipeline(transform_item)
+    with open_writer('output.json', reader) as writer:
+        pipeline.run(reader, writer.write)
+    for stats in pipeline.stats:
+        print(stats)
+"""
+
+import queue
+import threading
+import time
+from itertools import islice
+
+DEFAULT_BATCH_SIZE = 256
+DEFAULT_QUEUE_SIZE = 8
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+class StageStats:
+    """Time spent by a pipeline stage working and waiting, summed over its threads."""
+
+    def __init__(self, name, threads=1):
+        self.name = name
+        self.threads = threads
+        self.items = 0
+        self.busy = 0.0
+        self.waited = 0.0
+
+    @property
+    def rate(self):
+        """Items per second of work by each thread of the stage (None before any work)."""
+        busy = self.busy / self.threads
+        return self.items / busy if busy > 0 else None
+
+    def __str__(self):
+        threads = f' ({self.threads} threads)' if self.threads > 1 else ''
+        rate = f'{self.rate:.0f} items/s' if self.rate else '- items/s'
+        return (f'{self.name}{threads}: {self.items} items, {self.busy:.2f}s busy ({rate}), '
+                f'{self.waited:.2f}s waiting')
+
+
+class _Aborted(Exception):
+    """Raised in a stage when another stage has failed."""
+
+
+class Pipeline:
+    """
+    Runs reading, a transformation and writing of items as concurrent stages.
+    """
+
+    def __init__(self, transform, threads=1, batch_size=DEFAULT_BATCH_SIZE, queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        Args:
+            transform: Function returning the transformed version of an item
+            threads: Number of transform threads
+            batch_size: Items passed between stages at a time
+            queue_size: Batches each queue holds before its producer waits
+        """
+        if threads < 1:
+            raise ValueError('A pipeline needs at least one transform thread')
+        self.transform = transform
+        self.threads = threads
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.stats = []
+        self._abort = threading.Event()
+        self._errors = []
+
+    @property
+    def bottleneck(self):
+        """The StageStats of the slowest stage of the last run."""
+        rated = [stats for stats in self.stats if stats.rate]
+        return min(rated, key=lambda stats: stats.rate) if rated else None
+
+    def _put(self, target, value, stats):
+        start = time.perf_counter()
+        while True:
+            if self._abort.is_set():
+                raise _Aborted()
+            try:
+                target.put(value, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        stats.waited += time.perf_counter() - start
+
+    def _get(self, source, stats):
+        start = time.perf_counter()
+        while True:
+            if self._abort.is_set():
+                raise _Aborted()
+            try:
+                value = source.get(timeout=0.1)
+                break
+            except queue.Empty:
+                continue
+        stats.waited += time.perf_counter() - start
+        return value
+
+    def _fail(self, error):
+        self._errors.append(error)
+        self._abort.set()
+
+    def _read(self, items, output, stats):
+        try:
+            iterator = iter(items)
+            number = 0
+            while True:
+                start = time.perf_counter()
+                batch = list(islice(iterator, self.batch_size))
+                stats.busy += time.perf_counter() - start
+                if not batch:
+                    break
+                stats.items += len(batch)
+                self._put(output, (number, batch), stats)
+                number += 1
+            for _ in range(self.threads):
+                self._put(output, _DONE, stats)
+        except _Aborted:
+            pass
+        except BaseException as e:
+            self._fail(e)
+
+    def _transform(self, source, output, stats):
+        try:
+            transform = self.transform
+            while True:
+                batch = self._get(source, stats)
+                if batch is _DONE:
+                    break
+                number, items = batch
+                start = time.perf_counter()
+                results = [transform(item) for item in items]
+                stats.busy += time.perf_counter() - start
+                stats.items += len(results)
+                self._put(output, (number, results), stats)
+            self._put(output, _DONE, stats)
+        except _Aborted:
+            pass
+        except BaseException as e:
+            self._fail(e)
+
+    def run(self, items, write):
+        """
+        Transform items and pass them to write, in input order.
+
+        Args:
+            items: Iterable of items, read in the reader thread
+            write: Function called with each transformed item, in this thread
+
+        Returns:
+            Number of items written
+
+        Raises:
+            The first exception raised by any stage
+        """
+        read_stats = StageStats('read')
+        transform_stats = StageStats('transform', self.threads)
+        write_stats = StageStats('write')
+        self.stats = [read_stats, transform_stats, write_stats]
+        self._abort.clear()
+        self._errors = []
+        read_queue = queue.Queue(self.queue_size)
+        write_queue = queue.Queue(self.queue_size)
+        # One StageStats per transform thread, summed once they have finished
+        thread_stats = [StageStats('transform') for _ in range(self.threads)]
+        threads = [threading.Thread(target=self._read, args=(items, read_queue, read_stats),
+                                    name='pipeline-read', daemon=True)]
+        threads += [threading.Thread(target=self._transform, args=(read_queue, write_queue, stats),
+                                     name=f'pipeline-transform-{n}', daemon=True)
+                    for n, stats in enumerate(thread_stats, 1)]
+        for thread in threads:
+            thread.start()
+
+        # Batches can arrive out of order from several transform threads
+        pending = {}
+        next_number = 0
+        remaining = self.threads
+        try:
+            while remaining:
+                batch = self._get(write_queue, write_stats)
+                if batch is _DONE:
+                    remaining -= 1
+                    continue
+                pending[batch[0]] = batch[1]
+                start = time.perf_counter()
+                while next_number in pending:
+                    results = pending.pop(next_number)
+                    for item in results:
+                        write(item)
+                    write_stats.items += len(results)
+                    next_number += 1
+                write_stats.busy += time.perf_counter() - start
+        except _Aborted:
+            pass
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for thread in threads:
+                thread.join()
+            for stats in thread_stats:
+                transform_stats.busy += stats.busy
+                transform_stats.items += stats.items
+                transform_stats.waited += stats.waited
+        if self._errors:
+            raise self._errors[0]
+        return write_stats.items
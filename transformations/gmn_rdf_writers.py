@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+"""
+RDF serializations of transformed GMN items, written without rdflib.
+
+The transformed items are JSON-LD whose keys are cidoc:/gmn: CURIEs, so they
+can be turned into RDF directly: TripleEncoder walks an item dict, expands
+each CURIE through a precomputed prefix table and produces the triples of the
+item and its embedded nodes as N-Triples terms. The writers here share the
+interface of JsonLdWriter (write(item), close(), count) and write one item at
+a time:
+
+    NTriplesWriter  one triple per line (.nt)
+    NQuadsWriter    one quad per line, in a named graph per item (.nq)
+    TurtleWriter    prefixed, subject-grouped Turtle (.ttl)
+
+Each N-Triples and N-Quads line is a complete statement, so the output can
+be split at any line and loaded in parallel.
+
+Conversion follows JSON-LD to RDF for the shapes the transformation produces:
+keys that do not expand to an absolute IRI (such as Omeka's 'type' or
+'property_id') are dropped, @value objects become literals, @list objects
+become RDF collections, and nodes without an @id become blank nodes.
+"""
+
+import re
+
+from gmn_jsonld_io import open_text
+from gmn_rule_compiler import CURIE_PREFIXES, OWL, RDF, RDFS
+
+XSD = 'http://www.w3.org/2001/XMLSchema#'
+
+# Prefixes available even when the export's @context is a remote URL, as in
+# Omeka-S API output
+DEFAULT_PREFIXES = {
+    **CURIE_PREFIXES,
+    'o': 'http://omeka.org/s/vocabs/o#',
+    'rdf': RDF,
+    'rdfs': RDFS,
+    'owl': OWL,
+    'xsd': XSD,
+    'dcterms': 'http://purl.org/dc/terms/',
+    'foaf': 'http://xmlns.com/foaf/0.1/',
+    'skos': 'http://www.w3.org/2004/02/skos/core#',
+    'bibo': 'http://purl.org/ontology/bibo/',
+    'o-cnt': 'http://www.w3.org/2011/content#',
+    'o-time': 'http://www.w3.org/2006/time#',
+}
+
+RDF_TYPE = f'<{RDF}type>'
+RDF_FIRST = f'<{RDF}first>'
+RDF_REST = f'<{RDF}rest>'
+RDF_NIL = f'<{RDF}nil>'
+XSD_STRING = f'{XSD}string'
+
+# Datatypes of JSON numbers and booleans, as in JSON-LD to RDF
+_NATIVE_DATATYPES = {
+    bool: f'<{XSD}boolean>',
+    int: f'<{XSD}integer>',
+    float: f'<{XSD}double>',
+}
+
+_LITERAL_ESCAPES = str.maketrans({'\\': '\\\\', '"': '\\"', '\n': '\\n', '\r': '\\r'})
+_IRI_UNSAFE = re.compile(r'[\x00-\x20<>"{}|^`\\]')
+_SCHEME = re.compile(r'[A-Za-z][A-Za-z0-9+.-]*$')
+_WEB_SCHEMES = ('http://', 'https://')
+
+
+def _escape_iri_char(match):
+    return f'\\u{ord(match.group()):04X}'
+
+
+def iri_term(iri):
+    """Return an absolute IRI as an N-Triples term, escaping characters IRIs may not contain."""
+    if _IRI_UNSAFE.search(iri):
+        iri = _IRI_UNSAFE.sub(_escape_iri_char, iri)
+    return f'<{iri}>'
+
+
+def literal_term(value, datatype=None, language=None):
+    """Return an N-Triples literal; datatype is an N-Triples IRI term."""
+    text = f'"{value.translate(_LITERAL_ESCAPES)}"'
+    if language:
+        return f'{text}@{language}'
+    if datatype and datatype != f'<{XSD_STRING}>':
+        return f'{text}^^{datatype}'
+    return text
+
+
+def native_literal(value):
+    """Return the literal for a JSON string, number or boolean."""
+    if isinstance(value, str):
+        return literal_term(value)
+    if isinstance(value, bool):
+        return literal_term('true' if value else 'false', _NATIVE_DATATYPES[bool])
+    if isinstance(value, float) and (not value.is_integer() or abs(value) >= 1e21):
+        # Canonical xsd:double, e.g. 2.5E3
+        mantissa, exponent = f'{value:.15E}'.split('E')
+        mantissa = mantissa.rstrip('0')
+        if mantissa.endswith('.'):
+            mantissa += '0'
+        return literal_term(f'{mantissa}E{int(exponent)}', _NATIVE_DATATYPES[float])
+    return literal_term(str(int(value)), _NATIVE_DATATYPES[int])
+
+
+def context_prefixes(context):
+    """
+    Collect prefix and term definitions from a JSON-LD @context.
+
+    Args:
+        context: The @context value: a dictionary, a list of contexts, or a
+                 remote URL string (which contributes nothing)
+
+    Returns:
+        Dictionary mapping each prefix or term to its IRI
+    """
+    prefixes = {}
+    for entry in context if isinstance(context, list) else [context]:
+        if not isinstance(entry, dict):
+            continue
+        for key, value in entry.items():
+            if key.startswith('@'):
+                continue
+            if isinstance(value, dict):
+                value = value.get('@id')
+            if isinstance(value, str):
+                prefixes[key] = value
+    return prefixes
+
+
+class PrefixTable:
+    """
+    Expands CURIEs and terms to absolute IRIs.
+
+    Expansions are cached as formatted N-Triples terms, since the same few
+    hundred property and class names make up most of the keys in an export.
+    """
+
+    def __init__(self, context=None, prefixes=None):
+        """
+        Args:
+            context: The export's @context; its definitions override the defaults
+            prefixes: Base prefix table (default: DEFAULT_PREFIXES)
+        """
+        self.prefixes = dict(DEFAULT_PREFIXES if prefixes is None else prefixes)
+        self.prefixes.update(context_prefixes(context))
+        # Resolve definitions that are themselves CURIEs, e.g. "name": "foaf:name"
+        for key, value in self.prefixes.items():
+            self.prefixes[key] = self.expand(value, vocab=False) or value
+        self._terms = {}
+
+    def expand(self, value, vocab=True):
+        """
+        Return the absolute IRI for a CURIE, term or IRI, or None if it has none.
+
+        Args:
+            value: Compact or absolute IRI
+            vocab: If True, a bare term (no colon) is looked up as a defined
+                   term, as for keys and @type values; otherwise bare values
+                   are relative IRIs and have no expansion
+        """
+        prefix, colon, suffix = value.partition(':')
+        if not colon:
+            return self.prefixes.get(value) if vocab else None
+        if prefix == '_':
+            return None
+        if not suffix.startswith('//') and prefix in self.prefixes:
+            return self.prefixes[prefix] + suffix
+        return value if _SCHEME.match(prefix) else None
+
+    def term(self, value):
+        """Return the N-Triples IRI term for a key or @type value (cached), or None."""
+        try:
+            return self._terms[value]
+        except KeyError:
+            iri = self.expand(value)
+            term = iri_term(iri) if iri is not None else None
+            self._terms[value] = term
+            return term
+
+    def node(self, value):
+        """Return the N-Triples term for an @id value (not cached), or None."""
+        if value.startswith(_WEB_SCHEMES):
+            # Never a CURIE, since the suffix starts with '//'
+            return iri_term(value)
+        if value.startswith('_:'):
+            return value
+        iri = self.expand(value, vocab=False)
+        return iri_term(iri) if iri is not None else None
+
+
+class TripleEncoder:
+    """
+    Turns transformed items into triples of N-Triples terms.
+
+    Example:
+        encoder = TripleEncoder(export['@context'])
+        for subject, predicate, obj in encoder.triples(transform_item(item)):
+            ...
+    """
+
+    def __init__(self, context=None, blank_prefix='b'):
+        """
+        Args:
+            context: The export's @context, for its prefix definitions
+            blank_prefix: Prefix of generated blank node labels, which are
+                          numbered from 1 for each encoder
+        """
+        self.table = PrefixTable(context)
+        self.blank_prefix = blank_prefix
+        self.blank_count = 0
+        # Keys and @id values that had no absolute IRI and were dropped
+        self.dropped = 0
+
+    def blank(self):
+        """Return a new blank node label."""
+        self.blank_count += 1
+        return f'_:{self.blank_prefix}{self.blank_count}'
+
+    def triples(self, item):
+        """Return the list of (subject, predicate, object) triples of an item."""
+        triples = []
+        self._node(item, triples)
+        return triples
+
+    def _node(self, node, triples):
+        """Add the triples of a node object; return its subject term."""
+        table = self.table
+        node_id = node.get('@id')
+        subject = table.node(node_id) if isinstance(node_id, str) else None
+        if subject is None:
+            if node_id is not None:
+                self.dropped += 1
+            subject = self.blank()
+        terms = table._terms
+        append = triples.append
+        for key, value in node.items():
+            predicate = terms.get(key)
+            if predicate is not None:
+                # Fast path for properties seen before
+                for element in value if isinstance(value, list) else (value,):
+                    if element.__class__ is str:
+                        append((subject, predicate, literal_term(element)))
+                    elif isinstance(element, dict) and '@id' in element and '@set' not in element:
+                        append((subject, predicate, self._node(element, triples)))
+                    else:
+                        self._append_values(subject, predicate, (element,), triples)
+                continue
+            if key == '@type':
+                for type_name in value if isinstance(value, list) else (value,):
+                    type_term = table.term(type_name) if isinstance(type_name, str) else None
+                    if type_term is None:
+                        self.dropped += 1
+                    else:
+                        triples.append((subject, RDF_TYPE, type_term))
+                continue
+            if key.startswith('@'):
+                continue
+            predicate = table.term(key)
+            if predicate is not None:
+                self._append_values(subject, predicate, value if isinstance(value, list) else (value,), triples)
+        return subject
+
+    def _append_values(self, subject, predicate, values, triples):
+        """Add a triple for each value of a property, expanding @set objects."""
+        for element in values:
+            if isinstance(element, dict) and '@set' in element:
+                elements = element['@set']
+                self._append_values(subject, predicate, elements if isinstance(elements, list) else (elements,),
+                                    triples)
+                continue
+            obj = self._object(element, triples)
+            if obj is not None:
+                triples.append((subject, predicate, obj))
+
+    def _object(self, value, triples):
+        """Return the term for a property value, adding the triples of any embedded node."""
+        if isinstance(value, dict):
+            if '@value' in value:
+                literal = value['@value']
+                if literal is None:
+                    return None
+                if not isinstance(literal, str):
+                    return native_literal(literal)
+                datatype = value.get('@type')
+                return literal_term(literal, self.table.term(datatype) if isinstance(datatype, str) else None,
+                                    value.get('@language'))
+            if '@list' in value:
+                return self._list(value['@list'], triples)
+            return self._node(value, triples)
+        if value is None:
+            return None
+        return native_literal(value)
+
+    def _list(self, values, triples):
+        """Add an RDF collection for a @list; return its head."""
+        head = RDF_NIL
+        previous = None
+        for element in values:
+            obj = self._object(element, triples)
+            if obj is None:
+                continue
+            cell = self.blank()
+            if previous is None:
+                head = cell
+            else:
+                triples.append((previous, RDF_REST, cell))
+            triples.append((cell, RDF_FIRST, obj))
+            previous = cell
+        if previous is not None:
+            triples.append((previous, RDF_REST, RDF_NIL))
+        return head
+
+
+class NTriplesWriter:
+    """
+    Writes transformed items as N-Triples, one triple per line.
+
+    Offers the same interface as JsonLdWriter. Prefixes come from the @context
+    in the layout's header (read at the first write) on top of
+    DEFAULT_PREFIXES.
+
+    Example:
+        reader = open_reader('omeka_export.json')
+        with NTriplesWriter('output.nt.gz', reader) as writer:
+            for item in reader:
+                writer.write(transform_item(item))
+    """
+
+    def __init__(self, target, layout=None, compression=None, compression_level=None, buffer_size=None):
+        """
+        Args:
+            target: Output path, or an open text file object
+            layout: Object with a `header` attribute holding the export's
+                    @context, typically the reader the items come from
+            compression: Compression of the output (default: from the
+                         extension, see open_text)
+            compression_level: Compression level (default: the library's)
+            buffer_size: Bytes passed to the compressor and file at a time
+        """
+        self.target = target
+        self.layout = layout
+        self.compression = compression
+        self.compression_level = compression_level
+        self.buffer_size = buffer_size
+        self.count = 0
+        self.triple_count = 0
+        self.encoder = None
+        self._file = None
+        self._owns_file = False
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        elif self._owns_file and self._file is not None:
+            self._file.close()
+
+    def _open(self):
+        if self._file is not None:
+            return
+        header = getattr(self.layout, 'header', None) or {}
+        self.encoder = TripleEncoder(header.get('@context'))
+        if hasattr(self.target, 'write'):
+            self._file = self.target
+        else:
+            self._file = open_text(self.target, 'w', self.compression, self.compression_level, self.buffer_size)
+            self._owns_file = True
+
+    def _lines(self, item, triples):
+        return ''.join(f'{subject} {predicate} {obj} .\n' for subject, predicate, obj in triples)
+
+    def write(self, item):
+        """Write the triples of one item."""
+        if self._closed:
+            raise ValueError(f'Cannot write to a closed {type(self).__name__}')
+        self._open()
+        triples = self.encoder.triples(item)
+        self._file.write(self._lines(item, triples))
+        self.count += 1
+        self.triple_count += len(triples)
+
+    def close(self):
+        """Close the output (an empty file is created if nothing was written)."""
+        if self._closed:
+            return
+        self._open()
+        if self._owns_file:
+            self._file.close()
+        else:
+            self._file.flush()
+        self._closed = True
+
+
+class NQuadsWriter(NTriplesWriter):
+    """
+    Writes transformed items as N-Quads.
+
+    By default the triples of each item go into a named graph named after the
+    item's @id, so a changed item can be replaced in a store by dropping its
+    graph. Items without an IRI @id go into the default graph.
+    """
+
+    def __init__(self, target, layout=None, compression=None, compression_level=None, buffer_size=None,
+                 graph=None):
+        """
+        Args:
+            graph: IRI of a single graph for all items, instead of one per item
+            (other arguments as for NTriplesWriter)
+        """
+        super().__init__(target, layout, compression, compression_level, buffer_size)
+        self.graph = graph
+
+    def _lines(self, item, triples):
+        if self.graph is not None:
+            graph = iri_term(self.graph)
+        else:
+            item_id = item.get('@id')
+            graph = self.encoder.table.node(item_id) if isinstance(item_id, str) else None
+            if graph is not None and graph.startswith('_:'):
+                graph = None
+        if graph is None:
+            return super()._lines(item, triples)
+        return ''.join(f'{subject} {predicate} {obj} {graph} .\n' for subject, predicate, obj in triples)
+
+
+# Local parts that can be written as prefix:local without escaping
+_LOCAL_NAME = re.compile(r'[A-Za-z0-9_](?:[A-Za-z0-9_.-]*[A-Za-z0-9_-])?$')
+_PREFIX_NAME = re.compile(r'[A-Za-z](?:[A-Za-z0-9_.-]*[A-Za-z0-9_-])?$')
+_DATATYPE = re.compile(r'^(".*")\^\^<([^<>]*)>$', re.DOTALL)
+
+
+class TurtleWriter(NTriplesWriter):
+    """
+    Writes transformed items as Turtle, in the layout of gmn_ontology.ttl.
+
+    The @prefix lines are written once at the start, from the same prefix
+    table used to expand the items. Each item is then written as it arrives:
+    its triples are grouped by subject, the item first and each embedded node
+    as a subject block of its own (nodes keep their minted IRIs, so no [ ]
+    blank node syntax is needed), with 'a' first, one predicate per line and
+    repeated objects separated by commas. Only one item is held in memory at
+    a time; a node referenced from several items gets a block in each, which
+    Turtle parsers merge.
+    """
+
+    def _open(self):
+        if self._file is not None:
+            return
+        super()._open()
+        table = self.encoder.table
+        self._namespaces = {}
+        lines = []
+        for prefix, namespace in table.prefixes.items():
+            if (_PREFIX_NAME.match(prefix) and namespace.endswith(('/', '#'))
+                    and namespace not in self._namespaces):
+                self._namespaces[namespace] = prefix
+                lines.append(f'@prefix {prefix}: {iri_term(namespace)} .\n')
+        self._file.write(''.join(lines) + '\n')
+        self._compact_terms = {}
+
+    def _compact_iri(self, term):
+        """Return prefix:local for an IRI term in a known namespace, or the term unchanged."""
+        iri = term[1:-1]
+        split = max(iri.rfind('/'), iri.rfind('#')) + 1
+        prefix = self._namespaces.get(iri[:split])
+        if prefix is not None and _LOCAL_NAME.match(iri[split:]):
+            return f'{prefix}:{iri[split:]}'
+        return term
+
+    def _compact(self, term):
+        """Compact an IRI term or the datatype of a literal term."""
+        first = term[0]
+        if first == '<':
+            return self._compact_iri(term)
+        if first == '"' and term.endswith('>'):
+            match = _DATATYPE.match(term)
+            if match:
+                return f'{match.group(1)}^^{self._compact_iri("<" + match.group(2) + ">")}'
+        return term
+
+    def _compact_vocabulary(self, term):
+        """Compact a predicate or class term, caching the result."""
+        try:
+            return self._compact_terms[term]
+        except KeyError:
+            compact = 'a' if term == RDF_TYPE else self._compact_iri(term)
+            self._compact_terms[term] = compact
+            return compact
+
+    def _lines(self, item, triples):
+        # subject -> predicate -> objects, in order of first appearance
+        subjects = {}
+        for subject, predicate, obj in triples:
+            predicates = subjects.setdefault(subject, {})
+            if predicate == RDF_TYPE:
+                obj = self._compact_vocabulary(obj)
+            else:
+                obj = self._compact(obj)
+            objects = predicates.setdefault(predicate, [])
+            if obj not in objects:
+                objects.append(obj)
+
+        blocks = []
+        for subject, predicates in subjects.items():
+            if RDF_TYPE in predicates:
+                predicates = {RDF_TYPE: predicates.pop(RDF_TYPE), **predicates}
+            statements = ' ;\n    '.join(f'{self._compact_vocabulary(predicate)} {", ".join(objects)}'
+                                         for predicate, objects in predicates.items())
+            blocks.append(f'{self._compact(subject)}\n    {statements} .\n\n')
+        return ''.join(blocks)
@@ -0,0 +1,925 @@
+#!/usr/bin/env python3
+"""
+Compile the GMN-to-CIDOC mapping spec into Python transformation rules.
+
+Each shortcut property in gmn_cidoc_mapping.json declares the CIDOC-CRM path it
+stands for. This module turns those declarations into plain Python source, one
+function per property, so that no path is interpreted while items are being
+transformed. The generated source is executed by gmn_to_cidoc_transform.py.
+
+Generated rules take the item's TransformContext (see gmn_to_cidoc_transform.py),
+which caches the named nodes an item has resolved and indexes the @ids of the
+lists rules append to.
+
+Path syntax:
+    @name            a named intermediate node from the spec's "nodes" section
+                     (created on first use through a generated resolve_* function
+                     and cached on the context afterwards)
+    prefix:Pxx       a single-valued property
+    prefix:Pxx[]     a list-valued property (targets are appended)
+    prefix:Pxx[0]    the first entry of a list-valued property
+    prefix:Exx       the class of the node reached by the preceding property
+
+Rule kinds:
+    link     every value is a reference appended (or set) at the end of the path;
+             appends skip @ids already in the list, adding the @type of the
+             repeated entry to the one there
+    literal  every value is a string stored at the end of the path
+    node     every value gets its own minted node appended at the end of the path
+
+A link or literal rule with "multiple": true keeps every distinct value set on
+a single-valued property (a second one turns it into a list, see
+TransformContext.set_value); other rules keep the last value set.
+
+When ontology files are given, the rdfs:domain of each shortcut property and
+the rdfs:subClassOf hierarchy are read from them to build per-@type execution
+plans (TYPE_PLANS), so that an item only runs the rules its classes allow.
+"""
+
+import hashlib
+import importlib.util
+import json
+import marshal
+import os
+import re
+import sys
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+
+VALUE_MODES = ('entity', 'as_given', 'iri')
+
+RDF = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
+RDFS = 'http://www.w3.org/2000/01/rdf-schema#'
+OWL = 'http://www.w3.org/2002/07/owl#'
+
+# Namespaces abbreviated to the CURIEs used in the mapping spec and item data
+CURIE_PREFIXES = {
+    'cidoc': 'http://www.cidoc-crm.org/cidoc-crm/',
+    'gmn': 'http://www.genoesemerchantnetworks.com/ontology#',
+}
+
+_TURTLE_TOKEN = re.compile(r'''
+    (?P<skip>\s+|\#[^\n]*)
+  | (?P<iri><[^>\s]*>)
+  | (?P<string>"""(?:[^"\\]|\\.|"(?!""))*"""|\'\'\'(?:[^'\\]|\\.|'(?!''))*\'\'\'
+               |"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+  | (?P<at>@[A-Za-z]+(?:-[A-Za-z0-9]+)*)
+  | (?P<datatype>\^\^)
+  | (?P<number>[+-]?(?:\d+\.\d+|\.\d+|\d+)(?:[eE][+-]?\d+)?)
+  | (?P<pname>(?:[A-Za-z][\w-]*(?:\.[\w-]+)*)?:(?:[\w:%-]|\.(?=[\w:%-]))*|_:[\w-]+)
+  | (?P<word>[A-Za-z]+)
+  | (?P<punct>[\[\]();,.])
+''', re.VERBOSE)
+
+
+def load_mapping(mapping_file):
+    """Load a mapping spec from a JSON file."""
+    with open(mapping_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _tokenize_turtle(text):
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = _TURTLE_TOKEN.match(text, position)
+        if match is None:
+            raise ValueError(f"Unexpected Turtle input at offset {position}: {text[position:position + 20]!r}")
+        position = match.end()
+        if match.lastgroup != 'skip':
+            tokens.append((match.lastgroup, match.group()))
+    return tokens
+
+
+def parse_turtle(text):
+    """
+    Parse a Turtle document into a list of (subject, predicate, object) triples.
+
+    This is a small reader for the ontology files shipped with the repository,
+    not a validating parser. IRIs are returned as strings, blank nodes as
+    '_:' strings and literals as ('literal', lexical form) tuples.
+    """
+    tokens = _tokenize_turtle(text)
+    prefixes = {}
+    base = ''
+    triples = []
+    position = 0
+    blank_nodes = iter(range(1, 1 << 62))
+
+    def peek():
+        return tokens[position] if position < len(tokens) else (None, None)
+
+    def take(expected=None):
+        nonlocal position
+        token = peek()
+        if expected is not None and token[1] != expected:
+            raise ValueError(f"Expected '{expected}' in Turtle input, found {token[1]!r}")
+        position += 1
+        return token
+
+    def term():
+        kind, value = take()
+        if kind == 'iri':
+            iri = value[1:-1]
+            return iri if ':' in iri else base + iri
+        if kind == 'pname':
+            if value.startswith('_:'):
+                return value
+            prefix, local = value.split(':', 1)
+            return prefixes[prefix] + local
+        if kind == 'word' and value == 'a':
+            return RDF + 'type'
+        if kind == 'string':
+            literal = ('literal', value.strip('"\''))
+            if peek()[0] == 'at':
+                take()
+            elif peek()[0] == 'datatype':
+                take()
+                term()
+            return literal
+        if kind in ('number', 'word'):
+            return ('literal', value)
+        if value == '[':
+            node = f'_:b{next(blank_nodes)}'
+            if peek()[1] != ']':
+                predicate_objects(node)
+            take(']')
+            return node
+        if value == '(':
+            items = []
+            while peek()[1] != ')':
+                items.append(term())
+            take(')')
+            head = RDF + 'nil'
+            for item in reversed(items):
+                node = f'_:b{next(blank_nodes)}'
+                triples.append((node, RDF + 'first', item))
+                triples.append((node, RDF + 'rest', head))
+                head = node
+            return head
+        raise ValueError(f"Unexpected Turtle token {value!r}")
+
+    def predicate_objects(subject):
+        while True:
+            predicate = term()
+            while True:
+                triples.append((subject, predicate, term()))
+                if peek()[1] != ',':
+                    break
+                take()
+            while peek()[1] == ';':
+                take()
+            if peek()[1] in ('.', ']', None):
+                return
+
+    while position < len(tokens):
+        kind, value = peek()
+        if value in ('@prefix', '@base') or (kind == 'word' and value.upper() in ('PREFIX', 'BASE')):
+            take()
+            if value.lower().endswith('prefix'):
+                prefix = take()[1].rstrip(':')
+                prefixes[prefix] = term()
+            else:
+                base = term()
+            if value.startswith('@'):
+                take('.')
+            continue
+        subject = term()
+        if peek()[1] != '.':
+            predicate_objects(subject)
+        take('.')
+    return triples
+
+
+def _curie(iri):
+    if not isinstance(iri, str):
+        return iri
+    for prefix, namespace in CURIE_PREFIXES.items():
+        if iri.startswith(namespace):
+            return f'{prefix}:{iri[len(namespace):]}'
+    return iri
+
+
+def read_ontology(ontology_files):
+    """
+    Read property domains and the class hierarchy from Turtle ontology files.
+
+    Args:
+        ontology_files: Paths to Turtle files (missing files are skipped)
+
+    Returns:
+        Tuple of (domains, superclasses): domains maps each property CURIE to a
+        set of class CURIEs (unions are expanded), superclasses maps each class
+        CURIE to the set of its direct superclasses
+    """
+    triples = []
+    for path in ontology_files:
+        if path is not None and Path(path).is_file():
+            triples.extend(parse_turtle(Path(path).read_text(encoding='utf-8')))
+
+    first, rest, union_of = {}, {}, {}
+    domains = defaultdict(set)
+    superclasses = defaultdict(set)
+    for subject, predicate, obj in triples:
+        if predicate == RDF + 'first':
+            first[subject] = obj
+        elif predicate == RDF + 'rest':
+            rest[subject] = obj
+        elif predicate == OWL + 'unionOf':
+            union_of[subject] = obj
+
+    def members(node):
+        if node not in union_of:
+            return [node]
+        result = []
+        cell = union_of[node]
+        while cell in first:
+            result.append(first[cell])
+            cell = rest.get(cell)
+        return result
+
+    for subject, predicate, obj in triples:
+        if predicate == RDFS + 'domain':
+            domains[_curie(subject)].update(_curie(c) for c in members(obj) if isinstance(c, str))
+        elif predicate == RDFS + 'subClassOf' and isinstance(obj, str) and not obj.startswith('_:'):
+            superclasses[_curie(subject)].add(_curie(obj))
+    return domains, superclasses
+
+
+def class_ancestors(superclasses):
+    """Return a map from every known class to itself plus all its superclasses."""
+    classes = set(superclasses)
+    for parents in superclasses.values():
+        classes.update(parents)
+    ancestors = {}
+
+    def visit(cls, seen):
+        if cls in ancestors:
+            return ancestors[cls]
+        result = {cls}
+        for parent in superclasses.get(cls, ()):
+            if parent not in seen:
+                result |= visit(parent, seen | {parent})
+        ancestors[cls] = result
+        return result
+
+    for cls in classes:
+        visit(cls, {cls})
+    return ancestors
+
+
+def rule_function_name(property_name):
+    """Return the generated function name for a shortcut property."""
+    return 'transform_' + property_name.split(':', 1)[-1].lower()
+
+
+def parse_path(path):
+    """
+    Parse a path template into a list of steps.
+
+    Args:
+        path: Path template, e.g. '@acquisition > cidoc:P9_consists_of[] > cidoc:E7_Activity'
+
+    Returns:
+        List of ('node', name), ('property', curie, container) and ('class', curie)
+        tuples, where container is 'single', 'list' or 'first'
+    """
+    steps = []
+    for token in (part.strip() for part in path.split('>')):
+        if not token:
+            raise ValueError(f"Empty step in path '{path}'")
+        if token.startswith('@'):
+            if steps and steps[-1][0] != 'node':
+                raise ValueError(f"Node '{token}' must come first in path '{path}'")
+            steps.append(('node', token[1:]))
+        elif steps and steps[-1][0] == 'property':
+            steps.append(('class', token))
+        elif token.endswith('[]'):
+            steps.append(('property', token[:-2], 'list'))
+        elif token.endswith('[0]'):
+            steps.append(('property', token[:-3], 'first'))
+        else:
+            steps.append(('property', token, 'single'))
+    return steps
+
+
+def _split_path(path):
+    """Split a rule path into its leading node names and the remaining steps."""
+    steps = parse_path(path)
+    node_names = [step[1] for step in steps if step[0] == 'node']
+    return node_names, steps[len(node_names):]
+
+
+class _SourceWriter:
+    """Accumulates indented lines of generated source."""
+
+    def __init__(self):
+        self.lines = []
+        self.level = 0
+
+    def line(self, text=''):
+        self.lines.append(('    ' * self.level + text) if text else '')
+
+    def indent(self):
+        self.level += 1
+
+    def dedent(self):
+        self.level -= 1
+
+    def source(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+class RuleCompiler:
+    """Generates Python source for the rules of one mapping spec."""
+
+    def __init__(self, mapping, ontology=None):
+        self.mapping = mapping
+        self.nodes = mapping.get('nodes', {})
+        self.ontology = ontology
+        self.variants = {}
+        self.type_constants = {}
+        self.resolvers = {}
+        self.writer = _SourceWriter()
+
+    def compile(self):
+        """
+        Generate the source for every rule in the spec.
+
+        Returns:
+            Python source defining the interned *_NODE type nodes, the
+            resolve_* node resolvers and NODE_RESOLVERS table, one transform_*
+            function per rule, the TRANSFORM_RULES registry, the
+            INTERNAL_PROPERTIES set, the RULE_VARIANTS table and the TYPE_PLANS
+            table
+        """
+        w = self.writer
+        w.line('# Generated by gmn_rule_compiler.py from the GMN mapping spec. Do not edit.')
+        registry = []
+        internal = []
+        for rule in self.mapping['rules']:
+            property_name = rule['property']
+            kind = rule.get('kind', 'link')
+            if kind not in ('link', 'literal', 'node'):
+                raise ValueError(f"Unknown rule kind '{kind}' for {property_name}")
+            if 'variants' in rule:
+                self._emit_variants(rule)
+            else:
+                self._emit_rule(rule, rule_function_name(property_name))
+            registry.append(property_name)
+            if rule.get('internal'):
+                internal.append(property_name)
+
+        w.line()
+        w.line()
+        w.line('TRANSFORM_RULES = [')
+        w.indent()
+        for property_name in registry:
+            w.line(f'({property_name!r}, {rule_function_name(property_name)}),')
+        w.dedent()
+        w.line(']')
+        w.line()
+        w.line(f'INTERNAL_PROPERTIES = frozenset({internal!r})')
+        w.line()
+        w.line('RULE_VARIANTS = {')
+        w.indent()
+        for property_name, branches in self.variants.items():
+            w.line(f'{property_name!r}: (')
+            w.indent()
+            for when, variant_name in branches:
+                w.line(f'({when!r}, {variant_name}),')
+            w.dedent()
+            w.line('),')
+        w.dedent()
+        w.line('}')
+        w.line()
+        w.line('# Bitmask of TRANSFORM_RULES positions allowed for each class by the')
+        w.line('# rdfs:domain declarations in the ontology')
+        w.line('TYPE_PLANS = {')
+        w.indent()
+        for cls, plan in sorted(self._type_plans(registry).items()):
+            w.line(f'{cls!r}: {plan:#x},')
+        w.dedent()
+        w.line('}')
+
+        # The type nodes and named nodes used by the rules are only known once
+        # the rules have been emitted, so their definitions go after the header
+        resolvers = self._resolver_source()
+        header = ['', '# Shared read-only E55_Type nodes referenced by the rules']
+        for constant, node_name in self.type_constants.items():
+            header.append(f'{node_name} = type_node({constant})')
+        w.lines[1:1] = header + resolvers
+        return w.source()
+
+    def _resolver_source(self):
+        """Generate the resolve_* functions and NODE_RESOLVERS for the named nodes used."""
+        w = _SourceWriter()
+        for key, function_name in self.resolvers.items():
+            names = key.split('/')
+            name = names[-1]
+            property_name, container, _ = self._node_steps(name)
+            w.line()
+            w.line()
+            w.line(f'def {function_name}(ctx):')
+            w.indent()
+            w.line(f'"""Get or create @{key.replace("/", " > @")} ({self.nodes[name]["path"]})."""')
+            if len(names) > 1:
+                parent = names[-2]
+                w.line(f"{parent} = ctx.node({'/'.join(names[:-1])!r})")
+            else:
+                parent = 'data'
+                w.line('data = ctx.data')
+            new_node = self._new_node_source(name, parent)
+            if container == 'first':
+                w.line(f'container = {parent}.get({property_name!r})')
+                w.line('if not container:')
+                w.indent()
+                w.line(f'container = {parent}[{property_name!r}] = [{new_node}]')
+                w.dedent()
+                w.line('return container[0]')
+            elif container == 'single':
+                w.line(f'{name} = {parent}.get({property_name!r})')
+                w.line(f'if {name} is None:')
+                w.indent()
+                w.line(f'{name} = {parent}[{property_name!r}] = {new_node}')
+                w.dedent()
+                w.line(f'return {name}')
+            else:
+                raise ValueError(f"Node '@{name}' cannot be reached through a list property")
+            w.dedent()
+
+        w.line()
+        w.line()
+        w.line('NODE_RESOLVERS = {')
+        w.indent()
+        for key, function_name in self.resolvers.items():
+            w.line(f'{key!r}: {function_name},')
+        w.dedent()
+        w.line('}')
+        return w.lines
+
+    def _type_plans(self, registry):
+        """Compute the rule bitmask for every class known to the ontology."""
+        if self.ontology is None:
+            return {}
+        domains, superclasses = self.ontology
+        superclasses = {cls: set(parents) for cls, parents in superclasses.items()}
+        for cls, parent in self.mapping.get('classes', {}).items():
+            superclasses.setdefault(cls, set()).add(parent)
+        rule_domains = []
+        for rule in self.mapping['rules']:
+            rule_domains.append(domains.get(rule.get('ontology', rule['property'])))
+
+        plans = {}
+        for cls, ancestors in class_ancestors(superclasses).items():
+            plan = 0
+            for order, domain in enumerate(rule_domains):
+                if not domain or domain & ancestors:
+                    plan |= 1 << order
+            plans[cls] = plan
+        return plans
+
+    def _emit_variants(self, rule):
+        """Emit one function per type-specific variant plus a dispatcher."""
+        w = self.writer
+        property_name = rule['property']
+        name = rule_function_name(property_name)
+        branches = []
+        for variant in rule['variants']:
+            node_names, _ = _split_path(variant['path'])
+            suffix = node_names[0] if node_names else 'item'
+            variant_name = f'{name}_to_{suffix}'
+            self._emit_rule(dict(rule, path=variant['path']), variant_name)
+            branches.append((tuple(variant['when']), variant_name))
+        self.variants[property_name] = branches
+
+        w.line()
+        w.line()
+        w.line(f'def {name}(ctx):')
+        w.indent()
+        w.line(f'"""Transform {property_name}, choosing the CIDOC-CRM path by the item\'s @type."""')
+        w.line('item_types = ctx.item_types')
+        for when, variant_name in branches:
+            test = ' or '.join(f'{t!r} in item_types' for t in when)
+            w.line(f'if {test}:')
+            w.indent()
+            w.line(f'return {variant_name}(ctx)')
+            w.dedent()
+        w.line(f'ctx.data.pop({property_name!r}, None)')
+        w.dedent()
+
+    def _emit_rule(self, rule, name):
+        w = self.writer
+        property_name = rule['property']
+        kind = rule.get('kind', 'link')
+        internal = rule.get('internal', False)
+
+        w.line()
+        w.line()
+        w.line(f'def {name}(ctx):')
+        w.indent()
+        w.line('"""')
+        w.line(f'Transform {property_name} to full CIDOC-CRM structure:')
+        w.line(rule['path'] + (f" ({rule['uri']})" if kind == 'node' else ''))
+        w.line('"""')
+        w.line('data = ctx.data')
+        w.line(f'values = data.pop({property_name!r}, None)')
+        w.line('if values is None:')
+        w.indent()
+        w.line('return')
+        w.dedent()
+        if internal:
+            w.line('if not ctx.include_internal:')
+            w.indent()
+            w.line('return')
+            w.dedent()
+        body_start = len(w.lines)
+        getattr(self, f'_emit_{kind}_body')(rule)
+        if any('subject_uri' in line for line in w.lines[body_start:]):
+            w.lines.insert(body_start, '    ' * w.level + 'subject_uri = ctx.subject_uri')
+        w.dedent()
+
+    # -- building blocks -------------------------------------------------
+
+    def _node_steps(self, name):
+        if name not in self.nodes:
+            raise ValueError(f"Unknown node '@{name}'")
+        steps = parse_path(self.nodes[name]['path'])
+        if len(steps) != 2 or steps[0][0] != 'property' or steps[1][0] != 'class':
+            raise ValueError(f"Node '@{name}' must be declared as 'property > class'")
+        return steps[0][1], steps[0][2], steps[1][1]
+
+    def _new_node_source(self, name, parent):
+        _, _, class_name = self._node_steps(name)
+        node = self.nodes[name]
+        parent_uri = 'ctx.subject_uri' if parent == 'data' else f"{parent}['@id']"
+        parts = [f"'@id': f\"{{{parent_uri}}}/{node['uri']}\"", f"'@type': {class_name!r}"]
+        if node.get('has_type'):
+            parts.append(f"'cidoc:P2_has_type': {self._type_node_source(node['has_type'])}")
+        return '{' + ', '.join(parts) + '}'
+
+    def _type_node_source(self, constant):
+        """Reference the shared read-only E55_Type node for a vocabulary constant."""
+        if not constant.isidentifier():
+            raise ValueError(f"Type '{constant}' must name a vocabulary constant such as AAT_WITNESS")
+        self.type_constants.setdefault(constant, f'{constant}_NODE')
+        return self.type_constants[constant]
+
+    def _resolver(self, node_names):
+        """Register the resolver for a chain of named nodes and return its key."""
+        for depth in range(1, len(node_names) + 1):
+            self._node_steps(node_names[depth - 1])
+            key = '/'.join(node_names[:depth])
+            self.resolvers.setdefault(key, 'resolve_' + '_'.join(node_names[:depth]))
+        return '/'.join(node_names)
+
+    def _emit_resolve_nodes(self, node_names, parent='data'):
+        """Emit a lookup of the innermost node of a chain through the context."""
+        if not node_names:
+            return parent
+        key = self._resolver(node_names)
+        self.writer.line(f'{node_names[-1]} = ctx.node({key!r})')
+        return node_names[-1]
+
+    def _emit_targets(self, parent, property_name):
+        self.writer.line(f'targets, target_ids = ctx.targets({parent}, {property_name!r})')
+
+    def _emit_append(self, target):
+        """Emit an append to targets that skips @ids already in the list."""
+        w = self.writer
+        if target == 'node':
+            target_id = 'node_uri'
+            w.line('if node_uri not in target_ids:')
+        else:
+            target_id = 'target_id'
+            w.line(f"target_id = {target}.get('@id')")
+            w.line('if target_id is None or target_id not in target_ids:')
+        w.indent()
+        w.line(f'target_ids[{target_id}] = {target}')
+        w.line(f'targets.append({target})')
+        w.dedent()
+        w.line('else:')
+        w.indent()
+        w.line(f'ctx.merge_types(target_ids[{target_id}], {target})')
+        w.dedent()
+
+    def _emit_literal_value(self):
+        w = self.writer
+        w.line('if isinstance(value, dict):')
+        w.indent()
+        w.line("literal = value.get('@value', '')")
+        w.dedent()
+        w.line('else:')
+        w.indent()
+        w.line('literal = str(value)')
+        w.dedent()
+        w.line('if not literal:')
+        w.indent()
+        w.line('continue')
+        w.dedent()
+
+    def _emit_entity_value(self, mode, class_name, add_type=None):
+        """Emit code normalising value into a target node dict."""
+        w = self.writer
+        if mode not in VALUE_MODES:
+            raise ValueError(f"Unknown value mode '{mode}'")
+        if add_type:
+            w.line('if isinstance(value, dict):')
+            w.indent()
+            w.line('target = value.copy()')
+            w.dedent()
+            w.line('else:')
+            w.indent()
+            w.line("target = {'@id': str(value)}")
+            w.dedent()
+            w.line("target_type = target.get('@type')")
+            w.line('if target_type is None:')
+            w.indent()
+            w.line(f"target['@type'] = [{class_name!r}, {add_type!r}]")
+            w.dedent()
+            w.line('elif isinstance(target_type, str):')
+            w.indent()
+            w.line(f"target['@type'] = [target_type, {add_type!r}]")
+            w.dedent()
+            w.line(f'elif {add_type!r} not in target_type:')
+            w.indent()
+            w.line(f'target_type.append({add_type!r})')
+            w.dedent()
+        elif mode == 'entity':
+            w.line('if isinstance(value, dict):')
+            w.indent()
+            w.line('target = value.copy()')
+            w.line("if '@type' not in target:")
+            w.indent()
+            w.line(f"target['@type'] = {class_name!r}")
+            w.dedent()
+            w.dedent()
+            w.line('else:')
+            w.indent()
+            w.line(f"target = {{'@id': str(value), '@type': {class_name!r}}}")
+            w.dedent()
+        elif mode == 'as_given':
+            w.line('if isinstance(value, dict):')
+            w.indent()
+            w.line("value_uri = value.get('@id', '')")
+            w.line('target = value.copy()')
+            w.dedent()
+            w.line('else:')
+            w.indent()
+            w.line('value_uri = str(value)')
+            w.line(f"target = {{'@id': value_uri, '@type': {class_name!r}}}")
+            w.dedent()
+        else:
+            w.line('if isinstance(value, dict):')
+            w.indent()
+            w.line("value_uri = value.get('@id', '')")
+            w.dedent()
+            w.line('else:')
+            w.indent()
+            w.line('value_uri = str(value)')
+            w.dedent()
+            w.line(f"target = {{'@id': value_uri, '@type': {class_name!r}}}")
+
+    @staticmethod
+    def _template_expression(template, value_var, property_name):
+        """Turn a '{value}'/'{property}' template into a concatenation expression."""
+        parts = []
+        rest = template
+        while rest:
+            start = rest.find('{')
+            if start < 0:
+                parts.append(repr(rest))
+                break
+            if start:
+                parts.append(repr(rest[:start]))
+            end = rest.index('}', start)
+            field = rest[start + 1:end]
+            if field == 'value':
+                parts.append(value_var)
+            elif field == 'property':
+                parts.append(repr(property_name))
+            else:
+                raise ValueError(f"Unknown field '{{{field}}}' in mint template '{template}'")
+            rest = rest[end + 1:]
+        return ' + '.join(parts) if parts else "''"
+
+    # -- rule kinds ------------------------------------------------------
+
+    def _emit_link_body(self, rule):
+        w = self.writer
+        node_names, steps = _split_path(rule['path'])
+        if len(steps) != 2 or steps[0][0] != 'property' or steps[1][0] != 'class':
+            raise ValueError(f"Link rule {rule['property']} must end in 'property > class'")
+        _, target_property, container = steps[0]
+        class_name = steps[1][1]
+
+        parent = self._emit_resolve_nodes(node_names)
+        if container == 'list':
+            self._emit_targets(parent, target_property)
+        w.line('for value in values:')
+        w.indent()
+        self._emit_entity_value(rule.get('value_mode', 'entity'), class_name, rule.get('add_type'))
+        if rule.get('role'):
+            w.line(f"target['cidoc:P14.1_in_the_role_of'] = {self._type_node_source(rule['role'])}")
+        if container == 'list':
+            self._emit_append('target')
+        elif rule.get('multiple'):
+            w.line(f'ctx.set_value({parent}, {target_property!r}, target)')
+        else:
+            w.line(f'{parent}[{target_property!r}] = target')
+        w.dedent()
+
+    def _emit_literal_body(self, rule):
+        w = self.writer
+        node_names, steps = _split_path(rule['path'])
+        if len(steps) != 1 or steps[0][0] != 'property':
+            raise ValueError(f"Literal rule {rule['property']} must end in a property")
+        target_property = steps[0][1]
+
+        # The innermost node is only created once there is a value to store
+        w.line('for value in values:')
+        w.indent()
+        self._emit_literal_value()
+        parent = self._emit_resolve_nodes(node_names)
+        if rule.get('multiple'):
+            w.line(f'ctx.set_value({parent}, {target_property!r}, literal)')
+        else:
+            w.line(f'{parent}[{target_property!r}] = literal')
+        w.dedent()
+
+    def _emit_node_body(self, rule):
+        w = self.writer
+        property_name = rule['property']
+        node_names, steps = _split_path(rule['path'])
+        if len(steps) != 2 or steps[0][0] != 'property' or steps[0][2] != 'list':
+            raise ValueError(f"Node rule {property_name} must end in 'property[] > class'")
+        target_property = steps[0][1]
+        class_name = steps[1][1]
+
+        value_nodes, value_steps = _split_path(rule['value'])
+        is_literal = value_steps[-1][0] == 'property'
+        value_var = 'literal' if is_literal else 'value_uri'
+
+        parent = self._emit_resolve_nodes(node_names)
+        self._emit_targets(parent, target_property)
+        motivated_by = rule.get('motivated_by')
+        if motivated_by:
+            w.line('motivated_by_uri = None')
+            w.line(f'motivators = {parent}.get({motivated_by!r})')
+            w.line('if isinstance(motivators, list) and motivators:')
+            w.indent()
+            w.line('first = motivators[0]')
+            w.line("motivated_by_uri = first.get('@id') if isinstance(first, dict) else str(first)")
+            w.dedent()
+
+        w.line('for value in values:')
+        w.indent()
+        if is_literal:
+            self._emit_literal_value()
+        else:
+            self._emit_entity_value(rule.get('value_mode', 'entity'), value_steps[-1][1])
+            if rule.get('value_mode', 'entity') == 'entity':
+                w.line("value_uri = target.get('@id', '')")
+
+        mint = self._template_expression(rule.get('mint', '{value}'), value_var, property_name)
+        prefix, marker, rest = rule['uri'].replace('{subject}', '{subject_uri}').partition('{mint}')
+        if marker:
+            uri = f'ctx.minter.mint(f"{prefix}", {mint})' + (f' + f"{rest}"' if rest else '')
+        else:
+            uri = f'f"{prefix}"'
+        w.line(f'node_uri = {uri}')
+        w.line('node = {')
+        w.indent()
+        w.line("'@id': node_uri,")
+        w.line(f"'@type': {class_name!r},")
+        if rule.get('has_type'):
+            w.line(f"'cidoc:P2_has_type': {self._type_node_source(rule['has_type'])},")
+        self._emit_value_entry(value_nodes, value_steps, value_var)
+        if rule.get('role'):
+            w.line(f"'cidoc:P14.1_in_the_role_of': {self._type_node_source(rule['role'])},")
+        w.dedent()
+        w.line('}')
+        if motivated_by:
+            w.line('if motivated_by_uri:')
+            w.indent()
+            w.line("node['cidoc:P17_was_motivated_by'] = {'@id': motivated_by_uri, '@type': 'cidoc:E21_Person'}")
+            w.dedent()
+        self._emit_append('node')
+        w.dedent()
+
+    def _emit_value_entry(self, value_nodes, value_steps, value_var):
+        """Emit the dict entries that attach a value to a freshly minted node."""
+        w = self.writer
+        segments = []
+        for name in value_nodes:
+            property_name, container, class_name = self._node_steps(name)
+            if container != 'single':
+                raise ValueError(f"Node '@{name}' must be single-valued inside a minted node")
+            segments.append(self.nodes[name]['uri'])
+            w.line(f'{property_name!r}: {{')
+            w.indent()
+            w.line(f"'@id': f\"{{node_uri}}/{'/'.join(segments)}\",")
+            w.line(f"'@type': {class_name!r},")
+            if self.nodes[name].get('has_type'):
+                w.line(f"'cidoc:P2_has_type': {self._type_node_source(self.nodes[name]['has_type'])},")
+        target_property, container = value_steps[0][1], value_steps[0][2]
+        if value_steps[-1][0] == 'property':
+            w.line(f'{target_property!r}: literal,')
+        elif container == 'list':
+            w.line(f'{target_property!r}: [target],')
+        else:
+            w.line(f'{target_property!r}: target,')
+        for _ in value_nodes:
+            w.dedent()
+            w.line('},')
+
+
+def compile_mapping(mapping, ontology_files=()):
+    """
+    Compile a mapping spec into Python source.
+
+    Args:
+        mapping: Parsed mapping spec (see gmn_cidoc_mapping.json)
+        ontology_files: Turtle files providing property domains and the class
+                        hierarchy for TYPE_PLANS (none means no plans)
+
+    Returns:
+        Source code string defining the transformation rules
+    """
+    ontology = read_ontology(ontology_files) if ontology_files else None
+    return RuleCompiler(mapping, ontology).compile()
+
+
+def rules_cache_key(mapping_file, ontology_files=()):
+    """
+    Compute the content hash that identifies a compiled rule module.
+
+    The key covers the mapping spec, the ontologies, this compiler's own source
+    and the running Python's bytecode version, so any change to one of them
+    produces a fresh cache entry.
+    """
+    digest = hashlib.sha256(importlib.util.MAGIC_NUMBER)
+    for path in (Path(__file__), Path(mapping_file), *(Path(p) for p in ontology_files)):
+        digest.update(b'\0')
+        if path is not None and path.is_file():
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+def compile_cached(mapping_file, ontology_files=(), cache_dir=None, filename='<generated rules>'):
+    """
+    Return the generated rule source and its code object, using an on-disk cache.
+
+    Compiled rules are stored in cache_dir (a __pycache__-style directory) as
+    gmn_rules.<key>.bin, keyed by rules_cache_key. A cache hit skips loading the
+    mapping and ontologies and generating source altogether. Unreadable or unwritable cache
+    entries are ignored and the rules are compiled in memory instead.
+
+    Args:
+        mapping_file: Path to the JSON mapping spec
+        ontology_files: Turtle ontology files (gmn_ontology.ttl and its parents)
+        cache_dir: Directory holding cached rule modules, or None to disable caching
+        filename: Filename recorded in the code object for tracebacks
+
+    Returns:
+        Tuple of (source, code)
+    """
+    cache_file = None
+    if cache_dir is not None:
+        key = rules_cache_key(mapping_file, ontology_files)
+        cache_file = Path(cache_dir) / f'gmn_rules.{key}.bin'
+        try:
+            with open(cache_file, 'rb') as f:
+                source, code = marshal.load(f)
+            if code.co_filename == filename:
+                return source, code
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+    source = compile_mapping(load_mapping(mapping_file), ontology_files)
+    code = compile(source, filename, 'exec')
+
+    if cache_file is not None:
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=cache_file.parent, prefix='.gmn_rules.')
+            with os.fdopen(fd, 'wb') as f:
+                marshal.dump((source, code), f)
+            os.replace(tmp_name, cache_file)
+            for stale in cache_file.parent.glob('gmn_rules.*.bin'):
+                if stale != cache_file:
+                    stale.unlink(missing_ok=True)
+        except OSError:
+            pass
+    return source, code
+
+
+def main():
+    """Print the generated rules for a mapping file and ontologies (for inspection)."""
+    mapping_file = sys.argv[1] if len(sys.argv) > 1 else Path(__file__).with_name('gmn_cidoc_mapping.json')
+    print(compile_mapping(load_mapping(mapping_file), sys.argv[2:]), end='')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Sharded output for large transformations.
+
+ShardedWriter splits the transformed items over numbered files, starting a
+new shard when the current one reaches a number of items or an uncompressed
+size. Output to out.jsonld.gz is written as out-00001.jsonld.gz,
+out-00002.jsonld.gz, ... and each shard is a complete file in the output
+format (JSON-LD shards repeat the @context), so shards can be loaded
+concurrently.
+
+A manifest, out.jsonld.gz-manifest.json, is written on close:
+
+    {
+      "format": "json", "compression": "gzip", "items": 120000,
+      "shards": [
+        {"file": "out-00001.jsonld.gz", "items": 50000, "bytes": 18234112,
+         "sha256": "...", "first_id": "https://.../item/1", "last_id": "https://.../item/50000"},
+        ...
+      ]
+    }
+
+"bytes" is the size of the shard file as written (compressed if it is), and
+first_id and last_id are the @ids of the first and last items in the shard.
+
+merge_shards updates JSON or JSON Lines shards in place with changed items
+(e.g. from an incremental harvest), rewriting only the shards they fall in.
+"""
+
+import hashlib
+import json
+import os
+import re
+from bisect import bisect_right
+from pathlib import Path
+
+from gmn_jsonld_io import (COMPRESSION_NONE, FORMAT_NQUADS, FORMAT_NTRIPLES, FORMAT_TURTLE, INPUT_FORMATS,
+                           detect_compression, detect_format, open_reader, open_text, open_writer)
+
+MANIFEST_SUFFIX = '-manifest.json'
+MANIFEST_VERSION = 1
+
+# Formats that are written as a stream and can therefore be rotated
+SHARDABLE_FORMATS = INPUT_FORMATS + (FORMAT_NTRIPLES, FORMAT_NQUADS, FORMAT_TURTLE)
+
+_SIZE = re.compile(r'(\d+(?:\.\d+)?)\s*([KMGT]?)i?B?$', re.IGNORECASE)
+_TRAILING_NUMBER = re.compile(r'(\d+)\D*$')
+
+
+def parse_size(text):
+    """Parse a size such as '500M', '2G' or '1048576' into bytes (binary multiples)."""
+    match = _SIZE.match(str(text).strip())
+    if not match:
+        raise ValueError(f"Invalid size '{text}', expected a number with an optional K, M, G or T suffix")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** ' KMGT'.index(unit.upper() or ' '))
+
+
+def split_name(path):
+    """Split an output path into (stem, suffixes), e.g. 'out/all.jsonld.gz' -> ('out/all', '.jsonld.gz')."""
+    path = Path(path)
+    name = path.name
+    dot = name.find('.', 1)
+    stem, suffixes = (name, '') if dot == -1 else (name[:dot], name[dot:])
+    return str(path.with_name(stem)), suffixes
+
+
+def sidecar_path(target, suffix):
+    """
+    Return the path of a file kept next to an output: the output's full name
+    followed by suffix, e.g. out.jsonld.gz-manifest.json. Outputs that differ
+    only in format or compression each get their own.
+    """
+    path = Path(target)
+    return path.with_name(path.name + suffix)
+
+
+def manifest_path(target):
+    """Return the manifest path for a sharded output."""
+    return sidecar_path(target, MANIFEST_SUFFIX)
+
+
+def shard_path(target, number):
+    """Return the path of shard number (from 1) of a sharded output."""
+    stem, suffixes = split_name(target)
+    return Path(f'{stem}-{number:05d}{suffixes}')
+
+
+def read_manifest(path):
+    """Load a manifest written by ShardedWriter; shard files are resolved against its directory."""
+    path = Path(path)
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    for shard in manifest['shards']:
+        shard['path'] = path.parent / shard['file']
+    return manifest
+
+
+def write_manifest(path, manifest):
+    """Write a manifest through a temporary file, so a reader never sees half of it."""
+    path = Path(path)
+    shards = [{key: value for key, value in shard.items() if key != 'path'} for shard in manifest['shards']]
+    temporary = path.with_name(path.name + '.tmp')
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump({**manifest, 'shards': shards}, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+    os.replace(temporary, path)
+
+
+def id_order(item_id):
+    """
+    Sort key of an item @id: its last number (the Omeka-S o:id in
+    .../api/items/123), then the @id itself.
+    """
+    item_id = item_id if isinstance(item_id, str) else ''
+    match = _TRAILING_NUMBER.search(item_id)
+    return (int(match.group(1)) if match else -1, item_id)
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    """Return the hex SHA-256 of a file."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class _CountingStream:
+    """Text stream wrapper counting the characters written through it."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.size = 0
+
+    def write(self, text):
+        self.size += len(text)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class ShardedWriter:
+    """
+    Writes items over several size- or count-limited files, with a manifest.
+
+    Offers the same interface as JsonLdWriter.
+
+    Example:
+        reader = open_reader('omeka_export.json')
+        with ShardedWriter('out.jsonld.gz', reader, max_items=50000) as writer:
+            for item in reader:
+                writer.write(transform_item(item))
+    """
+
+    def __init__(self, target, layout=None, format=None, max_items=None, max_bytes=None, compression=None,
+                 compression_level=None, buffer_size=None, **writer_options):
+        """
+        Args:
+            target: Output path the shard names are derived from
+            layout: Export layout passed to each shard's writer (see JsonLdWriter)
+            format: Output format (default: detected from target)
+            max_items: Start a new shard after this many items
+            max_bytes: Start a new shard once a shard's uncompressed output
+                       reaches this many characters (bytes for ASCII text);
+                       a shard holds at least one item
+            compression, compression_level, buffer_size: As for open_text
+            writer_options: Further arguments for open_writer (indent,
+                            backend, graph)
+        """
+        if not max_items and not max_bytes:
+            raise ValueError('A sharded output needs max_items or max_bytes')
+        self.format = detect_format(target, format)
+        if self.format not in SHARDABLE_FORMATS:
+            raise ValueError(f"Cannot shard '{self.format}' output, expected one of {', '.join(SHARDABLE_FORMATS)}")
+        self.target = target
+        self.layout = layout
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.compression = detect_compression(target, compression)
+        self.compression_level = compression_level
+        self.buffer_size = buffer_size
+        self.writer_options = writer_options
+        self.count = 0
+        self.shards = []
+        self._stream = None
+        self._counter = None
+        self._writer = None
+        self._shard = None
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        elif self._stream is not None:
+            self._stream.close()
+
+    def _open_shard(self):
+        path = shard_path(self.target, len(self.shards) + 1)
+        self._stream = open_text(path, 'w', self.compression or 'none', self.compression_level, self.buffer_size)
+        self._counter = _CountingStream(self._stream)
+        self._writer = open_writer(self._counter, self.format, self.layout, **self.writer_options)
+        self._shard = {'file': path.name, 'path': path, 'items': 0, 'first_id': None, 'last_id': None}
+        self.shards.append(self._shard)
+
+    def _close_shard(self):
+        self._writer.close()
+        self._stream.close()
+        path = self._shard.pop('path')
+        self._shard['bytes'] = os.path.getsize(path)
+        self._shard['sha256'] = file_sha256(path)
+        self._writer = self._stream = self._counter = self._shard = None
+
+    def _next(self):
+        """Return the writer for the next item, starting a new shard first if the current one is full."""
+        if self._closed:
+            raise ValueError('Cannot write to a closed ShardedWriter')
+        if self._shard is not None and ((self.max_items and self._shard['items'] >= self.max_items)
+                                        or (self.max_bytes and self._counter.size >= self.max_bytes)):
+            self._close_shard()
+        if self._shard is None:
+            self._open_shard()
+        return self._writer
+
+    def write(self, item):
+        """Write one item, starting a new shard first if the current one is full."""
+        self._next().write(item)
+        self._record(item.get('@id') if isinstance(item, dict) else None)
+
+    def write_encoded(self, text, item_id=None):
+        """Write an item already encoded by encode(); item_id is recorded in the manifest."""
+        self._next().write_encoded(text)
+        self._record(item_id)
+
+    def _record(self, item_id):
+        if self._shard['first_id'] is None:
+            self._shard['first_id'] = item_id
+        self._shard['last_id'] = item_id
+        self._shard['items'] += 1
+        self.count += 1
+
+    def close(self):
+        """Finish the last shard and write the manifest."""
+        if self._closed:
+            return
+        if self._shard is not None:
+            self._close_shard()
+        manifest = {
+            'version': MANIFEST_VERSION,
+            'format': self.format,
+            'compression': self.compression,
+            'items': self.count,
+            'shards': self.shards,
+        }
+        write_manifest(manifest_path(self.target), manifest)
+        self._closed = True
+
+
+def merge_file(path, items, format=None, compression=None, **writer_options):
+    """
+    Replace items in a JSON or JSON Lines output file, by @id.
+
+    An item whose @id is in the file takes the place of the old one; the
+    others are added at the end, in id_order. The file is rewritten through
+    a temporary file that replaces it once complete.
+
+    Args:
+        path: Output file (an uncompressed or compressed export)
+        items: Dictionary mapping @id to the new version of the item
+        format: 'json' or 'jsonl' (default: detected from path)
+        compression: Compression of the file (default: detected)
+        writer_options: Further arguments for open_writer (indent, backend)
+
+    Returns:
+        Dictionary with the number of 'items' in the file and its
+        'first_id' and 'last_id'
+    """
+    path = Path(path)
+    format = detect_format(path, format)
+    if format not in INPUT_FORMATS:
+        raise ValueError(f"Cannot merge items into '{format}' output, expected one of {', '.join(INPUT_FORMATS)}")
+    compression = detect_compression(path, compression, sniff=True)
+    remaining = dict(items)
+    info = {'items': 0, 'first_id': None, 'last_id': None}
+    reader = open_reader(path, format, writer_options.get('backend'))
+    temporary = path.with_name(path.name + '.tmp')
+    try:
+        with open_writer(temporary, format, reader, compression=compression or COMPRESSION_NONE,
+                         **writer_options) as writer:
+            def write(item):
+                item_id = item.get('@id') if isinstance(item, dict) else None
+                writer.write(item)
+                if info['first_id'] is None:
+                    info['first_id'] = item_id
+                info['last_id'] = item_id
+                info['items'] += 1
+
+            for item in reader:
+                write(remaining.pop(item.get('@id') if isinstance(item, dict) else None, item))
+            for item_id in sorted(remaining, key=id_order):
+                write(remaining[item_id])
+        os.replace(temporary, path)
+    finally:
+        if temporary.exists():
+            temporary.unlink()
+    return info
+
+
+def merge_shards(target, items, **writer_options):
+    """
+    Merge changed items into the shards of an output written by ShardedWriter.
+
+    Each item goes to the shard whose range of @ids (first_id to last_id in
+    id_order) it falls in, or else the nearest shard before it, so items
+    added since the output was written land in the last shard. Only the
+    shards receiving items are rewritten (see merge_file); the manifest is
+    updated with their new counts, sizes and checksums. The shards must be
+    in id_order, as when written from an Omeka-S harvest sorted by id.
+
+    Args:
+        target: Output path the shards were written for
+        items: Dictionary mapping @id to the new version of the item
+        writer_options: Further arguments for open_writer (indent, backend)
+
+    Returns:
+        File names of the rewritten shards
+    """
+    path = manifest_path(target)
+    manifest = read_manifest(path)
+    shards = manifest['shards']
+    if not shards:
+        raise ValueError(f"No shards to merge into in '{path}'")
+    firsts = [id_order(shard['first_id']) for shard in shards]
+    grouped = {}
+    for item_id, item in items.items():
+        number = max(bisect_right(firsts, id_order(item_id)) - 1, 0)
+        grouped.setdefault(number, {})[item_id] = item
+    for number, shard_items in sorted(grouped.items()):
+        shard = shards[number]
+        shard.update(merge_file(shard['path'], shard_items, manifest['format'],
+                                manifest['compression'] or COMPRESSION_NONE, **writer_options))
+        shard['bytes'] = os.path.getsize(shard['path'])
+        shard['sha256'] = file_sha256(shard['path'])
+    manifest['items'] = sum(shard['items'] for shard in shards)
+    write_manifest(path, manifest)
+    return [shards[number]['file'] for number in sorted(grouped)]
@@ -12,12 +12,38 @@ Updated to reflect expanded class hierarchy including:
 - gmn:E31_5_Declaration
 - gmn:E31_6_Correspondence
 - gmn:E31_7_Donation_Contract
+
+The CIDOC-CRM path behind each shortcut property is declared once in
+gmn_cidoc_mapping.json and compiled into the transform_* rule functions when
+this module is loaded (see gmn_rule_compiler.py).
 """
 
+import argparse
+import glob
+import hashlib
 import json
+import linecache
+import os
 import sys
+import time
+from functools import partial
+from itertools import chain
+from pathlib import Path
+from types import SimpleNamespace
 from uuid import uuid4
 
+from gmn_export_index import ExportIndex
+from gmn_harvest import (DEFAULT_CONCURRENCY, DEFAULT_PER_PAGE, HARVEST_ERRORS, HarvestReader, is_url, items_endpoint,
+                         load_state, save_state, state_path)
+from gmn_item_hashes import PreviousOutput, files_digest, hashes_path, item_hash, load_hashes, save_hashes, stale_reason
+from gmn_jsonld_io import (COMPRESSION_NONE, COMPRESSIONS, FORMATS, INPUT_FORMATS, KIND_GRAPH, KIND_ITEM,
+                           JsonLinesReader, detect_compression, detect_format, get_backend, open_reader,
+                           open_writer)
+from gmn_parallel import default_workers, json_chunks, ordered_map
+from gmn_pipeline import Pipeline
+from gmn_rule_compiler import compile_cached
+from gmn_shards import ShardedWriter, manifest_path, merge_file, merge_shards, parse_size, split_name
+
 # Getty AAT URI constants
 AAT_NAME = "http://vocab.getty.edu/page/aat/300404650"
 AAT_NAME_FROM_SOURCE = "http://vocab.getty.edu/page/aat/300456607"
@@ -35,2537 +61,1154 @@ AAT_TRANSFER_OF_RIGHTS = "http://vocab.getty.edu/page/aat/300417639"
 AAT_FINANCIAL_TRANSACTION = "http://vocab.getty.edu/page/aat/300055984"
 AAT_WITNESS = "http://vocab.getty.edu/page/aat/300028910"
 AAT_DECLARATION = "http://vocab.getty.edu/page/aat/300027623"
-AAT_TRANSFER_OF_RIGHTS = "http://vocab.getty.edu/page/aat/300417639"
 AAT_CORRESPONDENCE = "http://vocab.getty.edu/page/aat/300026877"
 
 
-def generate_appellation_uri(subject_uri, name_value, suffix=""):
-    """Generate a unique URI for an appellation resource."""
-    name_hash = str(hash(name_value + suffix))[-8:]
-    return f"{subject_uri}/appellation/{name_hash}"
-
-
-def transform_name_property(data, property_name, aat_type_uri):
+class TypeNode(dict):
     """
-    Generic function to transform name shortcut properties to full CIDOC-CRM structure.
-    
-    Args:
-        data: The item data dictionary
-        property_name: The shortcut property name (e.g., 'gmn:P1_1_has_name')
-        aat_type_uri: The AAT URI for the type of name
-    
-    Returns:
-        Modified data dictionary
+    Read-only {'@id': ..., '@type': 'cidoc:E55_Type'} node.
+
+    One instance per vocabulary URI is shared by every item that references
+    it (see type_node), so it must never be modified in place. Being a dict,
+    it serializes exactly like the literal node it replaces.
     """
-    if property_name not in data:
-        return data
-    
-    names = data[property_name]
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P1_is_identified_by' not in data:
-        data['cidoc:P1_is_identified_by'] = []
-    
-    for name_obj in names:
-        if isinstance(name_obj, dict):
-            name_value = name_obj.get('@value', '')
-        else:
-            name_value = str(name_obj)
-        
-        if not name_value:
-            continue
-        
-        appellation_uri = generate_appellation_uri(subject_uri, name_value, property_name)
-        
-        appellation = {
-            '@id': appellation_uri,
-            '@type': 'cidoc:E41_Appellation',
-            'cidoc:P2_has_type': {
-                '@id': aat_type_uri,
-                '@type': 'cidoc:E55_Type'
-            },
-            'cidoc:P190_has_symbolic_content': name_value
-        }
-        
-        data['cidoc:P1_is_identified_by'].append(appellation)
-    
-    del data[property_name]
-    return data
 
+    __slots__ = ()
 
-def transform_p1_1_has_name(data):
-    """Transform gmn:P1_1_has_name to full CIDOC-CRM structure."""
-    return transform_name_property(data, 'gmn:P1_1_has_name', AAT_NAME)
+    def __init__(self, uri):
+        super().__init__({'@id': uri, '@type': 'cidoc:E55_Type'})
 
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(f"Shared type node {self['@id']} is read-only; copy it before modifying")
 
-def transform_p1_2_has_name_from_source(data):
-    """Transform gmn:P1_2_has_name_from_source to full CIDOC-CRM structure."""
-    return transform_name_property(data, 'gmn:P1_2_has_name_from_source', AAT_NAME_FROM_SOURCE)
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
 
+    def __copy__(self):
+        return self
 
-def transform_p1_3_has_patrilineal_name(data):
-    """Transform gmn:P1_3_has_patrilineal_name to full CIDOC-CRM structure."""
-    return transform_name_property(data, 'gmn:P1_3_has_patrilineal_name', AAT_PATRONYMIC)
+    def __deepcopy__(self, memo):
+        return self
 
+    def __reduce__(self):
+        # Unpickle (e.g. in worker processes) to the interned instance
+        return type_node, (self['@id'],)
+
+
+# Interned type nodes, keyed by vocabulary URI
+TYPE_NODES = {}
 
-def transform_p1_4_has_loconym(data):
-    """
-    Transform gmn:P1_4_has_loconym to full CIDOC-CRM structure:
-    P1_is_identified_by > E41_Appellation > P2_has_type (loconym) > P67_refers_to > E53_Place
-    """
-    if 'gmn:P1_4_has_loconym' not in data:
-        return data
-    
-    places = data['gmn:P1_4_has_loconym']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P1_is_identified_by' not in data:
-        data['cidoc:P1_is_identified_by'] = []
-    
-    for place_obj in places:
-        if isinstance(place_obj, dict):
-            place_uri = place_obj.get('@id', '')
-        else:
-            place_uri = str(place_obj)
-        
-        place_hash = str(hash(place_uri))[-8:]
-        appellation_uri = f"{subject_uri}/appellation/loconym_{place_hash}"
-        
-        appellation = {
-            '@id': appellation_uri,
-            '@type': 'cidoc:E41_Appellation',
-            'cidoc:P2_has_type': {
-                '@id': WIKIDATA_LOCONYM,
-                '@type': 'cidoc:E55_Type'
-            },
-            'cidoc:P67_refers_to': {
-                '@id': place_uri,
-                '@type': 'cidoc:E53_Place'
-            }
-        }
-        
-        data['cidoc:P1_is_identified_by'].append(appellation)
-    
-    del data['gmn:P1_4_has_loconym']
-    return data
 
+def type_node(uri):
+    """Return the shared read-only E55_Type node for a vocabulary URI."""
+    node = TYPE_NODES.get(uri)
+    if node is None:
+        node = TYPE_NODES[uri] = TypeNode(uri)
+    return node
 
-def transform_p102_1_has_title(data):
+
+# Mapping spec declaring the CIDOC-CRM path of every shortcut property
+MAPPING_FILE = Path(__file__).with_name('gmn_cidoc_mapping.json')
+# Ontologies providing the property domains and class hierarchy for the
+# per-@type rule plans
+ONTOLOGY_FILES = (
+    Path(__file__).resolve().parent.parent / 'gmn_ontology.ttl',
+    Path(__file__).resolve().parent.parent / 'parent-ontologies' / 'cidoc-crm-v7.1.3.ttl',
+)
+
+# Compiled rules are cached here, keyed by a hash of the mapping and ontology.
+# Set GMN_RULE_CACHE_DIR to move the cache, or to an empty string to disable it.
+RULE_CACHE_DIR = os.environ.get('GMN_RULE_CACHE_DIR', str(Path(__file__).with_name('__pycache__'))) or None
+
+
+# Minted URI suffixes are a keyed digest of the node's source value, so the same
+# input always yields the same URIs. GMN_URI_KEY changes the key (and with it
+# every minted URI); GMN_URI_LENGTH sets the suffix length in hex digits.
+URI_KEY = os.environ.get('GMN_URI_KEY', 'gmn-cidoc-transform')
+URI_LENGTH = int(os.environ.get('GMN_URI_LENGTH', '8'))
+
+
+class UriMinter:
     """
-    Transform gmn:P102_1_has_title to full CIDOC-CRM structure:
-    P102_has_title > E35_Title > P190_has_symbolic_content
+    Mint stable, collision-checked URIs for generated nodes.
+
+    The suffix appended to a URI prefix is the first `length` hex digits of a
+    keyed BLAKE2b digest of the minted value. Every URI handed out is
+    remembered with the digest it came from; when a different value would
+    produce a URI that is already taken, the suffix is lengthened until it is
+    unique again. Minted prefixes start with the item's subject URI, so the
+    table only needs to cover one item: every TransformContext has its own
+    minter, which the generated rules use through ctx.minter.
     """
-    if 'gmn:P102_1_has_title' not in data:
-        return data
-    
-    titles = data['gmn:P102_1_has_title']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P102_has_title' not in data:
-        data['cidoc:P102_has_title'] = []
-    
-    for title_obj in titles:
-        if isinstance(title_obj, dict):
-            title_value = title_obj.get('@value', '')
-        else:
-            title_value = str(title_obj)
-        
-        if not title_value:
-            continue
-        
-        title_hash = str(hash(title_value))[-8:]
-        title_uri = f"{subject_uri}/title/{title_hash}"
-        
-        title = {
-            '@id': title_uri,
-            '@type': 'cidoc:E35_Title',
-            'cidoc:P190_has_symbolic_content': title_value
-        }
-        
-        data['cidoc:P102_has_title'].append(title)
-    
-    del data['gmn:P102_1_has_title']
-    return data
 
+    DIGEST_SIZE = 16
+
+    def __init__(self, key=URI_KEY, length=URI_LENGTH):
+        if not 4 <= length <= self.DIGEST_SIZE * 2:
+            raise ValueError(f"URI suffix length must be between 4 and {self.DIGEST_SIZE * 2}, got {length}")
+        self.key = key.encode('utf-8') if isinstance(key, str) else key
+        self.length = length
+        self.collisions = 0
+        self._minted = {}
+
+    def mint(self, prefix, value):
+        """
+        Return prefix followed by the suffix minted for value.
+
+        Args:
+            prefix: URI prefix, e.g. 'https://example.org/item/1/appellation/'
+            value: Source value the node is derived from
 
-def transform_p3_1_has_editorial_note(data, include_internal=False):
+        Returns:
+            Minted URI string
+        """
+        digest = hashlib.blake2b(str(value).encode('utf-8'), key=self.key, digest_size=self.DIGEST_SIZE)
+        digest = digest.hexdigest()
+        # Store the digest as an int to keep the table compact
+        fingerprint = int(digest, 16)
+        length = self.length
+        while True:
+            uri = prefix + digest[:length]
+            minted = self._minted.setdefault(uri, fingerprint)
+            if minted == fingerprint:
+                return uri
+            if length == len(digest):
+                raise ValueError(f"Cannot mint a unique URI for {value!r} under {prefix}")
+            self.collisions += 1
+            length += 1
+
+    def reset(self):
+        """Forget all minted URIs."""
+        self._minted.clear()
+        self.collisions = 0
+
+
+def compile_rules(mapping_file=MAPPING_FILE, ontology_files=ONTOLOGY_FILES, cache_dir=RULE_CACHE_DIR):
     """
-    Transform gmn:P3_1_has_editorial_note to full CIDOC-CRM structure or remove it.
+    Compile the transformation rules declared in a mapping spec.
     
     Args:
-        data: The item data dictionary
-        include_internal: If True, transform to CIDOC-CRM. If False, remove the property.
+        mapping_file: Path to the JSON mapping spec
+        ontology_files: Turtle ontologies the rule plans are derived from
+        cache_dir: Directory for cached compiled rules, or None to always compile
     
     Returns:
-        Modified data dictionary
+        Code object that defines the shared type nodes, the node resolvers,
+        the transform_* functions, TRANSFORM_RULES, INTERNAL_PROPERTIES,
+        RULE_VARIANTS and TYPE_PLANS when executed in this module's namespace
     """
-    if 'gmn:P3_1_has_editorial_note' not in data:
-        return data
-    
-    if not include_internal:
-        del data['gmn:P3_1_has_editorial_note']
-        return data
-    
-    notes = data['gmn:P3_1_has_editorial_note']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P67i_is_referred_to_by' not in data:
-        data['cidoc:P67i_is_referred_to_by'] = []
-    
-    for note_obj in notes:
-        if isinstance(note_obj, dict):
-            note_value = note_obj.get('@value', '')
-        else:
-            note_value = str(note_obj)
-        
-        if not note_value:
-            continue
-        
-        note_hash = str(hash(note_value))[-8:]
-        note_uri = f"{subject_uri}/note/{note_hash}"
-        
-        linguistic_object = {
-            '@id': note_uri,
-            '@type': 'cidoc:E33_Linguistic_Object',
-            'cidoc:P2_has_type': {
-                '@id': AAT_EDITORIAL_NOTE,
-                '@type': 'cidoc:E55_Type'
-            },
-            'cidoc:P190_has_symbolic_content': note_value
-        }
-        
-        data['cidoc:P67i_is_referred_to_by'].append(linguistic_object)
-    
-    del data['gmn:P3_1_has_editorial_note']
-    return data
+    filename = f"<rules generated from {Path(mapping_file).name}>"
+    source, code = compile_cached(mapping_file, ontology_files, cache_dir, filename)
+    # Register the source so tracebacks through generated rules show code
+    linecache.cache[filename] = (len(source), None, source.splitlines(True), filename)
+    return code
+
+
+# Define the transform_* rule functions and the TRANSFORM_RULES registry. Rules
+# are listed in the order they must run: some read structures built by earlier
+# ones (procurators and guarantors need the seller and buyer, the currency
+# needs the monetary amount, the enactment date and place need the creation).
+exec(compile_rules(), globals())
 
 
-def transform_p94i_1_was_created_by(data):
+class TransformContext:
     """
-    Transform gmn:P94i_1_was_created_by to full CIDOC-CRM structure:
-    P94i_was_created_by > E65_Creation > P14_carried_out_by > E21_Person
+    Per-item state shared by the rules that transform one item.
+
+    Rules receive the context instead of the raw item dict. It resolves the
+    item's subject URI and types once, caches the named intermediate nodes
+    (acquisition, activity, creation, birth, time-spans) by role after their
+    first lookup, and keeps an @id index for every list the rules append to so
+    that a duplicate entry is found in constant time and merged into the
+    existing one instead of being appended.
     """
-    if 'gmn:P94i_1_was_created_by' not in data:
-        return data
-    
-    creators = data['gmn:P94i_1_was_created_by']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    creation_uri = f"{subject_uri}/creation"
-    creation = {
-        '@id': creation_uri,
-        '@type': 'cidoc:E65_Creation',
-        'cidoc:P14_carried_out_by': []
-    }
-    
-    for creator_obj in creators:
-        if isinstance(creator_obj, dict):
-            creator_data = creator_obj.copy()
-            if '@type' not in creator_data:
-                creator_data['@type'] = 'cidoc:E21_Person'
+
+    __slots__ = ('data', 'include_internal', 'item_types', 'subject_uri', 'nodes', 'minter', '_lists')
+
+    def __init__(self, data, include_internal=False):
+        self.data = data
+        self.include_internal = include_internal
+        item_type = data.get('@type')
+        if isinstance(item_type, list):
+            self.item_types = tuple(item_type)
         else:
-            creator_uri = str(creator_obj)
-            creator_data = {
-                '@id': creator_uri,
-                '@type': 'cidoc:E21_Person'
-            }
-        
-        creation['cidoc:P14_carried_out_by'].append(creator_data)
-    
-    data['cidoc:P94i_was_created_by'] = creation
-    del data['gmn:P94i_1_was_created_by']
-    return data
+            self.item_types = () if item_type is None else (item_type,)
+        self.subject_uri = data['@id'] if '@id' in data else f"urn:uuid:{uuid4()}"
+        self.nodes = {}
+        # Minted URIs can only collide within an item (see UriMinter), so
+        # threads transforming items concurrently never share a table
+        self.minter = UriMinter()
+        self._lists = {}
+
+    def node(self, key):
+        """
+        Return a named node, creating it on first use.
+
+        Args:
+            key: Node chain from the mapping spec, e.g. 'acquisition' or
+                 'creation/timespan'
+        """
+        node = self.nodes.get(key)
+        if node is None:
+            node = self.nodes[key] = NODE_RESOLVERS[key](self)
+        return node
+
+    def targets(self, parent, key):
+        """
+        Return the list at parent[key] (created if missing) and a dict mapping
+        the @id of every entry already in it to the entry. Rules add to both so
+        later appends stay de-duplicated.
+        """
+        index_key = (id(parent), key)
+        entry = self._lists.get(index_key)
+        if entry is None:
+            targets = parent.get(key)
+            if targets is None:
+                targets = parent[key] = []
+            elif not isinstance(targets, list):
+                targets = parent[key] = [targets]
+            ids = {}
+            for target in targets:
+                ids.setdefault(target.get('@id') if isinstance(target, dict) else target, target)
+            # The parent is kept alive so its id() cannot be reused for another dict
+            entry = self._lists[index_key] = (targets, ids, parent)
+        return entry[0], entry[1]
+
+    def set_value(self, parent, key, value):
+        """
+        Set a property without overwriting an earlier value (for the rules
+        declared "multiple" in the mapping spec).
+
+        A second, different value (compared by @id for nodes) turns the
+        property into a list holding both; a node with the same @id is merged
+        into the earlier one (see merge_types).
+        """
+        if key not in parent:
+            parent[key] = value
+            return
+        value_id = value.get('@id') if isinstance(value, dict) else value
+        existing = parent[key]
+        if not isinstance(existing, list):
+            if value_id == (existing.get('@id') if isinstance(existing, dict) else existing):
+                self.merge_types(existing, value)
+                return
+        targets, ids = self.targets(parent, key)
+        if value_id in ids:
+            self.merge_types(ids[value_id], value)
+        else:
+            ids[value_id] = value
+            targets.append(value)
+
+    @staticmethod
+    def merge_types(existing, value):
+        """
+        Add the @types of value to an entry with the same @id, so that a
+        class given later (e.g. E21_Person after E39_Actor) is kept. Shared
+        type nodes and entries that are not nodes are left as they are.
+        """
+        if type(existing) is not dict or not isinstance(value, dict) or '@type' not in value:
+            return
+        types = existing.get('@type')
+        types = [] if types is None else list(types) if isinstance(types, list) else [types]
+        new_types = value['@type'] if isinstance(value['@type'], list) else [value['@type']]
+        added = [item_type for item_type in new_types if item_type not in types]
+        if added:
+            types += added
+            existing['@type'] = types[0] if len(types) == 1 else types
+
+
+def build_rule_table(plan=None, item_types=()):
+    """
+    Build the dispatch table used by transform_item.
 
+    Args:
+        plan: Bitmask of TRANSFORM_RULES positions to include, or None for all
+        item_types: Item types used to bind type-specific rule variants directly
 
-def transform_p94i_2_has_enactment_date(data):
-    """
-    Transform gmn:P94i_2_has_enactment_date to full CIDOC-CRM structure:
-    P94i_was_created_by > E65_Creation > P4_has_time-span > E52_Time-Span > P82_at_some_time_within
+    Returns:
+        Dictionary mapping each shortcut property to an (order, rule) tuple,
+        where order is the rule's position in TRANSFORM_RULES
     """
-    if 'gmn:P94i_2_has_enactment_date' not in data:
-        return data
-    
-    dates = data['gmn:P94i_2_has_enactment_date']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P94i_was_created_by' not in data:
-        creation_uri = f"{subject_uri}/creation"
-        data['cidoc:P94i_was_created_by'] = {
-            '@id': creation_uri,
-            '@type': 'cidoc:E65_Creation'
-        }
-    
-    creation = data['cidoc:P94i_was_created_by']
-    
-    for date_obj in dates:
-        if isinstance(date_obj, dict):
-            date_value = date_obj.get('@value', '')
-        else:
-            date_value = str(date_obj)
-        
-        if not date_value:
+    table = {}
+    for order, (property_name, rule) in enumerate(TRANSFORM_RULES):
+        if plan is not None and not plan >> order & 1:
             continue
-        
-        timespan_uri = f"{creation['@id']}/timespan"
-        timespan = {
-            '@id': timespan_uri,
-            '@type': 'cidoc:E52_Time-Span',
-            'cidoc:P82_at_some_time_within': date_value
-        }
-        
-        creation['cidoc:P4_has_time-span'] = timespan
-    
-    del data['gmn:P94i_2_has_enactment_date']
-    return data
+        for when, variant in RULE_VARIANTS.get(property_name, ()) if item_types else ():
+            if any(item_type in when for item_type in item_types):
+                rule = variant
+                break
+        table[property_name] = (order, rule)
+    return table
 
 
-def transform_p94i_3_has_place_of_enactment(data):
-    """
-    Transform gmn:P94i_3_has_place_of_enactment to full CIDOC-CRM structure:
-    P94i_was_created_by > E65_Creation > P7_took_place_at > E53_Place
-    """
-    if 'gmn:P94i_3_has_place_of_enactment' not in data:
-        return data
-    
-    places = data['gmn:P94i_3_has_place_of_enactment']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P94i_was_created_by' not in data:
-        creation_uri = f"{subject_uri}/creation"
-        data['cidoc:P94i_was_created_by'] = {
-            '@id': creation_uri,
-            '@type': 'cidoc:E65_Creation'
-        }
-    
-    creation = data['cidoc:P94i_was_created_by']
-    
-    for place_obj in places:
-        if isinstance(place_obj, dict):
-            place_data = place_obj.copy()
-            if '@type' not in place_data:
-                place_data['@type'] = 'cidoc:E53_Place'
-        else:
-            place_uri = str(place_obj)
-            place_data = {
-                '@id': place_uri,
-                '@type': 'cidoc:E53_Place'
-            }
-        
-        creation['cidoc:P7_took_place_at'] = place_data
-    
-    del data['gmn:P94i_3_has_place_of_enactment']
-    return data
+# Table running every rule, built once at import time and used for items whose
+# @type has no plan
+RULE_TABLE = build_rule_table()
 
+# Only types in these namespaces are expected to have a plan; others (such as
+# Omeka's o:Item) are ignored when choosing one
+PLAN_NAMESPACES = ('gmn:', 'cidoc:')
 
-def transform_p70_1_documents_seller(data):
-    """
-    Transform gmn:P70_1_documents_seller to full CIDOC-CRM structure:
-    P70_documents > E8_Acquisition > P23_transferred_title_from > E21_Person
-    """
-    if 'gmn:P70_1_documents_seller' not in data:
-        return data
-    
-    sellers = data['gmn:P70_1_documents_seller']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        acquisition_uri = f"{subject_uri}/acquisition"
-        data['cidoc:P70_documents'] = [{
-            '@id': acquisition_uri,
-            '@type': 'cidoc:E8_Acquisition'
-        }]
-    
-    acquisition = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P23_transferred_title_from' not in acquisition:
-        acquisition['cidoc:P23_transferred_title_from'] = []
-    
-    for seller_obj in sellers:
-        if isinstance(seller_obj, dict):
-            seller_data = seller_obj.copy()
-            if '@type' not in seller_data:
-                seller_data['@type'] = 'cidoc:E21_Person'
-        else:
-            seller_uri = str(seller_obj)
-            seller_data = {
-                '@id': seller_uri,
-                '@type': 'cidoc:E21_Person'
-            }
-        
-        acquisition['cidoc:P23_transferred_title_from'].append(seller_data)
-    
-    del data['gmn:P70_1_documents_seller']
-    return data
+# (rule table, shortcut properties it leaves out) for the @type values seen
+# so far, keyed by the item's types
+_plan_tables = {}
 
 
-def transform_p70_2_documents_buyer(data):
+def type_plan(item_types):
     """
-    Transform gmn:P70_2_documents_buyer to full CIDOC-CRM structure:
-    P70_documents > E8_Acquisition > P22_transferred_title_to > E21_Person
+    Combine the TYPE_PLANS entries for an item's types.
+
+    Returns:
+        Rule bitmask, or None when no type has a plan or a GMN/CIDOC type is
+        unknown to the ontology (the item then runs the full rule set)
     """
-    if 'gmn:P70_2_documents_buyer' not in data:
-        return data
-    
-    buyers = data['gmn:P70_2_documents_buyer']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        acquisition_uri = f"{subject_uri}/acquisition"
-        data['cidoc:P70_documents'] = [{
-            '@id': acquisition_uri,
-            '@type': 'cidoc:E8_Acquisition'
-        }]
-    
-    acquisition = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P22_transferred_title_to' not in acquisition:
-        acquisition['cidoc:P22_transferred_title_to'] = []
-    
-    for buyer_obj in buyers:
-        if isinstance(buyer_obj, dict):
-            buyer_data = buyer_obj.copy()
-            if '@type' not in buyer_data:
-                buyer_data['@type'] = 'cidoc:E21_Person'
-        else:
-            buyer_uri = str(buyer_obj)
-            buyer_data = {
-                '@id': buyer_uri,
-                '@type': 'cidoc:E21_Person'
-            }
-        
-        acquisition['cidoc:P22_transferred_title_to'].append(buyer_data)
-    
-    del data['gmn:P70_2_documents_buyer']
-    return data
+    plan = None
+    for item_type in item_types:
+        if item_type in TYPE_PLANS:
+            plan = (plan or 0) | TYPE_PLANS[item_type]
+        elif not isinstance(item_type, str) or item_type.startswith(PLAN_NAMESPACES):
+            return None
+    return plan
 
 
-def transform_p70_3_documents_transfer_of(data):
+def rule_table_for(item_types, keys=()):
     """
-    Transform gmn:P70_3_documents_transfer_of to full CIDOC-CRM structure:
-    P70_documents > E8_Acquisition > P24_transferred_title_of > E18_Physical_Thing
+    Return the dispatch table for an item with the given types and keys.
+
+    Tables are built once per distinct tuple of types and reused, so an item
+    only looks up the rules whose rdfs:domain admits one of its classes. A
+    plan may only skip rules that cannot match: an item carrying a shortcut
+    property outside its plan gets RULE_TABLE, and so the same output as
+    without plans.
     """
-    if 'gmn:P70_3_documents_transfer_of' not in data:
-        return data
-    
-    things = data['gmn:P70_3_documents_transfer_of']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        acquisition_uri = f"{subject_uri}/acquisition"
-        data['cidoc:P70_documents'] = [{
-            '@id': acquisition_uri,
-            '@type': 'cidoc:E8_Acquisition'
-        }]
-    
-    acquisition = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P24_transferred_title_of' not in acquisition:
-        acquisition['cidoc:P24_transferred_title_of'] = []
-    
-    for thing_obj in things:
-        if isinstance(thing_obj, dict):
-            thing_data = thing_obj.copy()
-            if '@type' not in thing_data:
-                thing_data['@type'] = 'cidoc:E18_Physical_Thing'
+    try:
+        entry = _plan_tables.get(item_types)
+    except TypeError:
+        # Unhashable @type entries: no plan can apply
+        return RULE_TABLE
+    if entry is None:
+        plan = type_plan(item_types)
+        if plan is None:
+            entry = (RULE_TABLE, frozenset())
         else:
-            thing_uri = str(thing_obj)
-            thing_data = {
-                '@id': thing_uri,
-                '@type': 'cidoc:E18_Physical_Thing'
-            }
-        
-        acquisition['cidoc:P24_transferred_title_of'].append(thing_data)
-    
-    del data['gmn:P70_3_documents_transfer_of']
-    return data
+            table = build_rule_table(plan, item_types)
+            entry = (table, frozenset(RULE_TABLE.keys() - table.keys()))
+        _plan_tables[item_types] = entry
+    table, skipped = entry
+    if skipped and not skipped.isdisjoint(keys):
+        return RULE_TABLE
+    return table
 
 
-def transform_procurator_property(data, property_name, motivated_by_property):
-    """
-    Generic function to transform procurator properties.
-    Creates E7_Activity with P14_carried_out_by and P17_was_motivated_by.
+def transform_item(item, include_internal=False):
     """
-    if property_name not in data:
-        return data
-    
-    procurators = data[property_name]
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        acquisition_uri = f"{subject_uri}/acquisition"
-        data['cidoc:P70_documents'] = [{
-            '@id': acquisition_uri,
-            '@type': 'cidoc:E8_Acquisition'
-        }]
-    
-    acquisition = data['cidoc:P70_documents'][0]
+    Transform a single item, applying all transformation rules.
+
+    The item's keys are walked once and only the rules registered for the
+    shortcut properties it actually carries are run, in registry order. The
+    rules are looked up in the plan for the item's @type (see rule_table_for),
+    which holds type-specific rule variants and fewer rules to check.
     
-    if 'cidoc:P9_consists_of' not in acquisition:
-        acquisition['cidoc:P9_consists_of'] = []
+    Args:
+        item: Item data dictionary
+        include_internal: If True, transform internal notes to CIDOC-CRM. 
+                         If False (default), remove internal notes entirely.
     
-    # Get the motivated_by person (seller or buyer)
-    motivated_by_uri = None
-    if motivated_by_property in acquisition:
-        motivated_by_list = acquisition[motivated_by_property]
-        if isinstance(motivated_by_list, list) and len(motivated_by_list) > 0:
-            if isinstance(motivated_by_list[0], dict):
-                motivated_by_uri = motivated_by_list[0].get('@id')
-            else:
-                motivated_by_uri = str(motivated_by_list[0])
+    Returns:
+        Transformed item dictionary
+    """
+    ctx = TransformContext(item, bool(include_internal))
+    rules = rule_table_for(ctx.item_types, item)
+    matched = [rules[key] for key in item if key in rules]
+    if len(matched) > 1:
+        matched.sort()
     
-    for procurator_obj in procurators:
-        if isinstance(procurator_obj, dict):
-            procurator_uri = procurator_obj.get('@id', '')
-            procurator_data = procurator_obj.copy()
-        else:
-            procurator_uri = str(procurator_obj)
-            procurator_data = {
-                '@id': procurator_uri,
-                '@type': 'cidoc:E21_Person'
-            }
-        
-        activity_hash = str(hash(procurator_uri + property_name))[-8:]
-        activity_uri = f"{subject_uri}/activity/procurator_{activity_hash}"
-        
-        activity = {
-            '@id': activity_uri,
-            '@type': 'cidoc:E7_Activity',
-            'cidoc:P14_carried_out_by': [procurator_data],
-            'cidoc:P14.1_in_the_role_of': {
-                '@id': AAT_AGENT,
-                '@type': 'cidoc:E55_Type'
-            }
-        }
-        
-        if motivated_by_uri:
-            activity['cidoc:P17_was_motivated_by'] = {
-                '@id': motivated_by_uri,
-                '@type': 'cidoc:E21_Person'
-            }
-        
-        acquisition['cidoc:P9_consists_of'].append(activity)
+    for _, rule in matched:
+        rule(ctx)
     
-    del data[property_name]
-    return data
+    return item
 
 
-def transform_p70_4_documents_sellers_procurator(data):
-    """Transform gmn:P70_4_documents_sellers_procurator to full CIDOC-CRM structure."""
-    return transform_procurator_property(data, 'gmn:P70_4_documents_sellers_procurator', 
-                                        'cidoc:P23_transferred_title_from')
+class NodeMap:
+    """
+    Flattened JSON-LD node map built one transformed item at a time.
+
+    Every node object with an @id is stored once, keyed by @id, and replaced
+    wherever it is embedded by a {'@id': ...} reference. When the same node is
+    embedded in several items its properties are merged, so a notary or
+    witness referenced by thousands of contracts is written out only once.
+    Each value is visited once, so building the map is linear in the size of
+    the transformed items. A top-level item without an @id gets a blank node
+    identifier (_:item1, _:item2, ...) so that it has its place in the graph;
+    blank nodes embedded in an item stay embedded.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        # Hashable keys of the values already merged into multi-valued
+        # properties, keyed by (@id, property)
+        self._merged = {}
+        self._blank_count = 0
+
+    def add(self, item):
+        """Flatten a transformed item (and everything it embeds) into the map."""
+        if isinstance(item, dict) and not isinstance(item.get('@id'), str):
+            node_id = None
+            while node_id is None or node_id in self.nodes:
+                self._blank_count += 1
+                node_id = f'_:item{self._blank_count}'
+            item = {'@id': node_id, **{key: value for key, value in item.items() if key != '@id'}}
+        return self._flatten(item)
+
+    def _flatten(self, value):
+        if isinstance(value, list):
+            return [self._flatten(entry) for entry in value]
+        if not isinstance(value, dict):
+            return value
+        node_id = value.get('@id')
+        if not isinstance(node_id, str) or '@value' in value:
+            # Value objects and blank nodes stay embedded
+            return {key: self._flatten(entry) for key, entry in value.items()}
+
+        node = self.nodes.get(node_id)
+        if node is None:
+            node = self.nodes[node_id] = {'@id': node_id}
+        for key, entry in value.items():
+            if key != '@id':
+                self._merge(node, key, self._flatten(entry))
+        return {'@id': node_id}
+
+    def _merge(self, node, key, value):
+        if key not in node and not isinstance(value, list):
+            node[key] = value
+            return
+        existing = node.setdefault(key, [])
+        if existing == value:
+            return
+        merged_key = (node['@id'], key)
+        seen = self._merged.get(merged_key)
+        if seen is None:
+            if not isinstance(existing, list):
+                existing = node[key] = [existing]
+            seen = self._merged[merged_key] = {self._value_key(entry) for entry in existing}
+        for entry in value if isinstance(value, list) else [value]:
+            entry_key = self._value_key(entry)
+            if entry_key not in seen:
+                seen.add(entry_key)
+                existing.append(entry)
+
+    @staticmethod
+    def _value_key(value):
+        if isinstance(value, dict):
+            if len(value) == 1 and '@id' in value:
+                return ('@id', value['@id'])
+            return json.dumps(value, sort_keys=True)
+        if isinstance(value, list):
+            return json.dumps(value, sort_keys=True)
+        return value
+
+    def graph(self):
+        """Return the flattened nodes in first-seen order, skipping bare references."""
+        return [node for node in self.nodes.values() if len(node) > 1]
+
+
+def flatten_items(items, container=None):
+    """
+    Flatten transformed items into a single JSON-LD @graph of unique nodes.
 
+    Args:
+        items: Iterable of transformed items
+        container: Top-level export object whose other keys (@context) are kept;
+                   read after items is exhausted, so it may be filled while reading
 
-def transform_p70_5_documents_buyers_procurator(data):
-    """Transform gmn:P70_5_documents_buyers_procurator to full CIDOC-CRM structure."""
-    return transform_procurator_property(data, 'gmn:P70_5_documents_buyers_procurator', 
-                                        'cidoc:P22_transferred_title_to')
+    Returns:
+        Dictionary with the flattened '@graph'
+    """
+    node_map = NodeMap()
+    for item in items:
+        node_map.add(item)
+    flattened = {key: value for key, value in (container or {}).items() if key != '@graph'}
+    flattened['@graph'] = node_map.graph()
+    return flattened
 
 
-def transform_guarantor_property(data, property_name, motivated_by_property):
+def _transform_chunk(payload, include_internal=False, encoding=None):
     """
-    Generic function to transform guarantor properties.
-    Creates E7_Activity with P14_carried_out_by and P17_was_motivated_by.
-    """
-    if property_name not in data:
-        return data
-    
-    guarantors = data[property_name]
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        acquisition_uri = f"{subject_uri}/acquisition"
-        data['cidoc:P70_documents'] = [{
-            '@id': acquisition_uri,
-            '@type': 'cidoc:E8_Acquisition'
-        }]
-    
-    acquisition = data['cidoc:P70_documents'][0]
+    Transform a chunk of items in a worker process (see gmn_parallel).
     
-    if 'cidoc:P9_consists_of' not in acquisition:
-        acquisition['cidoc:P9_consists_of'] = []
-    
-    motivated_by_uri = None
-    if motivated_by_property in acquisition:
-        motivated_by_list = acquisition[motivated_by_property]
-        if isinstance(motivated_by_list, list) and len(motivated_by_list) > 0:
-            if isinstance(motivated_by_list[0], dict):
-                motivated_by_uri = motivated_by_list[0].get('@id')
-            else:
-                motivated_by_uri = str(motivated_by_list[0])
-    
-    for guarantor_obj in guarantors:
-        if isinstance(guarantor_obj, dict):
-            guarantor_uri = guarantor_obj.get('@id', '')
-            guarantor_data = guarantor_obj.copy()
-        else:
-            guarantor_uri = str(guarantor_obj)
-            guarantor_data = {
-                '@id': guarantor_uri,
-                '@type': 'cidoc:E21_Person'
-            }
-        
-        activity_hash = str(hash(guarantor_uri + property_name))[-8:]
-        activity_uri = f"{subject_uri}/activity/guarantor_{activity_hash}"
-        
-        activity = {
-            '@id': activity_uri,
-            '@type': 'cidoc:E7_Activity',
-            'cidoc:P14_carried_out_by': [guarantor_data],
-            'cidoc:P14.1_in_the_role_of': {
-                '@id': AAT_GUARANTOR,
-                '@type': 'cidoc:E55_Type'
-            }
-        }
-        
-        if motivated_by_uri:
-            activity['cidoc:P17_was_motivated_by'] = {
-                '@id': motivated_by_uri,
-                '@type': 'cidoc:E21_Person'
-            }
-        
-        acquisition['cidoc:P9_consists_of'].append(activity)
+    Args:
+        payload: The items as the text of a JSON array
+        include_internal: As for transform_item
+        encoding: (format, kind, indent, backend name) of a JSON or JSON Lines
+                  output to encode the items for, or None to return the items
     
-    del data[property_name]
-    return data
-
-
-def transform_p70_6_documents_sellers_guarantor(data):
-    """Transform gmn:P70_6_documents_sellers_guarantor to full CIDOC-CRM structure."""
-    return transform_guarantor_property(data, 'gmn:P70_6_documents_sellers_guarantor', 
-                                       'cidoc:P23_transferred_title_from')
-
-
-def transform_p70_7_documents_buyers_guarantor(data):
-    """Transform gmn:P70_7_documents_buyers_guarantor to full CIDOC-CRM structure."""
-    return transform_guarantor_property(data, 'gmn:P70_7_documents_buyers_guarantor', 
-                                       'cidoc:P22_transferred_title_to')
+    Returns:
+        (item @id, text) pairs for the writer's write_encoded(), or the
+        transformed items if encoding is None
+    """
+    backend = get_backend(encoding[3] if encoding else None)
+    items = [transform_item(item, include_internal) for item in backend.loads(payload)]
+    if encoding is None:
+        return items
+    output_format, kind, indent, _ = encoding
+    encoder = open_writer(None, output_format, SimpleNamespace(kind=kind, header={}), indent, backend)
+    return [(item.get('@id'), encoder.encode(item)) for item in items]
 
 
-def transform_p70_8_documents_broker(data):
-    """
-    Transform gmn:P70_8_documents_broker to full CIDOC-CRM structure:
-    P70_documents > E8_Acquisition > P14_carried_out_by > E21_Person (with role)
+def _transform_parallel(reader, include_internal=False, workers=None, backend=None, output_format=None, indent=2):
     """
-    if 'gmn:P70_8_documents_broker' not in data:
-        return data
+    Transform the items of a reader in worker processes, yielding them in input order.
     
-    brokers = data['gmn:P70_8_documents_broker']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
+    The items are sent to the workers as JSON text: JSON Lines input is passed
+    on line by line without being decoded here. Building the transformed
+    items back up costs this process about as much as transforming them, so
+    for JSON and JSON Lines output the workers encode them as well.
     
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        acquisition_uri = f"{subject_uri}/acquisition"
-        data['cidoc:P70_documents'] = [{
-            '@id': acquisition_uri,
-            '@type': 'cidoc:E8_Acquisition'
-        }]
-    
-    acquisition = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P14_carried_out_by' not in acquisition:
-        acquisition['cidoc:P14_carried_out_by'] = []
-    
-    for broker_obj in brokers:
-        if isinstance(broker_obj, dict):
-            broker_data = broker_obj.copy()
-            if '@type' not in broker_data:
-                broker_data['@type'] = 'cidoc:E21_Person'
-        else:
-            broker_uri = str(broker_obj)
-            broker_data = {
-                '@id': broker_uri,
-                '@type': 'cidoc:E21_Person'
-            }
-        
-        broker_data['cidoc:P14.1_in_the_role_of'] = {
-            '@id': AAT_BROKER,
-            '@type': 'cidoc:E55_Type'
-        }
-        
-        acquisition['cidoc:P14_carried_out_by'].append(broker_data)
+    Args:
+        output_format: 'json' or 'jsonl' to receive encoded items
+        indent: Indentation of that output
     
-    del data['gmn:P70_8_documents_broker']
-    return data
+    Yields:
+        (item @id, text) pairs if output_format is given, otherwise the
+        transformed items
+    """
+    backend = backend or get_backend()
+    if isinstance(reader, JsonLinesReader):
+        texts = reader.lines()
+    else:
+        texts = (backend.dumps(item) for item in reader)
+    texts = iter(texts)
+    first = next(texts, None)
+    if first is None:
+        return
+    encoding = None
+    if output_format in INPUT_FORMATS:
+        # The indentation of JSON items depends on the export's kind, which
+        # is known once reading has started
+        encoding = (output_format, reader.kind, indent, backend.name)
+    function = partial(_transform_chunk, include_internal=include_internal, encoding=encoding)
+    for results in ordered_map(function, json_chunks(chain([first], texts)), workers):
+        yield from results
 
 
-def transform_p70_9_documents_payment_provider_for_buyer(data):
-    """
-    Transform gmn:P70_9_documents_payment_provider_for_buyer to full CIDOC-CRM structure:
-    P70_documents > E8_Acquisition > P9_consists_of > E7_Activity > P14_carried_out_by > E21_Person (with role)
+def _transform_items(reader, include_internal=False, flatten=False, workers=None, backend=None):
     """
-    if 'gmn:P70_9_documents_payment_provider_for_buyer' not in data:
-        return data
-    
-    payers = data['gmn:P70_9_documents_payment_provider_for_buyer']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        acquisition_uri = f"{subject_uri}/acquisition"
-        data['cidoc:P70_documents'] = [{
-            '@id': acquisition_uri,
-            '@type': 'cidoc:E8_Acquisition'
-        }]
+    Transform the items of a reader lazily, in worker processes if workers > 1.
     
-    acquisition = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P9_consists_of' not in acquisition:
-        acquisition['cidoc:P9_consists_of'] = []
-    
-    for payer_obj in payers:
-        if isinstance(payer_obj, dict):
-            payer_uri = payer_obj.get('@id', '')
-            payer_data = payer_obj.copy()
-        else:
-            payer_uri = str(payer_obj)
-            payer_data = {
-                '@id': payer_uri,
-                '@type': 'cidoc:E21_Person'
-            }
-        
-        activity_hash = str(hash(payer_uri + 'payment_provider'))[-8:]
-        activity_uri = f"{subject_uri}/activity/payment_{activity_hash}"
-        
-        activity = {
-            '@id': activity_uri,
-            '@type': 'cidoc:E7_Activity',
-            'cidoc:P2_has_type': {
-                '@id': AAT_FINANCIAL_TRANSACTION,
-                '@type': 'cidoc:E55_Type'
-            },
-            'cidoc:P14_carried_out_by': [payer_data],
-            'cidoc:P14.1_in_the_role_of': {
-                '@id': AAT_PAYER,
-                '@type': 'cidoc:E55_Type'
-            }
-        }
-        
-        acquisition['cidoc:P9_consists_of'].append(activity)
-    
-    del data['gmn:P70_9_documents_payment_provider_for_buyer']
-    return data
+    Returns:
+        (items, layout): iterator over the transformed items, and the layout
+        (kind and header) their writer should use
+    """
+    if workers and workers > 1:
+        items = _transform_parallel(reader, include_internal, workers, backend)
+    else:
+        items = (transform_item(item, include_internal) for item in reader)
+    if not flatten:
+        return items, reader
+    # The node map needs every item before any node can be written
+    items = flatten_items(items)['@graph']
+    # The header is only complete once every item has been read; a single-item
+    # export has none, its top-level object being the item itself
+    header = {} if reader.kind == KIND_ITEM else reader.header
+    header = {key: value for key, value in header.items() if key != '@graph'}
+    return items, SimpleNamespace(kind=KIND_GRAPH, header=header)
 
 
-def transform_p70_10_documents_payment_recipient_for_seller(data):
+def _write_items(reader, writer, include_internal=False, workers=None, backend=None, output_format=None, indent=2,
+                 pipeline=None):
     """
-    Transform gmn:P70_10_documents_payment_recipient_for_seller to full CIDOC-CRM structure:
-    P70_documents > E8_Acquisition > P9_consists_of > E7_Activity > P14_carried_out_by > E21_Person (with role)
-    """
-    if 'gmn:P70_10_documents_payment_recipient_for_seller' not in data:
-        return data
-    
-    payees = data['gmn:P70_10_documents_payment_recipient_for_seller']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
+    Transform the items of a reader into an open writer.
     
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        acquisition_uri = f"{subject_uri}/acquisition"
-        data['cidoc:P70_documents'] = [{
-            '@id': acquisition_uri,
-            '@type': 'cidoc:E8_Acquisition'
-        }]
-    
-    acquisition = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P9_consists_of' not in acquisition:
-        acquisition['cidoc:P9_consists_of'] = []
-    
-    for payee_obj in payees:
-        if isinstance(payee_obj, dict):
-            payee_uri = payee_obj.get('@id', '')
-            payee_data = payee_obj.copy()
-        else:
-            payee_uri = str(payee_obj)
-            payee_data = {
-                '@id': payee_uri,
-                '@type': 'cidoc:E21_Person'
-            }
-        
-        activity_hash = str(hash(payee_uri + 'payment_recipient'))[-8:]
-        activity_uri = f"{subject_uri}/activity/payment_{activity_hash}"
-        
-        activity = {
-            '@id': activity_uri,
-            '@type': 'cidoc:E7_Activity',
-            'cidoc:P2_has_type': {
-                '@id': AAT_FINANCIAL_TRANSACTION,
-                '@type': 'cidoc:E55_Type'
-            },
-            'cidoc:P14_carried_out_by': [payee_data],
-            'cidoc:P14.1_in_the_role_of': {
-                '@id': AAT_PAYEE,
-                '@type': 'cidoc:E55_Type'
-            }
-        }
-        
-        acquisition['cidoc:P9_consists_of'].append(activity)
+    Args:
+        pipeline: If given, the number of transform threads of a threaded
+                  read -> transform -> write pipeline (see gmn_pipeline),
+                  whose per-stage throughput is printed
     
-    del data['gmn:P70_10_documents_payment_recipient_for_seller']
-    return data
+    Returns:
+        Number of items written
+    """
+    count = writer.count
+    if pipeline:
+        stages = Pipeline(partial(transform_item, include_internal=include_internal), pipeline)
+        stages.run(reader, writer.write)
+        for stats in stages.stats:
+            print(f"  {stats}")
+        if stages.bottleneck is not None:
+            print(f"  Bottleneck: {stages.bottleneck.name}")
+    elif workers and workers > 1 and output_format in INPUT_FORMATS:
+        for item_id, text in _transform_parallel(reader, include_internal, workers, backend, output_format, indent):
+            writer.write_encoded(text, item_id)
+    else:
+        items, _ = _transform_items(reader, include_internal, False, workers, backend)
+        for item in items:
+            writer.write(item)
+    return writer.count - count
+
+
+def _open_output(output_file, output_format, layout, compact, backend, compression, compression_level,
+                 buffer_size, graph, shard_items, shard_bytes):
+    """Create the writer for transform_export and transform_batch, sharded if requested."""
+    indent = None if compact else 2
+    if shard_items or shard_bytes:
+        return ShardedWriter(output_file, layout, output_format, shard_items, shard_bytes, compression,
+                             compression_level, buffer_size, indent=indent, backend=backend, graph=graph)
+    return open_writer(output_file, output_format, layout, indent, backend, compression,
+                       compression_level, buffer_size, graph)
+
+
+def _export(reader, output_file, include_internal, flatten, workers, backend, output_format, compact, compression,
+            compression_level, buffer_size, graph, shard_items, shard_bytes, pipeline=None):
+    """Transform the items of a reader into a new output; returns the closed writer."""
+    if flatten:
+        items, layout = _transform_items(reader, include_internal, True, workers, backend)
+        with _open_output(output_file, output_format, layout, compact, backend, compression, compression_level,
+                          buffer_size, graph, shard_items, shard_bytes) as writer:
+            for item in items:
+                writer.write(item)
+        return writer
+    # Each item is written as soon as it is transformed; JSON output follows
+    # the input's shape (single item, array or @graph with @context and
+    # other top-level keys)
+    with _open_output(output_file, output_format, reader, compact, backend, compression, compression_level,
+                      buffer_size, graph, shard_items, shard_bytes) as writer:
+        _write_items(reader, writer, include_internal, workers, backend, detect_format(output_file, output_format),
+                     None if compact else 2, pipeline)
+    return writer
+
+
+def _harvest_changes(url, output_file, include_internal, workers, backend, output_format, compact, compression,
+                     compression_level, buffer_size, shard_items, shard_bytes, pipeline, harvest_options):
+    """
+    Bring an output harvested from an Omeka-S site up to date (see transform_export).
+    
+    The first run harvests every item, sorted by id, and saves the harvest
+    state next to the output. Later runs only harvest the items modified
+    since, transform them and merge them into the output, rewriting only the
+    shards they belong to when it is sharded.
+    """
+    output_format = detect_format(output_file, output_format)
+    if output_format not in INPUT_FORMATS:
+        raise ValueError(f"Incremental harvests merge into JSON or JSON Lines output, not '{output_format}'")
+    state_file = state_path(output_file)
+    state = load_state(state_file)
+    sharded = manifest_path(output_file).exists()
+    if (state is None or state.get('endpoint') != items_endpoint(url) or not state.get('modified')
+            or not (sharded or Path(output_file).exists())):
+        print("No earlier harvest into this output: harvesting every item")
+        reader = HarvestReader(url, backend=backend, **harvest_options)
+        _export(reader, output_file, include_internal, False, workers, backend, output_format, compact, compression,
+                compression_level, buffer_size, None, shard_items, shard_bytes, pipeline)
+        indent = None if compact else 2
+    else:
+        reader = HarvestReader(url, backend=backend, modified_since=state['modified'], etags=state.get('etags'),
+                               seen_ids=state.get('modified_ids'), **harvest_options)
+        changed = {}
+        for item in reader:
+            transformed = transform_item(item, include_internal)
+            changed[transformed.get('@id')] = transformed
+        # Merged items are laid out like the rest of the output
+        indent = state.get('indent', None if compact else 2)
+        if changed and sharded:
+            files = merge_shards(output_file, changed, indent=indent, backend=backend)
+            print(f"  Merged {len(changed)} items into {len(files)} shards: {', '.join(files)}")
+        elif changed:
+            merge_file(output_file, changed, output_format, compression, indent=indent, backend=backend)
+            print(f"  Merged {len(changed)} items into {output_file}")
+    print(reader.summary())
+    save_state(state_file, reader.harvester, format=output_format, indent=indent)
+
+
+def transform_settings(include_internal=False, output_format='json', indent=2, backend=None):
+    """
+    Return the versions and options a transformed output depends on.
+    
+    'transformer' covers this script, the rule compiler, the mapping spec and
+    the URI minting key; 'ontology' covers ONTOLOGY_FILES. An output holds for
+    the same input items as long as none of these change.
+    """
+    backend = backend or get_backend()
+    return {
+        'transformer': files_digest((Path(__file__), Path(__file__).with_name('gmn_rule_compiler.py'), MAPPING_FILE),
+                                    URI_KEY, URI_LENGTH),
+        'ontology': files_digest(ONTOLOGY_FILES),
+        'include_internal': bool(include_internal),
+        'format': output_format,
+        'indent': indent,
+        'json_backend': backend.name,
+    }
 
 
-def transform_p70_11_documents_referenced_person(data):
+def _export_reusing(reader, output_file, include_internal, backend, output_format, compact, compression,
+                    compression_level, buffer_size):
     """
-    Transform gmn:P70_11_documents_referenced_person to full CIDOC-CRM structure:
-    P67_refers_to > E21_Person
-    """
-    if 'gmn:P70_11_documents_referenced_person' not in data:
-        return data
-    
-    persons = data['gmn:P70_11_documents_referenced_person']
+    Transform the items of a reader, reusing the previous output of unchanged items.
     
-    if 'cidoc:P67_refers_to' not in data:
-        data['cidoc:P67_refers_to'] = []
+    Every input item is hashed (see gmn_item_hashes) before it is transformed.
+    If the hashes saved with the previous output still apply, an item with
+    the same hash as then is copied from the previous output instead of
+    being transformed; items no longer in the input are dropped. If the
+    previous output turns out not to match the hashes, the remaining items
+    are all transformed. The output is written through a temporary file that
+    replaces it once complete, and the new hashes are saved next to it.
     
-    for person_obj in persons:
-        if isinstance(person_obj, dict):
-            person_data = person_obj.copy()
-            if '@type' not in person_data:
-                person_data['@type'] = 'cidoc:E21_Person'
+    Returns:
+        (reused, transformed) item counts
+    """
+    output_format = detect_format(output_file, output_format)
+    if output_format not in INPUT_FORMATS:
+        raise ValueError(f"Unchanged items are reused from JSON or JSON Lines output, not '{output_format}'")
+    output_file = Path(output_file)
+    compression = detect_compression(output_file, compression)
+    indent = None if compact else 2
+    settings = transform_settings(include_internal, output_format, indent, backend)
+    hashes_file = hashes_path(output_file)
+    saved = load_hashes(hashes_file)
+    reason = stale_reason(saved, output_file, settings)
+    if reason is None:
+        old_hashes = saved['items']
+        previous_reader = open_reader(output_file, output_format, backend, buffer_size=buffer_size)
+        if isinstance(previous_reader, JsonLinesReader):
+            # Lines are copied as they are, only decoded for their @id
+            entries = ((backend.loads(line).get('@id'), line) for line in previous_reader.lines())
         else:
-            person_uri = str(person_obj)
-            person_data = {
-                '@id': person_uri,
-                '@type': 'cidoc:E21_Person'
-            }
-        
-        data['cidoc:P67_refers_to'].append(person_data)
-    
-    del data['gmn:P70_11_documents_referenced_person']
-    return data
-
-
-def transform_p70_12_documents_payment_through_organization(data):
-    """
-    Transform gmn:P70_12_documents_payment_through_organization to full CIDOC-CRM structure:
-    P67_refers_to > E74_Group
-    """
-    if 'gmn:P70_12_documents_payment_through_organization' not in data:
-        return data
-    
-    organizations = data['gmn:P70_12_documents_payment_through_organization']
+            entries = ((item.get('@id') if isinstance(item, dict) else None, item) for item in previous_reader)
+        previous = PreviousOutput(entries, old_hashes)
+    else:
+        print(f"  Transforming every item: {reason}")
+        old_hashes = {}
+        previous = None
+    hashes = {}
+    reused = transformed = 0
+    temporary = output_file.with_name(output_file.name + '.tmp')
+    try:
+        with open_writer(temporary, output_format, reader, indent, backend, compression or COMPRESSION_NONE,
+                         compression_level, buffer_size) as writer:
+            for item in reader:
+                item_id = item.get('@id') if isinstance(item, dict) else None
+                # Hashed first: transform_item changes the item in place
+                digest = item_hash(item, backend)
+                output = None
+                if item_id is not None:
+                    hashes[item_id] = digest
+                    if old_hashes.get(item_id) == digest:
+                        output = previous.pop(item_id)
+                        if output is None:
+                            print(f"  '{output_file}' does not match its item hashes ({item_id} is not where it "
+                                  f"was written): transforming the remaining items")
+                            previous.close()
+                            previous = None
+                            old_hashes = {}
+                    elif previous is not None:
+                        previous.discard(item_id)
+                if isinstance(output, str):
+                    writer.write_encoded(output)
+                    reused += 1
+                elif output is not None:
+                    writer.write(output)
+                    reused += 1
+                else:
+                    writer.write(transform_item(item, include_internal))
+                    transformed += 1
+        if previous is not None:
+            # Done with the previous output before it is replaced
+            previous.close()
+        os.replace(temporary, output_file)
+    finally:
+        if temporary.exists():
+            temporary.unlink()
+    save_hashes(hashes_file, output_file, settings, hashes)
+    return reused, transformed
+
+
+def transform_export(input_file, output_file, include_internal=False, flatten=False,
+                     input_format=None, output_format=None, compact=False, json_backend=None,
+                     item_ids=None, compression=None, compression_level=None, buffer_size=None,
+                     graph=None, shard_items=None, shard_bytes=None, workers=None, pipeline=None,
+                     harvest_options=None, incremental=False, reuse_unchanged=False):
+    """
+    Transform an entire JSON-LD export file, or the items of an Omeka-S site.
     
-    if 'cidoc:P67_refers_to' not in data:
-        data['cidoc:P67_refers_to'] = []
+    Args:
+        input_file: Path to input JSON-LD file, or the http(s) address of an
+                    Omeka-S site whose items are harvested from its REST API
+                    while they are transformed (see gmn_harvest)
+        output_file: Path to output CIDOC-CRM compliant file
+        include_internal: If True, transform internal notes. If False (default), remove them.
+        flatten: If True, write a flattened @graph in which every node appears
+                 once and embedded nodes are replaced by {'@id': ...} references
+        input_format: 'json' or 'jsonl' (default: 'jsonl' for .jsonl/.ndjson
+                      files, 'json' otherwise)
+        output_format: 'json', 'jsonl', 'nt' (N-Triples), 'nq' (N-Quads),
+                       'ttl' (Turtle), 'triples' (dictionary-encoded binary,
+                       see gmn_triple_store), 'npy' (a directory of columns)
+                       or 'arrow' (see gmn_columnar_export), detected from
+                       output_file the same way except for 'npy'
+        compact: If True, write JSON on a single line with minimal separators
+                 instead of indenting by two spaces
+        json_backend: JSON library to encode with ('orjson', 'ujson' or 'json');
+                      default is the fastest installed
+        item_ids: If given, transform only the items with these @ids, read
+                  through a sidecar byte-offset index of the export (built on
+                  first use) instead of parsing the whole file
+        compression: Output compression ('gzip', 'bz2', 'xz', 'zstd' or
+                     'none'); default is detected from the output file's
+                     extension. Compressed input is always detected.
+        compression_level: Output compression level (default: the library's)
+        buffer_size: Bytes read or written per call to the file and the
+                     (de)compressor
+        graph: Named graph IRI for all N-Quads output (default: one graph
+               per item)
+        shard_items: If given, split the output into numbered shards of at
+                     most this many items (see gmn_shards), with a manifest
+        shard_bytes: If given, start a new shard once a shard's uncompressed
+                     output reaches this size
+        workers: If greater than 1, transform chunks of items in this many
+                 processes (see gmn_parallel); the output is the same
+        pipeline: If given, read, transform (in this many threads) and write
+                  concurrently (see gmn_pipeline) and print the throughput
+                  of each stage; not combined with flatten or workers
+        harvest_options: Further arguments for HarvestReader when harvesting
+                         (concurrency, per_page, query)
+        incremental: When harvesting into JSON or JSON Lines output, only
+                     harvest the items modified since the last run and merge
+                     them into its output (see gmn_harvest)
+        reuse_unchanged: Keep a content hash of every input item next to the
+                         JSON or JSON Lines output (<output>-hashes.json) and
+                         copy unchanged items from the previous output instead
+                         of transforming them again (see gmn_item_hashes)
     
-    for org_obj in organizations:
-        if isinstance(org_obj, dict):
-            org_data = org_obj.copy()
-            if '@type' not in org_data:
-                org_data['@type'] = 'cidoc:E74_Group'
+    Returns:
+        Boolean indicating success or failure
+    """
+    index = None
+    try:
+        # Items are parsed one at a time instead of loading the whole export
+        backend = get_backend(json_backend)
+        if incremental:
+            _harvest_changes(input_file, output_file, include_internal, workers, backend, output_format, compact,
+                             compression, compression_level, buffer_size, shard_items, shard_bytes, pipeline,
+                             harvest_options or {})
+            print(f"✓ Incremental harvest complete: {output_file} (state in {state_path(output_file)})")
+            return True
+        if is_url(input_file):
+            reader = HarvestReader(input_file, backend=backend, **(harvest_options or {}))
+        elif item_ids:
+            index = ExportIndex(input_file)
+            reader = index.reader(item_ids)
+        else:
+            reader = open_reader(input_file, input_format, backend, buffer_size=buffer_size)
+        if reuse_unchanged:
+            reused, transformed = _export_reusing(reader, output_file, include_internal, backend, output_format,
+                                                  compact, compression, compression_level, buffer_size)
+            if isinstance(reader, HarvestReader):
+                print(reader.summary())
+            print(f"✓ Transformation complete: {output_file} ({transformed} items transformed, "
+                  f"{reused} unchanged items reused; hashes in {hashes_path(output_file)})")
+            return True
+        writer = _export(reader, output_file, include_internal, flatten, workers, backend, output_format, compact,
+                         compression, compression_level, buffer_size, graph, shard_items, shard_bytes, pipeline)
+        if isinstance(reader, HarvestReader):
+            print(reader.summary())
+        
+        if shard_items or shard_bytes:
+            print(f"✓ Transformation complete: {len(writer.shards)} shards, manifest {manifest_path(output_file)}")
         else:
-            org_uri = str(org_obj)
-            org_data = {
-                '@id': org_uri,
-                '@type': 'cidoc:E74_Group'
-            }
+            print(f"✓ Transformation complete: {output_file}")
+        return True
         
-        data['cidoc:P67_refers_to'].append(org_data)
-    
-    del data['gmn:P70_12_documents_payment_through_organization']
-    return data
+    except FileNotFoundError:
+        print(f"✗ Error: Input file '{input_file}' not found", file=sys.stderr)
+        return False
+    except json.JSONDecodeError as e:
+        print(f"✗ Error: Invalid JSON in input file: {e}", file=sys.stderr)
+        return False
+    except KeyError as e:
+        print(f"✗ Error: {e.args[0]}", file=sys.stderr)
+        return False
+    except ImportError as e:
+        print(f"✗ Error: {e}", file=sys.stderr)
+        return False
+    except HARVEST_ERRORS as e:
+        print(f"✗ Error: {e or type(e).__name__}", file=sys.stderr)
+        return False
+    except Exception as e:
+        print(f"✗ Error during transformation: {e}", file=sys.stderr)
+        import traceback
+        traceback.print_exc()
+        return False
+    finally:
+        if index is not None:
+            index.close()
 
 
-def transform_p70_13_documents_referenced_place(data):
-    """
-    Transform gmn:P70_13_documents_referenced_place to full CIDOC-CRM structure:
-    P67_refers_to > E53_Place
-    """
-    if 'gmn:P70_13_documents_referenced_place' not in data:
-        return data
-    
-    places = data['gmn:P70_13_documents_referenced_place']
-    
-    if 'cidoc:P67_refers_to' not in data:
-        data['cidoc:P67_refers_to'] = []
-    
-    for place_obj in places:
-        if isinstance(place_obj, dict):
-            place_data = place_obj.copy()
-            if '@type' not in place_data:
-                place_data['@type'] = 'cidoc:E53_Place'
-        else:
-            place_uri = str(place_obj)
-            place_data = {
-                '@id': place_uri,
-                '@type': 'cidoc:E53_Place'
-            }
-        
-        data['cidoc:P67_refers_to'].append(place_data)
-    
-    del data['gmn:P70_13_documents_referenced_place']
-    return data
+# Input file names picked up from a directory in batch mode (optionally
+# followed by a compression extension)
+BATCH_EXTENSIONS = ('.json', '.jsonld', '.jsonl', '.ndjson')
 
+# Extension of each output format, used to name batch outputs
+OUTPUT_EXTENSIONS = {
+    'json': '.json', 'jsonl': '.jsonl', 'nt': '.nt', 'nq': '.nq', 'ttl': '.ttl',
+    'triples': '.triples', 'npy': '', 'arrow': '.arrow',
+}
 
-def transform_p70_14_documents_referenced_object(data):
-    """
-    Transform gmn:P70_14_documents_referenced_object to full CIDOC-CRM structure:
-    P67_refers_to > E18_Physical_Thing
+
+def find_inputs(pattern):
     """
-    if 'gmn:P70_14_documents_referenced_object' not in data:
-        return data
+    Expand a batch input into a sorted list of files.
     
-    objects = data['gmn:P70_14_documents_referenced_object']
+    Args:
+        pattern: A directory (its export files, not recursive), a glob
+                 pattern such as 'exports/*.json.gz' or 'exports/**/*.json',
+                 or a single file
+    """
+    path = Path(pattern)
+    if path.is_dir():
+        suffixes = BATCH_EXTENSIONS + tuple(extension + compressed for extension in BATCH_EXTENSIONS
+                                            for compressed, _ in COMPRESSIONS.values())
+        return sorted(str(child) for child in path.iterdir()
+                      if child.is_file() and child.name.lower().endswith(suffixes))
+    if glob.has_magic(str(pattern)):
+        return sorted(name for name in glob.glob(str(pattern), recursive=True) if os.path.isfile(name))
+    return [str(pattern)]
+
+
+def batch_output_path(input_file, output_dir, output_format=None, compression=None):
+    """
+    Return the output path for one input of a batch: the input's name in
+    output_dir, with the output format's extension if output_format is given
+    and the compression's extension if compression is given.
+    """
+    stem, suffixes = split_name(Path(output_dir) / Path(input_file).name)
+    input_compression = detect_compression(input_file)
+    if input_compression:
+        suffixes = suffixes[:-len(COMPRESSIONS[input_compression][0])]
+    if output_format:
+        suffixes = OUTPUT_EXTENSIONS[output_format]
+    if compression:
+        if compression != COMPRESSION_NONE:
+            suffixes += COMPRESSIONS[compression][0]
+    elif input_compression and output_format not in ('triples', 'npy', 'arrow'):
+        suffixes += COMPRESSIONS[input_compression][0]
+    return stem + suffixes
+
+
+def transform_batch(inputs, output, include_internal=False, flatten=False, input_format=None, output_format=None,
+                    compact=False, json_backend=None, compression=None, compression_level=None, buffer_size=None,
+                    graph=None, shard_items=None, shard_bytes=None, workers=None, pipeline=None):
+    """
+    Transform many exports in one process, reporting the throughput of each
+    (items/s, and MB/s of the input file as stored, i.e. compressed if it is).
+    
+    The rules are compiled once for the whole batch and the JSON backend is
+    shared, so each file only costs its own parsing, transformation and
+    writing.
     
-    if 'cidoc:P67_refers_to' not in data:
-        data['cidoc:P67_refers_to'] = []
-    
-    for obj_obj in objects:
-        if isinstance(obj_obj, dict):
-            obj_data = obj_obj.copy()
-            if '@type' not in obj_data:
-                obj_data['@type'] = 'cidoc:E18_Physical_Thing'
-        else:
-            obj_uri = str(obj_obj)
-            obj_data = {
-                '@id': obj_uri,
-                '@type': 'cidoc:E18_Physical_Thing'
-            }
-        
-        data['cidoc:P67_refers_to'].append(obj_data)
-    
-    del data['gmn:P70_14_documents_referenced_object']
-    return data
-
-
-def transform_p70_15_documents_witness(data):
-    """
-    Transform gmn:P70_15_documents_witness to full CIDOC-CRM structure:
-    P70_documents > E8_Acquisition > P9_consists_of > E7_Activity > P14_carried_out_by > E21_Person (with role)
-    """
-    if 'gmn:P70_15_documents_witness' not in data:
-        return data
-    
-    witnesses = data['gmn:P70_15_documents_witness']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        acquisition_uri = f"{subject_uri}/acquisition"
-        data['cidoc:P70_documents'] = [{
-            '@id': acquisition_uri,
-            '@type': 'cidoc:E8_Acquisition'
-        }]
-    
-    acquisition = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P9_consists_of' not in acquisition:
-        acquisition['cidoc:P9_consists_of'] = []
-    
-    for witness_obj in witnesses:
-        if isinstance(witness_obj, dict):
-            witness_uri = witness_obj.get('@id', '')
-            witness_data = witness_obj.copy()
-        else:
-            witness_uri = str(witness_obj)
-            witness_data = {
-                '@id': witness_uri,
-                '@type': 'cidoc:E21_Person'
-            }
-        
-        activity_hash = str(hash(witness_uri + 'witness'))[-8:]
-        activity_uri = f"{subject_uri}/activity/witness_{activity_hash}"
-        
-        activity = {
-            '@id': activity_uri,
-            '@type': 'cidoc:E7_Activity',
-            'cidoc:P14_carried_out_by': [witness_data],
-            'cidoc:P14.1_in_the_role_of': {
-                '@id': AAT_WITNESS,
-                '@type': 'cidoc:E55_Type'
-            }
-        }
-        
-        acquisition['cidoc:P9_consists_of'].append(activity)
-    
-    del data['gmn:P70_15_documents_witness']
-    return data
-
-
-def transform_p70_16_documents_sale_price_amount(data):
-    """
-    Transform gmn:P70_16_documents_sale_price_amount to full CIDOC-CRM structure:
-    P70_documents > E8_Acquisition > P177_assigned_property_of_type > E97_Monetary_Amount > P180_has_currency_amount
-    """
-    if 'gmn:P70_16_documents_sale_price_amount' not in data:
-        return data
-    
-    amounts = data['gmn:P70_16_documents_sale_price_amount']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        acquisition_uri = f"{subject_uri}/acquisition"
-        data['cidoc:P70_documents'] = [{
-            '@id': acquisition_uri,
-            '@type': 'cidoc:E8_Acquisition'
-        }]
-    
-    acquisition = data['cidoc:P70_documents'][0]
-    
-    for amount_obj in amounts:
-        if isinstance(amount_obj, dict):
-            amount_value = amount_obj.get('@value', '')
-        else:
-            amount_value = str(amount_obj)
-        
-        if not amount_value:
-            continue
-        
-        monetary_uri = f"{acquisition['@id']}/monetary_amount"
-        monetary_amount = {
-            '@id': monetary_uri,
-            '@type': 'cidoc:E97_Monetary_Amount',
-            'cidoc:P180_has_currency_amount': amount_value
-        }
-        
-        acquisition['cidoc:P177_assigned_property_of_type'] = monetary_amount
-    
-    del data['gmn:P70_16_documents_sale_price_amount']
-    return data
-
-
-def transform_p70_17_documents_sale_price_currency(data):
-    """
-    Transform gmn:P70_17_documents_sale_price_currency to full CIDOC-CRM structure:
-    P70_documents > E8_Acquisition > P177_assigned_property_of_type > E97_Monetary_Amount > P180_has_currency > E98_Currency
-    """
-    if 'gmn:P70_17_documents_sale_price_currency' not in data:
-        return data
-    
-    currencies = data['gmn:P70_17_documents_sale_price_currency']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        acquisition_uri = f"{subject_uri}/acquisition"
-        data['cidoc:P70_documents'] = [{
-            '@id': acquisition_uri,
-            '@type': 'cidoc:E8_Acquisition'
-        }]
-    
-    acquisition = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P177_assigned_property_of_type' not in acquisition:
-        monetary_uri = f"{acquisition['@id']}/monetary_amount"
-        acquisition['cidoc:P177_assigned_property_of_type'] = {
-            '@id': monetary_uri,
-            '@type': 'cidoc:E97_Monetary_Amount'
-        }
-    
-    monetary_amount = acquisition['cidoc:P177_assigned_property_of_type']
-    
-    for currency_obj in currencies:
-        if isinstance(currency_obj, dict):
-            currency_data = currency_obj.copy()
-            if '@type' not in currency_data:
-                currency_data['@type'] = 'cidoc:E98_Currency'
-        else:
-            currency_uri = str(currency_obj)
-            currency_data = {
-                '@id': currency_uri,
-                '@type': 'cidoc:E98_Currency'
-            }
-        
-        monetary_amount['cidoc:P180_has_currency'] = currency_data
-    
-    del data['gmn:P70_17_documents_sale_price_currency']
-    return data
-
-
-def transform_p70_18_documents_disputing_party(data):
-    """
-    Transform gmn:P70_18_documents_disputing_party to full CIDOC-CRM structure:
-    P70_documents > E7_Activity > P14_carried_out_by > E39_Actor
-    """
-    if 'gmn:P70_18_documents_disputing_party' not in data:
-        return data
-    
-    parties = data['gmn:P70_18_documents_disputing_party']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        activity_uri = f"{subject_uri}/arbitration"
-        data['cidoc:P70_documents'] = [{
-            '@id': activity_uri,
-            '@type': 'cidoc:E7_Activity'
-        }]
-    
-    activity = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P14_carried_out_by' not in activity:
-        activity['cidoc:P14_carried_out_by'] = []
-    
-    for party_obj in parties:
-        if isinstance(party_obj, dict):
-            party_data = party_obj.copy()
-            if '@type' not in party_data:
-                party_data['@type'] = 'cidoc:E39_Actor'
-        else:
-            party_uri = str(party_obj)
-            party_data = {
-                '@id': party_uri,
-                '@type': 'cidoc:E39_Actor'
-            }
-        
-        activity['cidoc:P14_carried_out_by'].append(party_data)
-    
-    del data['gmn:P70_18_documents_disputing_party']
-    return data
-
-
-def transform_p70_19_documents_arbitrator(data):
-    """
-    Transform gmn:P70_19_documents_arbitrator to full CIDOC-CRM structure:
-    P70_documents > E7_Activity > P14_carried_out_by > E39_Actor
-    """
-    if 'gmn:P70_19_documents_arbitrator' not in data:
-        return data
-    
-    arbitrators = data['gmn:P70_19_documents_arbitrator']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        activity_uri = f"{subject_uri}/arbitration"
-        data['cidoc:P70_documents'] = [{
-            '@id': activity_uri,
-            '@type': 'cidoc:E7_Activity'
-        }]
-    
-    activity = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P14_carried_out_by' not in activity:
-        activity['cidoc:P14_carried_out_by'] = []
-    
-    for arbitrator_obj in arbitrators:
-        if isinstance(arbitrator_obj, dict):
-            arbitrator_data = arbitrator_obj.copy()
-            if '@type' not in arbitrator_data:
-                arbitrator_data['@type'] = 'cidoc:E39_Actor'
-        else:
-            arbitrator_uri = str(arbitrator_obj)
-            arbitrator_data = {
-                '@id': arbitrator_uri,
-                '@type': 'cidoc:E39_Actor'
-            }
-        
-        activity['cidoc:P14_carried_out_by'].append(arbitrator_data)
-    
-    del data['gmn:P70_19_documents_arbitrator']
-    return data
-
-
-def transform_p70_20_documents_dispute_subject(data):
-    """
-    Transform gmn:P70_20_documents_dispute_subject to full CIDOC-CRM structure:
-    P70_documents > E7_Activity > P16_used_specific_object > E1_CRM_Entity
-    """
-    if 'gmn:P70_20_documents_dispute_subject' not in data:
-        return data
-    
-    subjects = data['gmn:P70_20_documents_dispute_subject']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        activity_uri = f"{subject_uri}/arbitration"
-        data['cidoc:P70_documents'] = [{
-            '@id': activity_uri,
-            '@type': 'cidoc:E7_Activity'
-        }]
-    
-    activity = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P16_used_specific_object' not in activity:
-        activity['cidoc:P16_used_specific_object'] = []
-    
-    for subject_obj in subjects:
-        if isinstance(subject_obj, dict):
-            subject_data = subject_obj.copy()
-            if '@type' not in subject_data:
-                subject_data['@type'] = 'cidoc:E1_CRM_Entity'
-        else:
-            subj_uri = str(subject_obj)
-            subject_data = {
-                '@id': subj_uri,
-                '@type': 'cidoc:E1_CRM_Entity'
-            }
-        
-        activity['cidoc:P16_used_specific_object'].append(subject_data)
-    
-    del data['gmn:P70_20_documents_dispute_subject']
-    return data
-
-
-def transform_p70_21_indicates_conceding_party(data):
-    """
-    Transform gmn:P70_21_indicates_conceding_party to full CIDOC-CRM structure:
-    P70_documents > E7_Activity > P14_carried_out_by > E39_Actor
-    """
-    if 'gmn:P70_21_indicates_conceding_party' not in data:
-        return data
-    
-    conceding_parties = data['gmn:P70_21_indicates_conceding_party']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        activity_uri = f"{subject_uri}/cession"
-        data['cidoc:P70_documents'] = [{
-            '@id': activity_uri,
-            '@type': 'cidoc:E7_Activity',
-            'cidoc:P2_has_type': {
-                '@id': AAT_TRANSFER_OF_RIGHTS,
-                '@type': 'cidoc:E55_Type'
-            }
-        }]
-    
-    activity = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P14_carried_out_by' not in activity:
-        activity['cidoc:P14_carried_out_by'] = []
-    
-    for party_obj in conceding_parties:
-        if isinstance(party_obj, dict):
-            party_data = party_obj.copy()
-            if '@type' not in party_data:
-                party_data['@type'] = 'cidoc:E39_Actor'
-        else:
-            party_uri = str(party_obj)
-            party_data = {
-                '@id': party_uri,
-                '@type': 'cidoc:E39_Actor'
-            }
-        
-        activity['cidoc:P14_carried_out_by'].append(party_data)
-    
-    del data['gmn:P70_21_indicates_conceding_party']
-    return data
-
-def transform_p70_22_indicates_receiving_party(data):
-    """
-    Transform gmn:P70_22_indicates_receiving_party to full CIDOC-CRM structure.
-    
-    Handles different document types:
-    - For cessions (E31_4): P70_documents > E7_Activity > P14_carried_out_by > E39_Actor
-    - For declarations (E31_5): P70_documents > E7_Activity > P01_has_domain > E39_Actor
-    - For donations (E31_7): P70_documents > E8_Acquisition > P22_transferred_title_to > E39_Actor
-    - For dowries (E31_8): P70_documents > E8_Acquisition > P22_transferred_title_to > E39_Actor
-    """
-    if 'gmn:P70_22_indicates_receiving_party' not in data:
-        return data
-    
-    receiving_parties = data['gmn:P70_22_indicates_receiving_party']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    item_type = data.get('@type', '')
-    
-    # Determine document type
-    is_cession = 'gmn:E31_4_Cession_of_Rights_Contract' in item_type if isinstance(item_type, list) else item_type == 'gmn:E31_4_Cession_of_Rights_Contract'
-    is_declaration = 'gmn:E31_5_Declaration' in item_type if isinstance(item_type, list) else item_type == 'gmn:E31_5_Declaration'
-    is_donation = 'gmn:E31_7_Donation_Contract' in item_type if isinstance(item_type, list) else item_type == 'gmn:E31_7_Donation_Contract'
-    is_dowry = 'gmn:E31_8_Dowry_Contract' in item_type if isinstance(item_type, list) else item_type == 'gmn:E31_8_Dowry_Contract'
-    
-    if is_donation or is_dowry:
-        # For donations and dowries, use E8_Acquisition
-        if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-            acquisition_uri = f"{subject_uri}/acquisition"
-            data['cidoc:P70_documents'] = [{
-                '@id': acquisition_uri,
-                '@type': 'cidoc:E8_Acquisition'
-            }]
-        
-        acquisition = data['cidoc:P70_documents'][0]
-        
-        if 'cidoc:P22_transferred_title_to' not in acquisition:
-            acquisition['cidoc:P22_transferred_title_to'] = []
-        
-        for party_obj in receiving_parties:
-            if isinstance(party_obj, dict):
-                party_data = party_obj.copy()
-                if '@type' not in party_data:
-                    party_data['@type'] = 'cidoc:E39_Actor'
-            else:
-                party_uri = str(party_obj)
-                party_data = {
-                    '@id': party_uri,
-                    '@type': 'cidoc:E39_Actor'
-                }
-            
-            acquisition['cidoc:P22_transferred_title_to'].append(party_data)
-    
-    elif is_declaration:
-        # For declarations, use P01_has_domain
-        if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-            activity_uri = f"{subject_uri}/declaration"
-            data['cidoc:P70_documents'] = [{
-                '@id': activity_uri,
-                '@type': 'cidoc:E7_Activity',
-                'cidoc:P2_has_type': {
-                    '@id': AAT_DECLARATION,
-                    '@type': 'cidoc:E55_Type'
-                }
-            }]
-        
-        activity = data['cidoc:P70_documents'][0]
-        
-        if 'cidoc:P01_has_domain' not in activity:
-            activity['cidoc:P01_has_domain'] = []
-        
-        for party_obj in receiving_parties:
-            if isinstance(party_obj, dict):
-                party_data = party_obj.copy()
-                if '@type' not in party_data:
-                    party_data['@type'] = 'cidoc:E39_Actor'
-            else:
-                party_uri = str(party_obj)
-                party_data = {
-                    '@id': party_uri,
-                    '@type': 'cidoc:E39_Actor'
-                }
-            
-            activity['cidoc:P01_has_domain'].append(party_data)
-    
-    elif is_cession:
-        # For cessions, use P14_carried_out_by
-        if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-            activity_uri = f"{subject_uri}/cession"
-            data['cidoc:P70_documents'] = [{
-                '@id': activity_uri,
-                '@type': 'cidoc:E7_Activity',
-                'cidoc:P2_has_type': {
-                    '@id': AAT_TRANSFER_OF_RIGHTS,
-                    '@type': 'cidoc:E55_Type'
-                }
-            }]
-        
-        activity = data['cidoc:P70_documents'][0]
-        
-        if 'cidoc:P14_carried_out_by' not in activity:
-            activity['cidoc:P14_carried_out_by'] = []
-        
-        for party_obj in receiving_parties:
-            if isinstance(party_obj, dict):
-                party_data = party_obj.copy()
-                if '@type' not in party_data:
-                    party_data['@type'] = 'cidoc:E39_Actor'
-            else:
-                party_uri = str(party_obj)
-                party_data = {
-                    '@id': party_uri,
-                    '@type': 'cidoc:E39_Actor'
-                }
-            
-            activity['cidoc:P14_carried_out_by'].append(party_data)
-    
-    del data['gmn:P70_22_indicates_receiving_party']
-    return data
-
-def transform_p70_23_indicates_object_of_cession(data):
-    """
-    Transform gmn:P70_23_indicates_object_of_cession to full CIDOC-CRM structure:
-    P70_documents > E7_Activity > P16_used_specific_object > E72_Legal_Object
-    """
-    if 'gmn:P70_23_indicates_object_of_cession' not in data:
-        return data
-    
-    rights = data['gmn:P70_23_indicates_object_of_cession']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        activity_uri = f"{subject_uri}/cession"
-        data['cidoc:P70_documents'] = [{
-            '@id': activity_uri,
-            '@type': 'cidoc:E7_Activity',
-            'cidoc:P2_has_type': {
-                '@id': AAT_TRANSFER_OF_RIGHTS,
-                '@type': 'cidoc:E55_Type'
-            }
-        }]
-    
-    activity = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P16_used_specific_object' not in activity:
-        activity['cidoc:P16_used_specific_object'] = []
-    
-    for right_obj in rights:
-        if isinstance(right_obj, dict):
-            right_data = right_obj.copy()
-            if '@type' not in right_data:
-                right_data['@type'] = 'cidoc:E72_Legal_Object'
-        else:
-            right_uri = str(right_obj)
-            right_data = {
-                '@id': right_uri,
-                '@type': 'cidoc:E72_Legal_Object'
-            }
-        
-        activity['cidoc:P16_used_specific_object'].append(right_data)
-    
-    del data['gmn:P70_23_indicates_object_of_cession']
-    return data
-
-
-def transform_p70_24_indicates_declarant(data):
-    """
-    Transform gmn:P70_24_indicates_declarant to full CIDOC-CRM structure:
-    P70_documents > E7_Activity > P14_carried_out_by > E39_Actor
-    """
-    if 'gmn:P70_24_indicates_declarant' not in data:
-        return data
-    
-    declarants = data['gmn:P70_24_indicates_declarant']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        activity_uri = f"{subject_uri}/declaration"
-        data['cidoc:P70_documents'] = [{
-            '@id': activity_uri,
-            '@type': 'cidoc:E7_Activity',
-            'cidoc:P2_has_type': {
-                '@id': AAT_DECLARATION,
-                '@type': 'cidoc:E55_Type'
-            }
-        }]
-    
-    activity = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P14_carried_out_by' not in activity:
-        activity['cidoc:P14_carried_out_by'] = []
-    
-    for declarant_obj in declarants:
-        if isinstance(declarant_obj, dict):
-            declarant_data = declarant_obj.copy()
-            if '@type' not in declarant_data:
-                declarant_data['@type'] = 'cidoc:E39_Actor'
-        else:
-            declarant_uri = str(declarant_obj)
-            declarant_data = {
-                '@id': declarant_uri,
-                '@type': 'cidoc:E39_Actor'
-            }
-        
-        activity['cidoc:P14_carried_out_by'].append(declarant_data)
-    
-    del data['gmn:P70_24_indicates_declarant']
-    return data
-
-
-def transform_p70_25_indicates_declaration_subject(data):
-    """
-    Transform gmn:P70_25_indicates_declaration_subject to full CIDOC-CRM structure:
-    P70_documents > E7_Activity > P16_used_specific_object > E1_CRM_Entity
-    """
-    if 'gmn:P70_25_indicates_declaration_subject' not in data:
-        return data
-    
-    subjects = data['gmn:P70_25_indicates_declaration_subject']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        activity_uri = f"{subject_uri}/declaration"
-        data['cidoc:P70_documents'] = [{
-            '@id': activity_uri,
-            '@type': 'cidoc:E7_Activity',
-            'cidoc:P2_has_type': {
-                '@id': AAT_DECLARATION,
-                '@type': 'cidoc:E55_Type'
-            }
-        }]
-    
-    activity = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P16_used_specific_object' not in activity:
-        activity['cidoc:P16_used_specific_object'] = []
-    
-    for subject_obj in subjects:
-        if isinstance(subject_obj, dict):
-            subject_data = subject_obj.copy()
-            if '@type' not in subject_data:
-                subject_data['@type'] = 'cidoc:E1_CRM_Entity'
-        else:
-            subj_uri = str(subject_obj)
-            subject_data = {
-                '@id': subj_uri,
-                '@type': 'cidoc:E1_CRM_Entity'
-            }
-        
-        activity['cidoc:P16_used_specific_object'].append(subject_data)
-    
-    del data['gmn:P70_25_indicates_declaration_subject']
-    return data
-
-
-def transform_p70_26_indicates_sender(data):
-    """
-    Transform gmn:P70_26_indicates_sender to full CIDOC-CRM structure:
-    P70_documents > E7_Activity > P14_carried_out_by > E39_Actor
-    """
-    if 'gmn:P70_26_indicates_sender' not in data:
-        return data
-    
-    senders = data['gmn:P70_26_indicates_sender']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        activity_uri = f"{subject_uri}/correspondence"
-        data['cidoc:P70_documents'] = [{
-            '@id': activity_uri,
-            '@type': 'cidoc:E7_Activity',
-            'cidoc:P2_has_type': {
-                '@id': AAT_CORRESPONDENCE,
-                '@type': 'cidoc:E55_Type'
-            }
-        }]
-    
-    activity = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P14_carried_out_by' not in activity:
-        activity['cidoc:P14_carried_out_by'] = []
-    
-    for sender_obj in senders:
-        if isinstance(sender_obj, dict):
-            sender_data = sender_obj.copy()
-            if '@type' not in sender_data:
-                sender_data['@type'] = 'cidoc:E39_Actor'
-        else:
-            sender_uri = str(sender_obj)
-            sender_data = {
-                '@id': sender_uri,
-                '@type': 'cidoc:E39_Actor'
-            }
-        
-        activity['cidoc:P14_carried_out_by'].append(sender_data)
-    
-    del data['gmn:P70_26_indicates_sender']
-    return data
-
-
-def transform_p70_27_has_address_of_origin(data):
-    """
-    Transform gmn:P70_27_has_address_of_origin to full CIDOC-CRM structure:
-    P70_documents > E7_Activity > P27_moved_from > E53_Place
-    """
-    if 'gmn:P70_27_has_address_of_origin' not in data:
-        return data
-    
-    places = data['gmn:P70_27_has_address_of_origin']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        activity_uri = f"{subject_uri}/correspondence"
-        data['cidoc:P70_documents'] = [{
-            '@id': activity_uri,
-            '@type': 'cidoc:E7_Activity',
-            'cidoc:P2_has_type': {
-                '@id': AAT_CORRESPONDENCE,
-                '@type': 'cidoc:E55_Type'
-            }
-        }]
-    
-    activity = data['cidoc:P70_documents'][0]
-    
-    for place_obj in places:
-        if isinstance(place_obj, dict):
-            place_data = place_obj.copy()
-            if '@type' not in place_data:
-                place_data['@type'] = 'cidoc:E53_Place'
-        else:
-            place_uri = str(place_obj)
-            place_data = {
-                '@id': place_uri,
-                '@type': 'cidoc:E53_Place'
-            }
-        
-        activity['cidoc:P27_moved_from'] = place_data
-    
-    del data['gmn:P70_27_has_address_of_origin']
-    return data
-
-
-def transform_p70_28_indicates_addressee(data):
-    """
-    Transform gmn:P70_28_indicates_addressee to full CIDOC-CRM structure:
-    P70_documents > E7_Activity > P01_has_domain > E39_Actor
-    """
-    if 'gmn:P70_28_indicates_addressee' not in data:
-        return data
-    
-    addressees = data['gmn:P70_28_indicates_addressee']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        activity_uri = f"{subject_uri}/correspondence"
-        data['cidoc:P70_documents'] = [{
-            '@id': activity_uri,
-            '@type': 'cidoc:E7_Activity',
-            'cidoc:P2_has_type': {
-                '@id': AAT_CORRESPONDENCE,
-                '@type': 'cidoc:E55_Type'
-            }
-        }]
-    
-    activity = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P01_has_domain' not in activity:
-        activity['cidoc:P01_has_domain'] = []
-    
-    for addressee_obj in addressees:
-        if isinstance(addressee_obj, dict):
-            addressee_data = addressee_obj.copy()
-            if '@type' not in addressee_data:
-                addressee_data['@type'] = 'cidoc:E39_Actor'
-        else:
-            addressee_uri = str(addressee_obj)
-            addressee_data = {
-                '@id': addressee_uri,
-                '@type': 'cidoc:E39_Actor'
-            }
-        
-        activity['cidoc:P01_has_domain'].append(addressee_data)
-    
-    del data['gmn:P70_28_indicates_addressee']
-    return data
-
-
-def transform_p70_29_describes_subject(data):
-    """
-    Transform gmn:P70_29_describes_subject to full CIDOC-CRM structure:
-    P70_documents > E7_Activity > P16_used_specific_object > E1_CRM_Entity
-    """
-    if 'gmn:P70_29_describes_subject' not in data:
-        return data
-    
-    subjects = data['gmn:P70_29_describes_subject']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        activity_uri = f"{subject_uri}/correspondence"
-        data['cidoc:P70_documents'] = [{
-            '@id': activity_uri,
-            '@type': 'cidoc:E7_Activity',
-            'cidoc:P2_has_type': {
-                '@id': AAT_CORRESPONDENCE,
-                '@type': 'cidoc:E55_Type'
-            }
-        }]
-    
-    activity = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P16_used_specific_object' not in activity:
-        activity['cidoc:P16_used_specific_object'] = []
-    
-    for subject_obj in subjects:
-        if isinstance(subject_obj, dict):
-            subject_data = subject_obj.copy()
-            if '@type' not in subject_data:
-                subject_data['@type'] = 'cidoc:E1_CRM_Entity'
-        else:
-            subj_uri = str(subject_obj)
-            subject_data = {
-                '@id': subj_uri,
-                '@type': 'cidoc:E1_CRM_Entity'
-            }
-        
-        activity['cidoc:P16_used_specific_object'].append(subject_data)
-    
-    del data['gmn:P70_29_describes_subject']
-    return data
-
-
-def transform_p70_30_mentions_person(data):
-    """
-    Transform gmn:P70_30_mentions_person to full CIDOC-CRM structure:
-    P67_refers_to > E21_Person
-    """
-    if 'gmn:P70_30_mentions_person' not in data:
-        return data
-    
-    persons = data['gmn:P70_30_mentions_person']
-    
-    if 'cidoc:P67_refers_to' not in data:
-        data['cidoc:P67_refers_to'] = []
-    
-    for person_obj in persons:
-        if isinstance(person_obj, dict):
-            person_data = person_obj.copy()
-            if '@type' not in person_data:
-                person_data['@type'] = 'cidoc:E21_Person'
-        else:
-            person_uri = str(person_obj)
-            person_data = {
-                '@id': person_uri,
-                '@type': 'cidoc:E21_Person'
-            }
-        
-        data['cidoc:P67_refers_to'].append(person_data)
-    
-    del data['gmn:P70_30_mentions_person']
-    return data
-
-
-def transform_p70_31_has_address_of_destination(data):
-    """
-    Transform gmn:P70_31_has_address_of_destination to full CIDOC-CRM structure:
-    P70_documents > E7_Activity > P26_moved_to > E53_Place
-    """
-    if 'gmn:P70_31_has_address_of_destination' not in data:
-        return data
-    
-    places = data['gmn:P70_31_has_address_of_destination']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        activity_uri = f"{subject_uri}/correspondence"
-        data['cidoc:P70_documents'] = [{
-            '@id': activity_uri,
-            '@type': 'cidoc:E7_Activity',
-            'cidoc:P2_has_type': {
-                '@id': AAT_CORRESPONDENCE,
-                '@type': 'cidoc:E55_Type'
-            }
-        }]
-    
-    activity = data['cidoc:P70_documents'][0]
-    
-    for place_obj in places:
-        if isinstance(place_obj, dict):
-            place_data = place_obj.copy()
-            if '@type' not in place_data:
-                place_data['@type'] = 'cidoc:E53_Place'
-        else:
-            place_uri = str(place_obj)
-            place_data = {
-                '@id': place_uri,
-                '@type': 'cidoc:E53_Place'
-            }
-        
-        activity['cidoc:P26_moved_to'] = place_data
-    
-    del data['gmn:P70_31_has_address_of_destination']
-    return data
-
-
-def transform_p70_32_indicates_donor(data):
-    """
-    Transform gmn:P70_32_indicates_donor to full CIDOC-CRM structure:
-    P70_documents > E8_Acquisition > P23_transferred_title_from > E39_Actor
-    """
-    if 'gmn:P70_32_indicates_donor' not in data:
-        return data
-    
-    donors = data['gmn:P70_32_indicates_donor']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        acquisition_uri = f"{subject_uri}/acquisition"
-        data['cidoc:P70_documents'] = [{
-            '@id': acquisition_uri,
-            '@type': 'cidoc:E8_Acquisition'
-        }]
-    
-    acquisition = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P23_transferred_title_from' not in acquisition:
-        acquisition['cidoc:P23_transferred_title_from'] = []
-    
-    for donor_obj in donors:
-        if isinstance(donor_obj, dict):
-            donor_data = donor_obj.copy()
-            if '@type' not in donor_data:
-                donor_data['@type'] = 'cidoc:E39_Actor'
-        else:
-            donor_uri = str(donor_obj)
-            donor_data = {
-                '@id': donor_uri,
-                '@type': 'cidoc:E39_Actor'
-            }
-        
-        acquisition['cidoc:P23_transferred_title_from'].append(donor_data)
-    
-    del data['gmn:P70_32_indicates_donor']
-    return data
-
-
-def transform_p70_33_indicates_object_of_donation(data):
-    """
-    Transform gmn:P70_33_indicates_object_of_donation to full CIDOC-CRM structure:
-    P70_documents > E8_Acquisition > P24_transferred_title_of > E18_Physical_Thing
-    """
-    if 'gmn:P70_33_indicates_object_of_donation' not in data:
-        return data
-    
-    objects = data['gmn:P70_33_indicates_object_of_donation']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        acquisition_uri = f"{subject_uri}/acquisition"
-        data['cidoc:P70_documents'] = [{
-            '@id': acquisition_uri,
-            '@type': 'cidoc:E8_Acquisition'
-        }]
-    
-    acquisition = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P24_transferred_title_of' not in acquisition:
-        acquisition['cidoc:P24_transferred_title_of'] = []
-    
-    for obj_obj in objects:
-        if isinstance(obj_obj, dict):
-            obj_data = obj_obj.copy()
-            if '@type' not in obj_data:
-                obj_data['@type'] = 'cidoc:E18_Physical_Thing'
-        else:
-            obj_uri = str(obj_obj)
-            obj_data = {
-                '@id': obj_uri,
-                '@type': 'cidoc:E18_Physical_Thing'
-            }
-        
-        acquisition['cidoc:P24_transferred_title_of'].append(obj_data)
-    
-    del data['gmn:P70_33_indicates_object_of_donation']
-    return data
-
-
-def transform_p138i_1_has_representation(data):
-    """
-    Transform gmn:P138i_1_has_representation to full CIDOC-CRM structure:
-    P138i_has_representation > E36_Visual_Item
-    """
-    if 'gmn:P138i_1_has_representation' not in data:
-        return data
-    
-    representations = data['gmn:P138i_1_has_representation']
-    
-    if 'cidoc:P138i_has_representation' not in data:
-        data['cidoc:P138i_has_representation'] = []
-    
-    for rep_obj in representations:
-        if isinstance(rep_obj, dict):
-            rep_data = rep_obj.copy()
-            if '@type' not in rep_data:
-                rep_data['@type'] = 'cidoc:E36_Visual_Item'
-        else:
-            rep_uri = str(rep_obj)
-            rep_data = {
-                '@id': rep_uri,
-                '@type': 'cidoc:E36_Visual_Item'
-            }
-        
-        data['cidoc:P138i_has_representation'].append(rep_data)
-    
-    del data['gmn:P138i_1_has_representation']
-    return data
-
-
-def transform_p11i_1_earliest_attestation_date(data):
-    """
-    Transform gmn:P11i_1_earliest_attestation_date to full CIDOC-CRM structure:
-    P11i_participated_in > E5_Event > P4_has_time-span > E52_Time-Span > P82a_begin_of_the_begin
-    """
-    if 'gmn:P11i_1_earliest_attestation_date' not in data:
-        return data
-    
-    dates = data['gmn:P11i_1_earliest_attestation_date']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P11i_participated_in' not in data:
-        data['cidoc:P11i_participated_in'] = []
-    
-    for date_obj in dates:
-        if isinstance(date_obj, dict):
-            date_value = date_obj.get('@value', '')
-        else:
-            date_value = str(date_obj)
-        
-        if not date_value:
-            continue
-        
-        event_hash = str(hash(date_value + 'earliest'))[-8:]
-        event_uri = f"{subject_uri}/event/earliest_{event_hash}"
-        timespan_uri = f"{event_uri}/timespan"
-        
-        event = {
-            '@id': event_uri,
-            '@type': 'cidoc:E5_Event',
-            'cidoc:P4_has_time-span': {
-                '@id': timespan_uri,
-                '@type': 'cidoc:E52_Time-Span',
-                'cidoc:P82a_begin_of_the_begin': date_value
-            }
-        }
-        
-        data['cidoc:P11i_participated_in'].append(event)
-    
-    del data['gmn:P11i_1_earliest_attestation_date']
-    return data
-
-
-def transform_p11i_2_latest_attestation_date(data):
-    """
-    Transform gmn:P11i_2_latest_attestation_date to full CIDOC-CRM structure:
-    P11i_participated_in > E5_Event > P4_has_time-span > E52_Time-Span > P82b_end_of_the_end
-    """
-    if 'gmn:P11i_2_latest_attestation_date' not in data:
-        return data
-    
-    dates = data['gmn:P11i_2_latest_attestation_date']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P11i_participated_in' not in data:
-        data['cidoc:P11i_participated_in'] = []
-    
-    for date_obj in dates:
-        if isinstance(date_obj, dict):
-            date_value = date_obj.get('@value', '')
-        else:
-            date_value = str(date_obj)
-        
-        if not date_value:
-            continue
-        
-        event_hash = str(hash(date_value + 'latest'))[-8:]
-        event_uri = f"{subject_uri}/event/latest_{event_hash}"
-        timespan_uri = f"{event_uri}/timespan"
-        
-        event = {
-            '@id': event_uri,
-            '@type': 'cidoc:E5_Event',
-            'cidoc:P4_has_time-span': {
-                '@id': timespan_uri,
-                '@type': 'cidoc:E52_Time-Span',
-                'cidoc:P82b_end_of_the_end': date_value
-            }
-        }
-        
-        data['cidoc:P11i_participated_in'].append(event)
-    
-    del data['gmn:P11i_2_latest_attestation_date']
-    return data
-
-
-def transform_p11i_3_has_spouse(data):
-    """
-    Transform gmn:P11i_3_has_spouse to full CIDOC-CRM structure:
-    P11i_participated_in > E5_Event (marriage) > P11_had_participant > E21_Person
-    """
-    if 'gmn:P11i_3_has_spouse' not in data:
-        return data
-    
-    spouses = data['gmn:P11i_3_has_spouse']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P11i_participated_in' not in data:
-        data['cidoc:P11i_participated_in'] = []
-    
-    for spouse_obj in spouses:
-        if isinstance(spouse_obj, dict):
-            spouse_uri = spouse_obj.get('@id', '')
-            spouse_data = spouse_obj.copy()
-        else:
-            spouse_uri = str(spouse_obj)
-            spouse_data = {
-                '@id': spouse_uri,
-                '@type': 'cidoc:E21_Person'
-            }
-        
-        event_hash = str(hash(spouse_uri + 'marriage'))[-8:]
-        event_uri = f"{subject_uri}/event/marriage_{event_hash}"
-        
-        event = {
-            '@id': event_uri,
-            '@type': 'cidoc:E5_Event',
-            'cidoc:P2_has_type': {
-                '@id': AAT_MARRIAGE,
-                '@type': 'cidoc:E55_Type'
-            },
-            'cidoc:P11_had_participant': [spouse_data]
-        }
-        
-        data['cidoc:P11i_participated_in'].append(event)
-    
-    del data['gmn:P11i_3_has_spouse']
-    return data
-
-
-def transform_p22_1_has_owner(data):
-    """
-    Transform gmn:P22_1_has_owner to full CIDOC-CRM structure:
-    P24i_changed_ownership_through > E8_Acquisition > P22_transferred_title_to > E21_Person
-    """
-    if 'gmn:P22_1_has_owner' not in data:
-        return data
-    
-    owners = data['gmn:P22_1_has_owner']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P24i_changed_ownership_through' not in data:
-        data['cidoc:P24i_changed_ownership_through'] = []
-    
-    for owner_obj in owners:
-        if isinstance(owner_obj, dict):
-            owner_uri = owner_obj.get('@id', '')
-            owner_data = owner_obj.copy()
-        else:
-            owner_uri = str(owner_obj)
-            owner_data = {
-                '@id': owner_uri,
-                '@type': 'cidoc:E21_Person'
-            }
-        
-        acquisition_hash = str(hash(owner_uri + 'ownership'))[-8:]
-        acquisition_uri = f"{subject_uri}/acquisition/ownership_{acquisition_hash}"
-        
-        acquisition = {
-            '@id': acquisition_uri,
-            '@type': 'cidoc:E8_Acquisition',
-            'cidoc:P22_transferred_title_to': [owner_data]
-        }
-        
-        data['cidoc:P24i_changed_ownership_through'].append(acquisition)
-    
-    del data['gmn:P22_1_has_owner']
-    return data
-
-
-def transform_p53_1_has_occupant(data):
-    """
-    Transform gmn:P53_1_has_occupant to full CIDOC-CRM structure:
-    P59i_is_located_on_or_within > E53_Place > P53_has_former_or_current_location > E21_Person
-    """
-    if 'gmn:P53_1_has_occupant' not in data:
-        return data
-    
-    occupants = data['gmn:P53_1_has_occupant']
-    
-    if 'cidoc:P53_has_former_or_current_location' not in data:
-        data['cidoc:P53_has_former_or_current_location'] = []
-    
-    for occupant_obj in occupants:
-        if isinstance(occupant_obj, dict):
-            occupant_data = occupant_obj.copy()
-            if '@type' not in occupant_data:
-                occupant_data['@type'] = 'cidoc:E21_Person'
-        else:
-            occupant_uri = str(occupant_obj)
-            occupant_data = {
-                '@id': occupant_uri,
-                '@type': 'cidoc:E21_Person'
-            }
-        
-        data['cidoc:P53_has_former_or_current_location'].append(occupant_data)
-    
-    del data['gmn:P53_1_has_occupant']
-    return data
-
-def transform_p70_34_indicates_object_of_dowry(data):
-    """
-    Transform gmn:P70_34_indicates_object_of_dowry to full CIDOC-CRM structure:
-    P70_documents > E8_Acquisition > P24_transferred_title_of > E18_Physical_Thing
-    """
-    if 'gmn:P70_34_indicates_object_of_dowry' not in data:
-        return data
-    
-    objects = data['gmn:P70_34_indicates_object_of_dowry']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-        acquisition_uri = f"{subject_uri}/acquisition"
-        data['cidoc:P70_documents'] = [{
-            '@id': acquisition_uri,
-            '@type': 'cidoc:E8_Acquisition'
-        }]
-    
-    acquisition = data['cidoc:P70_documents'][0]
-    
-    if 'cidoc:P24_transferred_title_of' not in acquisition:
-        acquisition['cidoc:P24_transferred_title_of'] = []
-    
-    for obj_obj in objects:
-        if isinstance(obj_obj, dict):
-            obj_data = obj_obj.copy()
-            if '@type' not in obj_data:
-                obj_data['@type'] = 'cidoc:E18_Physical_Thing'
-        else:
-            obj_uri = str(obj_obj)
-            obj_data = {
-                '@id': obj_uri,
-                '@type': 'cidoc:E18_Physical_Thing'
-            }
-        
-        acquisition['cidoc:P24_transferred_title_of'].append(obj_data)
-    
-    del data['gmn:P70_34_indicates_object_of_dowry']
-    return data
-
-
-def transform_p70_22_indicates_receiving_party(data):
-    """
-    Transform gmn:P70_22_indicates_receiving_party to full CIDOC-CRM structure.
-    For cessions: P70_documents > E7_Activity > P14_carried_out_by > E39_Actor
-    For declarations: P70_documents > E7_Activity > P01_has_domain > E39_Actor
-    For donations: P70_documents > E8_Acquisition > P22_transferred_title_to > E39_Actor
-    For dowries: P70_documents > E8_Acquisition > P22_transferred_title_to > E39_Actor
-    
-    UPDATED VERSION - replaces existing function in gmn_to_cidoc_transform.py
-    """
-    if 'gmn:P70_22_indicates_receiving_party' not in data:
-        return data
-    
-    receiving_parties = data['gmn:P70_22_indicates_receiving_party']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    item_type = data.get('@type', '')
-    
-    # Determine document type
-    is_cession = 'gmn:E31_4_Cession_of_Rights_Contract' in item_type if isinstance(item_type, list) else item_type == 'gmn:E31_4_Cession_of_Rights_Contract'
-    is_declaration = 'gmn:E31_5_Declaration' in item_type if isinstance(item_type, list) else item_type == 'gmn:E31_5_Declaration'
-    is_donation = 'gmn:E31_7_Donation_Contract' in item_type if isinstance(item_type, list) else item_type == 'gmn:E31_7_Donation_Contract'
-    is_dowry = 'gmn:E31_8_Dowry_Contract' in item_type if isinstance(item_type, list) else item_type == 'gmn:E31_8_Dowry_Contract'
-    
-    if is_donation or is_dowry:
-        # For donations and dowries, use E8_Acquisition
-        if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-            acquisition_uri = f"{subject_uri}/acquisition"
-            data['cidoc:P70_documents'] = [{
-                '@id': acquisition_uri,
-                '@type': 'cidoc:E8_Acquisition'
-            }]
-        
-        acquisition = data['cidoc:P70_documents'][0]
-        
-        if 'cidoc:P22_transferred_title_to' not in acquisition:
-            acquisition['cidoc:P22_transferred_title_to'] = []
-        
-        for party_obj in receiving_parties:
-            if isinstance(party_obj, dict):
-                party_data = party_obj.copy()
-                if '@type' not in party_data:
-                    party_data['@type'] = 'cidoc:E39_Actor'
-            else:
-                party_uri = str(party_obj)
-                party_data = {
-                    '@id': party_uri,
-                    '@type': 'cidoc:E39_Actor'
-                }
-            
-            acquisition['cidoc:P22_transferred_title_to'].append(party_data)
-    
-    elif is_declaration:
-        # For declarations, use P01_has_domain
-        if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-            activity_uri = f"{subject_uri}/declaration"
-            data['cidoc:P70_documents'] = [{
-                '@id': activity_uri,
-                '@type': 'cidoc:E7_Activity',
-                'cidoc:P2_has_type': {
-                    '@id': AAT_DECLARATION,
-                    '@type': 'cidoc:E55_Type'
-                }
-            }]
-        
-        activity = data['cidoc:P70_documents'][0]
-        
-        if 'cidoc:P01_has_domain' not in activity:
-            activity['cidoc:P01_has_domain'] = []
-        
-        for party_obj in receiving_parties:
-            if isinstance(party_obj, dict):
-                party_data = party_obj.copy()
-                if '@type' not in party_data:
-                    party_data['@type'] = 'cidoc:E39_Actor'
-            else:
-                party_uri = str(party_obj)
-                party_data = {
-                    '@id': party_uri,
-                    '@type': 'cidoc:E39_Actor'
-                }
-            
-            activity['cidoc:P01_has_domain'].append(party_data)
-    
-    elif is_cession:
-        # For cessions, use P14_carried_out_by
-        if 'cidoc:P70_documents' not in data or len(data['cidoc:P70_documents']) == 0:
-            activity_uri = f"{subject_uri}/cession"
-            data['cidoc:P70_documents'] = [{
-                '@id': activity_uri,
-                '@type': 'cidoc:E7_Activity',
-                'cidoc:P2_has_type': {
-                    '@id': AAT_TRANSFER_OF_RIGHTS,
-                    '@type': 'cidoc:E55_Type'
-                }
-            }]
-        
-        activity = data['cidoc:P70_documents'][0]
-        
-        if 'cidoc:P14_carried_out_by' not in activity:
-            activity['cidoc:P14_carried_out_by'] = []
-        
-        for party_obj in receiving_parties:
-            if isinstance(party_obj, dict):
-                party_data = party_obj.copy()
-                if '@type' not in party_data:
-                    party_data['@type'] = 'cidoc:E39_Actor'
-            else:
-                party_uri = str(party_obj)
-                party_data = {
-                    '@id': party_uri,
-                    '@type': 'cidoc:E39_Actor'
-                }
-            
-            activity['cidoc:P14_carried_out_by'].append(party_data)
-    
-    del data['gmn:P70_22_indicates_receiving_party']
-    return data
-
-def transform_p96_1_has_mother(data):
-    """
-    Transform gmn:P96_1_has_mother to full CIDOC-CRM structure:
-    P98i_was_born > E67_Birth > P96_by_mother > E21_Person
-    """
-    if 'gmn:P96_1_has_mother' not in data:
-        return data
-    
-    mothers = data['gmn:P96_1_has_mother']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    birth_uri = f"{subject_uri}/birth"
-    
-    if 'cidoc:P98i_was_born' not in data:
-        data['cidoc:P98i_was_born'] = {
-            '@id': birth_uri,
-            '@type': 'cidoc:E67_Birth'
-        }
-    
-    birth = data['cidoc:P98i_was_born']
-    
-    if 'cidoc:P96_by_mother' not in birth:
-        birth['cidoc:P96_by_mother'] = []
-    
-    for mother_obj in mothers:
-        if isinstance(mother_obj, dict):
-            mother_data = mother_obj.copy()
-            if '@type' not in mother_data:
-                mother_data['@type'] = 'cidoc:E21_Person'
-        else:
-            mother_uri = str(mother_obj)
-            mother_data = {
-                '@id': mother_uri,
-                '@type': 'cidoc:E21_Person'
-            }
-        
-        birth['cidoc:P96_by_mother'].append(mother_data)
-    
-    del data['gmn:P96_1_has_mother']
-    return data
-
-
-def transform_p97_1_has_father(data):
-    """
-    Transform gmn:P97_1_has_father to full CIDOC-CRM structure:
-    P98i_was_born > E67_Birth > P97_from_father > E21_Person
-    """
-    if 'gmn:P97_1_has_father' not in data:
-        return data
-    
-    fathers = data['gmn:P97_1_has_father']
-    subject_uri = data.get('@id', f"urn:uuid:{uuid4()}")
-    
-    birth_uri = f"{subject_uri}/birth"
-    
-    if 'cidoc:P98i_was_born' not in data:
-        data['cidoc:P98i_was_born'] = {
-            '@id': birth_uri,
-            '@type': 'cidoc:E67_Birth'
-        }
-    
-    birth = data['cidoc:P98i_was_born']
-    
-    if 'cidoc:P97_from_father' not in birth:
-        birth['cidoc:P97_from_father'] = []
-    
-    for father_obj in fathers:
-        if isinstance(father_obj, dict):
-            father_data = father_obj.copy()
-            if '@type' not in father_data:
-                father_data['@type'] = 'cidoc:E21_Person'
-        else:
-            father_uri = str(father_obj)
-            father_data = {
-                '@id': father_uri,
-                '@type': 'cidoc:E21_Person'
-            }
-        
-        birth['cidoc:P97_from_father'].append(father_data)
-    
-    del data['gmn:P97_1_has_father']
-    return data
-
-
-def transform_p107i_1_has_regional_provenance(data):
-    """
-    Transform gmn:P107i_1_has_regional_provenance to full CIDOC-CRM structure:
-    P107i_is_current_or_former_member_of > gmn:E74_1_Regional_Provenance
-    """
-    if 'gmn:P107i_1_has_regional_provenance' not in data:
-        return data
-    
-    groups = data['gmn:P107i_1_has_regional_provenance']
-    
-    if 'cidoc:P107i_is_current_or_former_member_of' not in data:
-        data['cidoc:P107i_is_current_or_former_member_of'] = []
-    
-    for group_obj in groups:
-        if isinstance(group_obj, dict):
-            group_data = group_obj.copy()
-        else:
-            group_uri = str(group_obj)
-            group_data = {'@id': group_uri}
-        
-        if '@type' not in group_data:
-            group_data['@type'] = ['cidoc:E74_Group', 'gmn:E74_1_Regional_Provenance']
-        elif isinstance(group_data['@type'], str):
-            group_data['@type'] = [group_data['@type'], 'gmn:E74_1_Regional_Provenance']
-        elif 'gmn:E74_1_Regional_Provenance' not in group_data['@type']:
-            group_data['@type'].append('gmn:E74_1_Regional_Provenance')
-        
-        data['cidoc:P107i_is_current_or_former_member_of'].append(group_data)
-    
-    del data['gmn:P107i_1_has_regional_provenance']
-    return data
-
-
-def transform_p107i_2_has_social_category(data):
-    """
-    Transform gmn:P107i_2_has_social_category to full CIDOC-CRM structure:
-    P107i_is_current_or_former_member_of > gmn:E74_2_Social_Category
-    """
-    if 'gmn:P107i_2_has_social_category' not in data:
-        return data
-    
-    groups = data['gmn:P107i_2_has_social_category']
-    
-    if 'cidoc:P107i_is_current_or_former_member_of' not in data:
-        data['cidoc:P107i_is_current_or_former_member_of'] = []
-    
-    for group_obj in groups:
-        if isinstance(group_obj, dict):
-            group_data = group_obj.copy()
-        else:
-            group_uri = str(group_obj)
-            group_data = {'@id': group_uri}
-        
-        if '@type' not in group_data:
-            group_data['@type'] = ['cidoc:E74_Group', 'gmn:E74_2_Social_Category']
-        elif isinstance(group_data['@type'], str):
-            group_data['@type'] = [group_data['@type'], 'gmn:E74_2_Social_Category']
-        elif 'gmn:E74_2_Social_Category' not in group_data['@type']:
-            group_data['@type'].append('gmn:E74_2_Social_Category')
-        
-        data['cidoc:P107i_is_current_or_former_member_of'].append(group_data)
-    
-    del data['gmn:P107i_2_has_social_category']
-    return data
-
-
-def transform_p107i_3_has_occupation(data):
-    """
-    Transform gmn:P107i_3_has_occupation to full CIDOC-CRM structure:
-    P107i_is_current_or_former_member_of > gmn:E74_3_Occupational_Group
-    """
-    if 'gmn:P107i_3_has_occupation' not in data:
-        return data
-    
-    groups = data['gmn:P107i_3_has_occupation']
-    
-    if 'cidoc:P107i_is_current_or_former_member_of' not in data:
-        data['cidoc:P107i_is_current_or_former_member_of'] = []
-    
-    for group_obj in groups:
-        if isinstance(group_obj, dict):
-            group_data = group_obj.copy()
-        else:
-            group_uri = str(group_obj)
-            group_data = {'@id': group_uri}
-        
-        if '@type' not in group_data:
-            group_data['@type'] = ['cidoc:E74_Group', 'gmn:E74_3_Occupational_Group']
-        elif isinstance(group_data['@type'], str):
-            group_data['@type'] = [group_data['@type'], 'gmn:E74_3_Occupational_Group']
-        elif 'gmn:E74_3_Occupational_Group' not in group_data['@type']:
-            group_data['@type'].append('gmn:E74_3_Occupational_Group')
-        
-        data['cidoc:P107i_is_current_or_former_member_of'].append(group_data)
-    
-    del data['gmn:P107i_3_has_occupation']
-    return data
-
-
-def transform_item(item, include_internal=False):
-    """
-    Transform a single item, applying all transformation rules.
-    
-    Args:
-        item: Item data dictionary
-        include_internal: If True, transform internal notes to CIDOC-CRM. 
-                         If False (default), remove internal notes entirely.
-    
-    Returns:
-        Transformed item dictionary
-    """
-    # Name and title properties
-    item = transform_p1_1_has_name(item)
-    item = transform_p1_2_has_name_from_source(item)
-    item = transform_p1_3_has_patrilineal_name(item)
-    item = transform_p1_4_has_loconym(item)
-    item = transform_p102_1_has_title(item)
-    
-    # Creation properties (notary, date, place)
-    item = transform_p94i_1_was_created_by(item)
-    item = transform_p94i_2_has_enactment_date(item)
-    item = transform_p94i_3_has_place_of_enactment(item)
-    
-    # Sales contract properties (P70.1-P70.17)
-    item = transform_p70_1_documents_seller(item)
-    item = transform_p70_2_documents_buyer(item)
-    item = transform_p70_3_documents_transfer_of(item)
-    item = transform_p70_4_documents_sellers_procurator(item)
-    item = transform_p70_5_documents_buyers_procurator(item)
-    item = transform_p70_6_documents_sellers_guarantor(item)
-    item = transform_p70_7_documents_buyers_guarantor(item)
-    item = transform_p70_8_documents_broker(item)
-    item = transform_p70_9_documents_payment_provider_for_buyer(item)
-    item = transform_p70_10_documents_payment_recipient_for_seller(item)
-    item = transform_p70_11_documents_referenced_person(item)
-    item = transform_p70_12_documents_payment_through_organization(item)
-    item = transform_p70_13_documents_referenced_place(item)
-    item = transform_p70_14_documents_referenced_object(item)
-    item = transform_p70_15_documents_witness(item)
-    item = transform_p70_16_documents_sale_price_amount(item)
-    item = transform_p70_17_documents_sale_price_currency(item)
-    
-    # Arbitration properties (P70.18-P70.20)
-    item = transform_p70_18_documents_disputing_party(item)
-    item = transform_p70_19_documents_arbitrator(item)
-    item = transform_p70_20_documents_dispute_subject(item)
-    
-    # Cession properties (P70.21-P70.23)
-    item = transform_p70_21_indicates_conceding_party(item)
-    item = transform_p70_22_indicates_receiving_party(item)
-    item = transform_p70_23_indicates_object_of_cession(item)
-    
-    # Declaration properties (P70.24-P70.25)
-    item = transform_p70_24_indicates_declarant(item)
-    item = transform_p70_25_indicates_declaration_subject(item)
-    
-    # Correspondence properties (P70.26-P70.31)
-    item = transform_p70_26_indicates_sender(item)
-    item = transform_p70_27_has_address_of_origin(item)
-    item = transform_p70_28_indicates_addressee(item)
-    item = transform_p70_29_describes_subject(item)
-    item = transform_p70_30_mentions_person(item)
-    item = transform_p70_31_has_address_of_destination(item)
-    
-    # Donation properties (P70.32-P70.33)
-    item = transform_p70_32_indicates_donor(item)
-    item = transform_p70_33_indicates_object_of_donation(item)
-
-    # Dowry properties (P70.34)
-    item = transform_p70_34_indicates_object_of_dowry(item)
-
-    # Visual representation
-    item = transform_p138i_1_has_representation(item)
-    
-    # Person attestation and relationship properties
-    item = transform_p11i_1_earliest_attestation_date(item)
-    item = transform_p11i_2_latest_attestation_date(item)
-    item = transform_p11i_3_has_spouse(item)
-    
-    # Property ownership and occupation
-    item = transform_p22_1_has_owner(item)
-    item = transform_p53_1_has_occupant(item)
-    
-    # Family relationships
-    item = transform_p96_1_has_mother(item)
-    item = transform_p97_1_has_father(item)
-    
-    # Group memberships
-    item = transform_p107i_1_has_regional_provenance(item)
-    item = transform_p107i_2_has_social_category(item)
-    item = transform_p107i_3_has_occupation(item)
-    
-    # Editorial notes (last, with optional inclusion)
-    item = transform_p3_1_has_editorial_note(item, include_internal)
-    
-    return item
-
-
-def transform_export(input_file, output_file, include_internal=False):
-    """
-    Transform an entire JSON-LD export file.
-    
-    Args:
-        input_file: Path to input JSON-LD file
-        output_file: Path to output CIDOC-CRM compliant file
-        include_internal: If True, transform internal notes. If False (default), remove them.
+    Args:
+        inputs: Directory, glob pattern or file (see find_inputs)
+        output: An existing directory (or a path ending in a separator) to
+                write one output per input, named after it (see
+                batch_output_path); otherwise a single output that every
+                input is written to through one open writer, using the
+                header (@context) of the first input
+        Other arguments as for transform_export; flatten needs one output per
+        input
     
     Returns:
-        Boolean indicating success or failure
+        Boolean indicating whether every file was transformed
     """
-    try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Handle both single items and arrays of items
-        if isinstance(data, list):
-            transformed = [transform_item(item, include_internal) for item in data]
-        elif isinstance(data, dict) and '@graph' in data:
-            # Handle JSON-LD with @graph
-            data['@graph'] = [transform_item(item, include_internal) for item in data['@graph']]
-            transformed = data
-        else:
-            transformed = transform_item(data, include_internal)
-        
-        # Write output
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(transformed, f, indent=2, ensure_ascii=False)
-        
-        print(f"✓ Transformation complete: {output_file}")
-        return True
-        
-    except FileNotFoundError:
-        print(f"✗ Error: Input file '{input_file}' not found", file=sys.stderr)
+    files = find_inputs(inputs)
+    if not files:
+        print(f"✗ Error: No input files match '{inputs}'", file=sys.stderr)
         return False
-    except json.JSONDecodeError as e:
-        print(f"✗ Error: Invalid JSON in input file: {e}", file=sys.stderr)
-        return False
-    except Exception as e:
-        print(f"✗ Error during transformation: {e}", file=sys.stderr)
-        import traceback
-        traceback.print_exc()
+    per_file = Path(output).is_dir() or str(output).endswith(('/', os.sep))
+    if flatten and not per_file:
+        print("✗ Error: --flatten in batch mode needs an output directory", file=sys.stderr)
         return False
+    if per_file:
+        Path(output).mkdir(parents=True, exist_ok=True)
+    
+    backend = get_backend(json_backend)
+    writer = None
+    failed = []
+    total_items = total_bytes = 0
+    batch_start = time.perf_counter()
+    print(f"Transforming {len(files)} files")
+    for input_file in files:
+        start = time.perf_counter()
+        try:
+            reader = open_reader(input_file, input_format, backend, buffer_size=buffer_size)
+            if per_file:
+                output_file = batch_output_path(input_file, output, output_format, compression)
+                count = _export(reader, output_file, include_internal, flatten, workers, backend, output_format,
+                                compact, compression, compression_level, buffer_size, graph, shard_items,
+                                shard_bytes, pipeline).count
+            else:
+                if writer is None:
+                    writer = _open_output(output, output_format, reader, compact, backend, compression,
+                                          compression_level, buffer_size, graph, shard_items, shard_bytes)
+                count = _write_items(reader, writer, include_internal, workers, backend,
+                                     detect_format(output, output_format), None if compact else 2, pipeline)
+        except (OSError, ValueError, ImportError) as e:
+            # Includes json.JSONDecodeError; the rest of the batch still runs
+            print(f"  ✗ {input_file}: {e}", file=sys.stderr)
+            failed.append(input_file)
+            continue
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        size = os.path.getsize(input_file)
+        total_items += count
+        total_bytes += size
+        print(f"  {input_file}: {count} items in {elapsed:.2f}s "
+              f"({count / elapsed:.0f} items/s, {size / 1e6 / elapsed:.1f} MB/s)")
+    
+    if writer is not None:
+        writer.close()
+    elapsed = max(time.perf_counter() - batch_start, 1e-9)
+    print(f"{'✓' if not failed else '✗'} Batch complete: {len(files) - len(failed)}/{len(files)} files, "
+          f"{total_items} items in {elapsed:.2f}s ({total_items / elapsed:.0f} items/s, "
+          f"{total_bytes / 1e6 / elapsed:.1f} MB/s) -> {output}")
+    return not failed
 
 
 def main():
     """Main entry point for command-line usage."""
-    if len(sys.argv) < 3 or len(sys.argv) > 4:
-        print("Usage: python gmn_to_cidoc_transform_script.py <input_file.json> <output_file.json> [--include-internal]")
-        print("\nOptions:")
-        print("  --include-internal    Include editorial notes in output (default: exclude)")
-        print("\nExamples:")
-        print("  python gmn_to_cidoc_transform_script.py omeka_export.json public_output.json")
-        print("  python gmn_to_cidoc_transform_script.py omeka_export.json full_output.json --include-internal")
-        print("\nSupported contract types:")
-        print("  - gmn:E31_1_Contract (general contracts)")
-        print("  - gmn:E31_2_Sales_Contract")
-        print("  - gmn:E31_4_Cession_of_Rights_Contract")
-        print("  - gmn:E31_5_Declaration")
-        print("  - gmn:E31_6_Correspondence")
-        print("  - gmn:E31_7_Donation_Contract")
-        print("  - gmn:E31_8_Dowry_Contract")
-        sys.exit(1)
-    
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
-    include_internal = '--include-internal' in sys.argv
-    
-    if include_internal:
+    parser = argparse.ArgumentParser(
+        description='Transform GMN shortcut properties in an Omeka-S JSON-LD export to full CIDOC-CRM.',
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""examples:
+  python gmn_to_cidoc_transform.py omeka_export.json public_output.json
+  python gmn_to_cidoc_transform.py omeka_export.json full_output.json --include-internal
+  python gmn_to_cidoc_transform.py items.jsonl output.jsonl
+  python gmn_to_cidoc_transform.py omeka_export.json output.nt.gz
+  python gmn_to_cidoc_transform.py omeka_export.json out.jsonld.gz --shard-items 50000
+  python gmn_to_cidoc_transform.py --batch exports/ cidoc/
+  python gmn_to_cidoc_transform.py omeka_export.json.gz cidoc.jsonl.gz --reuse-unchanged
+  python gmn_to_cidoc_transform.py omeka_export.jsonl output.jsonl --workers 0
+  python gmn_to_cidoc_transform.py omeka_export.json.gz output.jsonld.gz --pipeline
+  python gmn_to_cidoc_transform.py https://omeka.example.org/ output.jsonld.gz --concurrency 16
+  python gmn_to_cidoc_transform.py https://omeka.example.org/ cidoc.jsonl.gz --shard-items 50000 --incremental
+  python gmn_to_cidoc_transform.py --batch 'exports/*.json.gz' all_collections.jsonl
+  python gmn_to_cidoc_transform.py omeka_export.json.gz output.jsonl.zst --compression-level 10
+  python gmn_to_cidoc_transform.py omeka_export.json one.json --item https://example.org/item/1234
+
+supported contract types:
+  - gmn:E31_1_Contract (general contracts)
+  - gmn:E31_2_Sales_Contract
+  - gmn:E31_4_Cession_of_Rights_Contract
+  - gmn:E31_5_Declaration
+  - gmn:E31_6_Correspondence
+  - gmn:E31_7_Donation_Contract
+  - gmn:E31_8_Dowry_Contract""")
+    parser.add_argument('input_file', help='Omeka-S JSON-LD export (or JSON Lines file) to transform, or the '
+                        'http(s) address of an Omeka-S site to harvest; with --batch, a directory or glob '
+                        'pattern')
+    parser.add_argument('output_file', help='Where to write the CIDOC-CRM output')
+    parser.add_argument('--include-internal', action='store_true',
+                        help='Include editorial notes in output (default: exclude)')
+    parser.add_argument('--flatten', action='store_true',
+                        help='Write each node once in a flat @graph, referenced by @id')
+    parser.add_argument('--compact', action='store_true',
+                        help='Write JSON without indentation or spaces after separators')
+    parser.add_argument('--json-backend', choices=('orjson', 'ujson', 'json'),
+                        help='JSON library used to encode output (default: fastest installed, '
+                             'or $GMN_JSON_BACKEND)')
+    parser.add_argument('--input-format', choices=INPUT_FORMATS,
+                        help='Input format: one JSON document, or JSON Lines with one item per line '
+                             '(default: jsonl for .jsonl/.ndjson files, json otherwise)')
+    parser.add_argument('--output-format', choices=FORMATS,
+                        help='Output format, detected from the output file name like --input-format '
+                             '(.nt, .nq and .ttl are N-Triples, N-Quads and Turtle, .triples a binary '
+                             'triple file, .arrow columnar tables); npy writes columnar tables to the '
+                             'output directory; jsonl output has no @context header')
+    parser.add_argument('--graph', metavar='IRI',
+                        help='Named graph for all N-Quads output (default: one graph per item, named '
+                             'after its @id)')
+    parser.add_argument('--compression', choices=tuple(COMPRESSIONS) + (COMPRESSION_NONE,),
+                        help='Output compression (default: from the output file extension '
+                             '.gz/.bz2/.xz/.zst); compressed input is detected automatically')
+    parser.add_argument('--compression-level', type=int, metavar='N',
+                        help="Output compression level (default: the compressor's default)")
+    parser.add_argument('--buffer-size', type=int, metavar='BYTES',
+                        help='Bytes read or written at a time by the file and compressor (default: 1 MiB)')
+    parser.add_argument('--shard-items', type=int, metavar='N',
+                        help='Split the output into numbered shards (e.g. out-00001.jsonld.gz) of at most '
+                             'N items, with a manifest of checksums and @id ranges in out.jsonld.gz-manifest.json')
+    parser.add_argument('--shard-size', type=parse_size, metavar='SIZE',
+                        help='Start a new shard once the uncompressed output of a shard reaches SIZE '
+                             '(e.g. 500M or 2G)')
+    parser.add_argument('--workers', type=int, metavar='N',
+                        help='Transform chunks of items in N processes (0: one per CPU); the output is the '
+                             'same as with a single process')
+    parser.add_argument('--pipeline', nargs='?', type=int, const=1, metavar='THREADS',
+                        help='Read, transform (in THREADS threads, default 1) and write concurrently through '
+                             'bounded queues, and report the throughput of each stage')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, metavar='N',
+                        help=f'When harvesting a site, fetch N pages at a time (default: {DEFAULT_CONCURRENCY})')
+    parser.add_argument('--per-page', type=int, default=DEFAULT_PER_PAGE, metavar='N',
+                        help=f'When harvesting a site, request N items per page (default: {DEFAULT_PER_PAGE})')
+    parser.add_argument('--query', action='append', default=[], metavar='KEY=VALUE',
+                        help='When harvesting a site, add an API query parameter (repeatable), '
+                             'e.g. item_set_id=12')
+    parser.add_argument('--incremental', action='store_true',
+                        help='When harvesting a site, only fetch the items modified since the last run into '
+                             'output_file and merge them into it (JSON or JSON Lines output, possibly sharded); '
+                             'the harvest state is kept in <output>-harvest.json')
+    parser.add_argument('--reuse-unchanged', action='store_true',
+                        help='Keep a content hash of every input item in <output>-hashes.json and, on later '
+                             'runs into the same JSON or JSON Lines output, copy the items whose hash is '
+                             'unchanged from it instead of transforming them again')
+    parser.add_argument('--batch', action='store_true',
+                        help='Treat input_file as a directory or glob pattern and transform every file in one '
+                             'process; output_file is a directory for one output per input, or a single file '
+                             'for a combined output')
+    parser.add_argument('--item', action='append', dest='item_ids', metavar='ID',
+                        help='Transform only the item with this @id (repeatable), using a byte-offset '
+                             'index of the export stored next to it as <input_file>.idx')
+    args = parser.parse_args()
+    if args.batch and args.item_ids:
+        parser.error('--item cannot be combined with --batch')
+    if is_url(args.input_file) and (args.item_ids or args.batch):
+        parser.error('--item and --batch read files, not a site')
+    if args.incremental and (not is_url(args.input_file) or args.flatten):
+        parser.error('--incremental needs a site address as input_file and cannot be combined with --flatten')
+    if args.reuse_unchanged and (args.batch or args.item_ids or args.incremental or args.flatten
+                                 or args.workers is not None or args.pipeline is not None
+                                 or args.shard_items or args.shard_size):
+        parser.error('--reuse-unchanged cannot be combined with --batch, --item, --incremental, --flatten, '
+                     '--workers, --pipeline or sharding')
+    if args.reuse_unchanged and detect_format(args.output_file, args.output_format) not in INPUT_FORMATS:
+        parser.error('--reuse-unchanged needs JSON or JSON Lines output')
+    if args.concurrency < 1 or args.per_page < 1:
+        parser.error('--concurrency and --per-page must be at least 1')
+    if any('=' not in parameter for parameter in args.query):
+        parser.error('--query expects KEY=VALUE')
+    query = [tuple(parameter.split('=', 1)) for parameter in args.query]
+    harvest_options = {'concurrency': args.concurrency, 'per_page': args.per_page, 'query': query}
+    if args.workers is not None and args.workers < 0:
+        parser.error('--workers must be 0 or more')
+    workers = default_workers() if args.workers == 0 else args.workers
+    if args.pipeline is not None:
+        if args.pipeline < 1:
+            parser.error('--pipeline needs at least one transform thread')
+        if args.flatten or workers:
+            parser.error('--pipeline cannot be combined with --flatten or --workers')
+    
+    if args.include_internal:
         print("Note: Including internal editorial notes in output")
     else:
         print("Note: Excluding internal editorial notes from output")
     
-    success = transform_export(input_file, output_file, include_internal)
+    if args.batch:
+        success = transform_batch(args.input_file, args.output_file, args.include_internal, args.flatten,
+                                  args.input_format, args.output_format, args.compact, args.json_backend,
+                                  args.compression, args.compression_level, args.buffer_size, args.graph,
+                                  args.shard_items, args.shard_size, workers, args.pipeline)
+        sys.exit(0 if success else 1)
+    
+    success = transform_export(args.input_file, args.output_file, args.include_internal, args.flatten,
+                               args.input_format, args.output_format, args.compact, args.json_backend,
+                               args.item_ids, args.compression, args.compression_level, args.buffer_size,
+                               args.graph, args.shard_items, args.shard_size, workers, args.pipeline,
+                               harvest_options, args.incremental, args.reuse_unchanged)
     sys.exit(0 if success else 1)
 
 
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Dictionary-encoded binary triple files for archival distribution.
+
+In the style of HDT, every term produced from the transformed items (IRIs,
+blank nodes and literals, in N-Triples syntax) is stored once in a sorted
+dictionary and replaced by its integer position in it, and the triples are
+stored as sorted integer arrays with offset indexes. The file is laid out so
+that it can be memory-mapped and queried in place: opening it reads a small
+header, whatever the number of triples.
+
+File layout (little-endian, sections aligned to 8 bytes):
+    magic        b'GMNTRPL1'
+    header size  uint32, followed by a JSON header with the counts and the
+                 (offset, length) of each section
+    term_offsets uint64[terms + 1]  byte offsets of each term in term_data
+    term_data    UTF-8 terms, sorted, concatenated
+    subjects     uint32[triples]    triples sorted by subject, predicate, object
+    predicates   uint32[triples]
+    objects      uint32[triples]
+    subject_index uint64[terms + 1] first triple of each subject
+    object_order uint32[triples]    triple positions sorted by object
+    object_index uint64[terms + 1]  first object_order entry of each object
+
+Usage:
+    python gmn_triple_store.py info <file.triples>
+    python gmn_triple_store.py query <file.triples> [--subject T] [--predicate T] [--object T]
+"""
+
+import argparse
+import json
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from itertools import accumulate
+
+from gmn_jsonld_io import detect_compression
+from gmn_rdf_writers import TripleEncoder
+
+MAGIC = b'GMNTRPL1'
+VERSION = 1
+
+# Sections in file order, with their array type codes (None for raw bytes)
+SECTIONS = (
+    ('term_offsets', 'Q'),
+    ('term_data', None),
+    ('subjects', 'I'),
+    ('predicates', 'I'),
+    ('objects', 'I'),
+    ('subject_index', 'Q'),
+    ('object_order', 'I'),
+    ('object_index', 'Q'),
+)
+
+
+def _little_endian(values):
+    """Return the bytes of an array in little-endian order."""
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _offsets(counts):
+    """Return prefix sums [0, c0, c0 + c1, ...] as uint64 offsets."""
+    return array('Q', accumulate(counts, initial=0))
+
+
+class TripleStoreWriter:
+    """
+    Collects the triples of transformed items and writes a triple file on close.
+
+    Offers the same interface as JsonLdWriter. Unlike the streaming writers,
+    the dictionary and the sorted arrays need every triple, so terms and
+    triples are held in memory as integers until close().
+
+    Example:
+        reader = open_reader('omeka_export.json')
+        with TripleStoreWriter('archive.triples', reader) as writer:
+            for item in reader:
+                writer.write(transform_item(item))
+    """
+
+    def __init__(self, target, layout=None):
+        """
+        Args:
+            target: Output path (an uncompressed file, so it can be memory-mapped)
+            layout: Object with a `header` attribute holding the export's
+                    @context, typically the reader the items come from
+        """
+        if hasattr(target, 'write'):
+            raise ValueError('Triple files are written to a path, not a file object')
+        if detect_compression(target):
+            raise ValueError(f"Triple file '{target}' cannot be compressed; it is read by memory-mapping")
+        self.target = target
+        self.layout = layout
+        self.count = 0
+        self.triple_count = 0
+        self.encoder = None
+        self._term_ids = {}
+        self._triples = array('I')
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+
+    def write(self, item):
+        """Add the triples of one item."""
+        if self._closed:
+            raise ValueError('Cannot write to a closed TripleStoreWriter')
+        if self.encoder is None:
+            header = getattr(self.layout, 'header', None) or {}
+            self.encoder = TripleEncoder(header.get('@context'))
+        term_ids = self._term_ids
+        append = self._triples.append
+        for triple in self.encoder.triples(item):
+            for term in triple:
+                term_id = term_ids.get(term)
+                if term_id is None:
+                    term_id = term_ids[term] = len(term_ids)
+                append(term_id)
+        self.count += 1
+
+    def close(self):
+        """Sort and deduplicate the triples and write the file."""
+        if self._closed:
+            return
+        self._closed = True
+        self._save(*self._sorted_triples())
+
+    def _sorted_triples(self):
+        """
+        Number the terms in sorted order and sort and deduplicate the triples.
+
+        Returns:
+            (terms, subjects, predicates, objects): the sorted term list and
+            uint32 arrays of term IDs in subject, predicate, object order
+        """
+        terms = sorted(self._term_ids)
+        term_count = len(terms)
+        # Renumber the terms in sorted order
+        remap = array('I', bytes(4 * term_count))
+        for new_id, term in enumerate(terms):
+            remap[self._term_ids[term]] = new_id
+        self._term_ids = None
+
+        provisional = self._triples
+        keys = set()
+        for position in range(0, len(provisional), 3):
+            keys.add((remap[provisional[position]] * term_count + remap[provisional[position + 1]]) * term_count
+                     + remap[provisional[position + 2]])
+        self._triples = None
+        subjects, predicates, objects = array('I'), array('I'), array('I')
+        for key in sorted(keys):
+            rest, obj = divmod(key, term_count)
+            subject, predicate = divmod(rest, term_count)
+            subjects.append(subject)
+            predicates.append(predicate)
+            objects.append(obj)
+        self.triple_count = len(subjects)
+        return terms, subjects, predicates, objects
+
+    def _save(self, terms, subjects, predicates, objects):
+        """Write the dictionary, triple arrays and indexes to the target file."""
+        term_count = len(terms)
+        encoded = [term.encode('utf-8') for term in terms]
+        subject_counts = array('Q', bytes(8 * term_count))
+        object_counts = array('Q', bytes(8 * term_count))
+        for subject in subjects:
+            subject_counts[subject] += 1
+        for obj in objects:
+            object_counts[obj] += 1
+        # A stable sort by object keeps subject, predicate order within each object
+        object_order = array('I', sorted(range(len(objects)), key=objects.__getitem__))
+
+        sections = {
+            'term_offsets': _little_endian(_offsets(len(term) for term in encoded)),
+            'term_data': b''.join(encoded),
+            'subjects': _little_endian(subjects),
+            'predicates': _little_endian(predicates),
+            'objects': _little_endian(objects),
+            'subject_index': _little_endian(_offsets(subject_counts)),
+            'object_order': _little_endian(object_order),
+            'object_index': _little_endian(_offsets(object_counts)),
+        }
+        header = {'version': VERSION, 'terms': term_count, 'triples': self.triple_count,
+                  'items': self.count, 'sections': {}}
+        # The header holds the section offsets, so its size is fixed first
+        header_size = len(json.dumps({**header, 'sections': {name: [1 << 62, 1 << 62] for name, _ in SECTIONS}}))
+        position = len(MAGIC) + 4 + header_size
+        for name, _ in SECTIONS:
+            position += -position % 8
+            header['sections'][name] = [position, len(sections[name])]
+            position += len(sections[name])
+        header_bytes = json.dumps(header).encode('ascii').ljust(header_size)
+
+        with open(self.target, 'wb') as f:
+            f.write(MAGIC + struct.pack('<I', header_size) + header_bytes)
+            for name, _ in SECTIONS:
+                f.write(b'\0' * (-f.tell() % 8))
+                f.write(sections[name])
+
+
+class TripleStore:
+    """
+    Read-only, memory-mapped view of a triple file.
+
+    Terms are N-Triples strings such as '<http://www.cidoc-crm.org/cidoc-crm/E21_Person>'
+    or '"1410-03-12"'. Lookups by term use a binary search over the sorted
+    dictionary, and triples are found through the subject and object indexes,
+    so nothing is loaded into memory up front.
+
+    Example:
+        with TripleStore('archive.triples') as store:
+            for s, p, o in store.triples(subject='<https://example.org/item/1>'):
+                ...
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"'{path}' is not a triple file") from None
+        if self._data[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"'{path}' is not a triple file")
+        header_size, = struct.unpack_from('<I', self._data, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.header = json.loads(self._data[start:start + header_size])
+        if self.header.get('version') != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported triple file version {self.header.get('version')} in '{path}'")
+        self.term_count = self.header['terms']
+        self.triple_count = self.header['triples']
+        view = memoryview(self._data)
+        self._views = [view]
+        for name, typecode in SECTIONS:
+            offset, length = self.header['sections'][name]
+            section = view[offset:offset + length]
+            if typecode is not None:
+                if sys.byteorder == 'little':
+                    section = section.cast(typecode)
+                else:
+                    section = array(typecode, section)
+                    section.byteswap()
+            self._views.append(section)
+            setattr(self, '_' + name, section)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Release the memory map."""
+        for view in reversed(getattr(self, '_views', ())):
+            if isinstance(view, memoryview):
+                view.release()
+        self._views = []
+        if getattr(self, '_data', None) is not None:
+            self._data.close()
+        self._file.close()
+
+    def __len__(self):
+        return self.triple_count
+
+    def term(self, term_id):
+        """Return the term with an ID."""
+        return self._term_bytes(term_id).decode('utf-8')
+
+    def _term_bytes(self, term_id):
+        offsets = self._term_offsets
+        return bytes(self._term_data[offsets[term_id]:offsets[term_id + 1]])
+
+    def term_id(self, term):
+        """Return the ID of a term, or None if the file does not contain it."""
+        encoded = term.encode('utf-8')
+        low, high = 0, self.term_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._term_bytes(middle) < encoded:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.term_count and self._term_bytes(low) == encoded:
+            return low
+        return None
+
+    def triple_ids(self, subject=None, predicate=None, obj=None):
+        """
+        Yield (subject, predicate, object) ID triples matching a pattern.
+
+        Args:
+            subject, predicate, obj: Term IDs to match, or None for any
+        """
+        subjects, predicates, objects = self._subjects, self._predicates, self._objects
+        if subject is not None:
+            start, end = self._subject_index[subject], self._subject_index[subject + 1]
+            if predicate is not None:
+                # Triples of one subject are sorted by predicate
+                start = bisect_left(predicates, predicate, start, end)
+                end = bisect_left(predicates, predicate + 1, start, end)
+            for position in range(start, end):
+                if (predicate is None or predicates[position] == predicate) and (obj is None or objects[position] == obj):
+                    yield subject, predicates[position], objects[position]
+        elif obj is not None:
+            order = self._object_order
+            for index in range(self._object_index[obj], self._object_index[obj + 1]):
+                position = order[index]
+                if predicate is None or predicates[position] == predicate:
+                    yield subjects[position], predicates[position], obj
+        else:
+            for position in range(self.triple_count):
+                if predicate is None or predicates[position] == predicate:
+                    yield subjects[position], predicates[position], objects[position]
+
+    def triples(self, subject=None, predicate=None, object=None):
+        """
+        Yield (subject, predicate, object) term triples matching a pattern.
+
+        Args:
+            subject, predicate, object: N-Triples terms to match, or None for any
+        """
+        pattern = []
+        for term in (subject, predicate, object):
+            if term is None:
+                pattern.append(None)
+                continue
+            term_id = self.term_id(term)
+            if term_id is None:
+                return
+            pattern.append(term_id)
+        names = {}
+        for ids in self.triple_ids(*pattern):
+            yield tuple(names[term_id] if term_id in names else names.setdefault(term_id, self.term(term_id))
+                        for term_id in ids)
+            if len(names) > 100000:
+                names.clear()
+
+
+def main():
+    """Print a summary of a triple file, or the triples matching a pattern."""
+    parser = argparse.ArgumentParser(description='Inspect a dictionary-encoded triple file.')
+    parser.add_argument('command', choices=('info', 'query'))
+    parser.add_argument('file', help='Triple file written by TripleStoreWriter')
+    parser.add_argument('--subject', help="Subject term, e.g. '<https://example.org/item/1>'")
+    parser.add_argument('--predicate', help='Predicate term')
+    parser.add_argument('--object', help='Object term (an IRI in <>, a literal in quotes)')
+    args = parser.parse_args()
+
+    with TripleStore(args.file) as store:
+        if args.command == 'info':
+            print(f"{store.triple_count} triples, {store.term_count} terms, "
+                  f"{store.header.get('items')} items")
+        else:
+            for triple in store.triples(args.subject, args.predicate, args.object):
+                print(' '.join(triple) + ' .')
+
+
+if __name__ == '__main__':
+    main()